@@ -0,0 +1,124 @@
+import argparse, json, os, sys
+
+# Only argparse/json/os load at startup. Each subcommand imports the codec modules
+# (NumPy, Pillow) it needs when it runs, so --help and usage errors return at once,
+# and nothing here imports the GUI (tkinter) or the benchmark stack (pandas, matplotlib).
+
+def _passphrase(args) -> str:
+    pw = args.passphrase if args.passphrase is not None else os.environ.get("STEGO_PASSPHRASE")
+    if pw is None:
+        raise ValueError("give --passphrase or set STEGO_PASSPHRASE")
+    return pw
+
+def _emit(result) -> None:
+    from dataclasses import asdict
+    row = asdict(result)
+    row.pop("quality", None)
+    print(json.dumps(row))
+
+def _sequential_bits(args) -> int:
+    if args.adaptive:
+        raise ValueError("--adaptive needs --method random")
+    return args.bits
+
+def cmd_encode(args) -> int:
+    if args.method == "sequential":
+        from app.core.lsb_sequential import encode_sequential
+        res = encode_sequential(args.cover, args.payload, args.out, profile=args.profile, workers=args.workers,
+                                compress=args.compress, bits=_sequential_bits(args))
+    else:
+        from app.core.lsb_random_v2 import encode_v2
+        res = encode_v2(args.cover, args.payload, _passphrase(args), args.out, mode=args.mode, shards=args.shards,
+                        workers=args.workers, profile=args.profile, compress=args.compress, bits=args.bits,
+                        adaptive=args.adaptive)
+    _emit(res)
+    return 0
+
+def cmd_decode(args) -> int:
+    if args.method == "sequential":
+        from app.core.lsb_sequential import decode_sequential
+        res = decode_sequential(args.stego, args.out_dir)
+    else:
+        from app.core.lsb_random_v2 import decode_v2
+        res = decode_v2(args.stego, _passphrase(args), args.out_dir, workers=args.workers)
+    _emit(res)
+    return 0 if res.crc_ok else 1
+
+def cmd_capacity(args) -> int:
+    if args.method == "sequential":
+        from app.core.lsb_sequential import capacity_bytes_for_image
+        cap = capacity_bytes_for_image(args.image, _sequential_bits(args))
+    else:
+        from app.core.lsb_random_v2 import capacity_bytes_for_image
+        cap = capacity_bytes_for_image(args.image, args.mode, args.shards, args.bits, args.adaptive)
+    print(json.dumps({"path": args.image, "method": args.method, "capacity_bytes": cap}))
+    return 0
+
+def cmd_probe(args) -> int:
+    from dataclasses import asdict
+    from app.core.probe import probe_header
+    found = 0
+    for path in args.paths:
+        res = probe_header(path, allow_full_decode=args.full)
+        found += res is not None
+        print(json.dumps(asdict(res) if res is not None else {"path": path, "stego": False}))
+    return 0 if found else 1
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="stego", description="Headless LSB steganography over app.core.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    def codec_options(p, modes: bool = True):
+        p.add_argument("--method", choices=("random", "sequential"), default="random")
+        p.add_argument("-p", "--passphrase", help="key for --method random (default: $STEGO_PASSPHRASE)")
+        if modes:
+            p.add_argument("--mode", default="checked", help="shuffle, lazy, checked or sharded (random only)")
+            p.add_argument("--shards", type=int, default=None, help="shard count for --mode sharded")
+
+    def bits_options(p):
+        p.add_argument("--bits", type=int, default=1, help="payload bits per sample, 1..4")
+        p.add_argument("--adaptive", action="store_true",
+                       help="1..BITS bits per sample by local texture (random only; capacity decodes the image)")
+
+    p = sub.add_parser("encode", help="embed a payload file into a cover image")
+    p.add_argument("cover")
+    p.add_argument("payload")
+    p.add_argument("out", help="stego path; the extension picks the format (PNG, BMP, TIFF, WebP, PPM)")
+    codec_options(p)
+    bits_options(p)
+    p.add_argument("--compress", default=None, help="zlib, bz2, lzma or auto")
+    p.add_argument("--profile", default="balanced", help="fastest, balanced or smallest")
+    p.add_argument("--workers", type=int, default=None)
+    p.set_defaults(func=cmd_encode)
+
+    p = sub.add_parser("decode", help="extract the payload into OUT_DIR (exit 1 on CRC mismatch)")
+    p.add_argument("stego")
+    p.add_argument("out_dir")
+    codec_options(p, modes=False)
+    p.add_argument("--workers", type=int, default=None)
+    p.set_defaults(func=cmd_decode)
+
+    p = sub.add_parser("capacity", help="payload bytes an image can carry (metadata only)")
+    p.add_argument("image")
+    p.add_argument("--method", choices=("random", "sequential"), default="random")
+    p.add_argument("--mode", default="checked")
+    p.add_argument("--shards", type=int, default=None)
+    bits_options(p)
+    p.set_defaults(func=cmd_capacity)
+
+    p = sub.add_parser("probe", help="check files for a stego header (exit 1 if none has one)")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--full", action="store_true", help="fully decode formats without a fast header path")
+    p.set_defaults(func=cmd_probe)
+    return ap
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (ValueError, OSError) as e:
+        print(f"stego {args.command}: error: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import asyncio
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from . import lsb_random_v2, lsb_sequential
+from .progress import CancelToken
+
+METHODS = ("random", "sequential")
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+def _shared_executor() -> ThreadPoolExecutor:
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="stego-async")
+        return _shared_pool
+
+def _check_method(method: str):
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}. Expected one of: {', '.join(METHODS)}.")
+
+class AsyncStego:
+    """
+    asyncio front end for the blocking codecs. Each call runs the whole sync
+    function (file reads, KDF, permutation, embed/extract, image encode, file
+    writes) on executor, so the event loop only awaits; results are the sync
+    functions' own return values. At most max_concurrency calls run at once per
+    event loop, the rest wait before any file is read.
+    executor=None uses a shared thread pool (one thread per CPU). With a thread
+    executor, progress callbacks are delivered on the event loop and cancelling
+    the awaiting task cancels the job through its CancelToken (the call returns
+    only once the worker has stopped). A ProcessPoolExecutor gets neither.
+    Jobs run with workers=1 unless given (the executor already runs them side by side).
+    """
+    def __init__(self, executor: Executor = None, max_concurrency: int = None):
+        self.executor = executor
+        self.max_concurrency = max_concurrency or os.cpu_count() or 1
+        self._semaphores = weakref.WeakKeyDictionary()  # event loop -> Semaphore
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        sem = self._semaphores.get(loop)
+        if sem is None:
+            sem = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return sem
+
+    async def _run(self, fn, *args, progress=None, cancellable: bool = True, **kwargs):
+        loop = asyncio.get_running_loop()
+        local = not isinstance(self.executor, ProcessPoolExecutor)
+        token = None
+        if local and cancellable:
+            token = kwargs["cancel"] = CancelToken()
+            if progress is not None:
+                kwargs["progress"] = lambda stage, frac: loop.call_soon_threadsafe(progress, stage, frac)
+        async with self._semaphore():
+            fut = loop.run_in_executor(self.executor or _shared_executor(), functools.partial(fn, *args, **kwargs))
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if token is not None:
+                    token.cancel()
+                await asyncio.wait([fut])  # keep the slot until the worker has actually stopped
+                if not fut.cancelled():
+                    fut.exception()  # retrieved; the caller only sees CancelledError
+                raise
+
+    async def encode(self, cover_path: str, payload_path: str, passphrase: str, out_path: str, *args,
+                     method: str = "random", **kwargs):
+        """
+        encode_v2, or encode_sequential with method="sequential" (passphrase is then
+        ignored); the other arguments (mode, bits, compress, progress, ...) go to it unchanged.
+        """
+        _check_method(method)
+        if not args:  # positional callers pass workers themselves
+            kwargs.setdefault("workers", 1)
+        if method == "sequential":
+            return await self._run(lsb_sequential.encode_sequential, cover_path, payload_path, out_path, *args,
+                                   **kwargs)
+        return await self._run(lsb_random_v2.encode_v2, cover_path, payload_path, passphrase, out_path, *args,
+                               **kwargs)
+
+    async def decode(self, stego_path: str, passphrase: str, out_dir: str, *args, method: str = "random",
+                     **kwargs):
+        """
+        decode_v2, or decode_sequential with method="sequential" (passphrase ignored).
+        """
+        _check_method(method)
+        if method == "sequential":
+            return await self._run(lsb_sequential.decode_sequential, stego_path, out_dir, *args, **kwargs)
+        if not args:
+            kwargs.setdefault("workers", 1)
+        return await self._run(lsb_random_v2.decode_v2, stego_path, passphrase, out_dir, *args, **kwargs)
+
+    async def capacity(self, path: str, *args, method: str = "random", **kwargs) -> int:
+        """
+        capacity_bytes_for_image of the method (mode, shards, bits, adaptive as there).
+        """
+        _check_method(method)
+        fn = lsb_sequential.capacity_bytes_for_image if method == "sequential" else \
+            lsb_random_v2.capacity_bytes_for_image
+        return await self._run(fn, path, *args, cancellable=False, **kwargs)
+
+_default = AsyncStego()
+
+def configure(executor: Executor = None, max_concurrency: int = None) -> AsyncStego:
+    """
+    Replaces the AsyncStego behind async_encode / async_decode / async_capacity.
+    """
+    global _default
+    _default = AsyncStego(executor, max_concurrency)
+    return _default
+
+async def async_encode(cover_path: str, payload_path: str, passphrase: str, out_path: str, **kwargs):
+    return await _default.encode(cover_path, payload_path, passphrase, out_path, **kwargs)
+
+async def async_decode(stego_path: str, passphrase: str, out_dir: str, **kwargs):
+    return await _default.decode(stego_path, passphrase, out_dir, **kwargs)
+
+async def async_capacity(path: str, **kwargs) -> int:
+    return await _default.capacity(path, **kwargs)
@@ -0,0 +1,189 @@
+import bz2
+import lzma
+import os
+import tempfile
+import threading
+import zlib
+
+from .payload_stream import STREAM_CHUNK, PayloadSource
+
+# Codec ids stored in the header of compressed stego images; 0 = payload stored as-is.
+CODECS = {"none": 0, "zlib": 1, "bz2": 2, "lzma": 3}
+CODEC_NAMES = {v: k for k, v in CODECS.items()}
+DEFAULT_LEVELS = {"zlib": 6, "bz2": 9, "lzma": 6}
+AUTO_SAMPLE = 256 << 10  # bytes compressed per codec when choosing automatically
+AUTO_MIN_SAVING = 0.03  # below this the payload is stored uncompressed
+_ERRORS = (zlib.error, OSError, EOFError, lzma.LZMAError)
+
+def _compressor(codec: str, level: int = None):
+    level = DEFAULT_LEVELS[codec] if level is None else level
+    if codec == "zlib":
+        return zlib.compressobj(level)
+    if codec == "bz2":
+        return bz2.BZ2Compressor(max(1, level))
+    return lzma.LZMACompressor(preset=level)
+
+def _decompressor(codec: str):
+    if codec == "zlib":
+        return zlib.decompressobj()
+    if codec == "bz2":
+        return bz2.BZ2Decompressor()
+    return lzma.LZMADecompressor()
+
+def check_codec(compress: str) -> str:
+    """
+    Normalizes the compress argument of the encoders: None/"none" -> "none".
+    """
+    compress = compress or "none"
+    if compress != "auto" and compress not in CODECS:
+        raise ValueError(f"Unknown compression {compress!r}. Expected auto or one of: {', '.join(CODECS)}.")
+    return compress
+
+def choose_codec(source: PayloadSource, level: int = None) -> str:
+    """
+    Codec with the smallest output on the first AUTO_SAMPLE payload bytes, or
+    "none" if no codec saves at least AUTO_MIN_SAVING of the sample.
+    """
+    sample = b"".join(data for _, data in source.chunks(0, min(source.size, AUTO_SAMPLE)))
+    if not sample:
+        return "none"
+    best, best_len = "none", len(sample) * (1 - AUTO_MIN_SAVING)
+    for codec in ("zlib", "bz2", "lzma"):
+        c = _compressor(codec, level)
+        n = len(c.compress(sample)) + len(c.flush())
+        if n < best_len:
+            best, best_len = codec, n
+    return best
+
+class CompressedSource(PayloadSource):
+    """
+    Compressed copy of a payload, produced chunk by chunk: kept in memory for
+    in-memory payloads and spooled to a temporary file for payload files, so
+    payload-side memory stays bounded. close() removes the temporary file.
+    """
+    def __init__(self, source: PayloadSource, codec: str, level: int = None):
+        self.codec = CODECS[codec]
+        self.raw_size = source.size
+        c = _compressor(codec, level)
+        if source.path is None:
+            parts = [c.compress(data) for _, data in source.chunks()]
+            self.chunk, self.path, self.buf = source.chunk, None, memoryview(b"".join(parts) + c.flush())
+            self.size = len(self.buf)
+            return
+        fd, tmp = tempfile.mkstemp(prefix="stego-", suffix=f".{codec}")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for _, data in source.chunks():
+                    f.write(c.compress(data))
+                f.write(c.flush())
+            self.chunk, self.path, self.buf = source.chunk, tmp, None
+            self.size = os.path.getsize(tmp)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def close(self):
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+def compress_source(source: PayloadSource, compress: str = None, level: int = None) -> PayloadSource:
+    """
+    source itself when compress resolves to "none", else a CompressedSource.
+    """
+    codec = check_codec(compress)
+    if codec == "auto":
+        codec = choose_codec(source, level)
+    if codec == "none":
+        return source
+    return CompressedSource(source, codec, level)
+
+class DecompressingSink:
+    """
+    Sink for the extractors that decompresses on the fly. Compressed chunks may
+    arrive out of order (one stream per shard); chunks ahead of the stream are
+    spooled to a temporary file (not memory) until contiguous, fed to the
+    decompressor in order, and the output is written sequentially to inner in
+    STREAM_CHUNK pieces. Output beyond raw_len is rejected.
+    """
+    def __init__(self, inner, codec: int, raw_len: int):
+        if codec not in CODEC_NAMES or codec == 0:
+            raise ValueError(f"Unknown compression codec id {codec}.")
+        self.inner = inner
+        self.raw_len = raw_len
+        self._codec = CODEC_NAMES[codec]
+        self._d = _decompressor(self._codec)
+        self._held = {}  # compressed offset -> (spool position, length)
+        self._spool = None
+        self._next = 0  # next compressed offset to feed
+        self._out = 0   # decompressed bytes written
+        self._lock = threading.Lock()
+
+    def open(self, size: int):
+        self.inner.open(self.raw_len)
+
+    def _emit(self, data: bytes):
+        if self._out + len(data) > self.raw_len:
+            raise ValueError("Corrupted compressed payload (longer than recorded).")
+        if data:
+            self.inner.write(self._out, data)
+            self._out += len(data)
+
+    def _decompress(self, data: bytes) -> bytes:
+        try:
+            return self._d.decompress(data, STREAM_CHUNK)
+        except _ERRORS as e:
+            raise ValueError(f"Corrupted compressed payload ({self._codec}: {e}).") from e
+
+    def _feed(self, data: bytes):
+        d = self._d
+        self._emit(self._decompress(data))
+        if self._codec == "zlib":
+            while d.unconsumed_tail:
+                self._emit(self._decompress(d.unconsumed_tail))
+        else:
+            while not d.eof and not d.needs_input:
+                self._emit(self._decompress(b""))
+
+    def write(self, off: int, data):
+        with self._lock:
+            if off != self._next:
+                if self._spool is None:
+                    self._spool = tempfile.TemporaryFile(prefix="stego-held-")
+                pos = self._spool.seek(0, os.SEEK_END)
+                self._spool.write(data)
+                self._held[off] = (pos, len(data))
+                return
+            self._next += len(data)
+            self._feed(bytes(data))
+            while self._next in self._held:
+                pos, n = self._held.pop(self._next)
+                self._spool.seek(pos)
+                self._next += n
+                self._feed(self._spool.read(n))
+
+    def _release(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    def finish(self):
+        """
+        Checks that the stream ended and produced exactly raw_len bytes.
+        """
+        if self._codec == "zlib" and not self._held:
+            self._emit(self._d.flush())
+        held = bool(self._held)
+        self._release()
+        if held or self._out != self.raw_len or not self._d.eof or self._d.unused_data:
+            raise ValueError("Corrupted compressed payload (stream incomplete).")
+
+    def getvalue(self) -> bytes:
+        return self.inner.getvalue()
+
+    def close(self):
+        self._release()
+        self.inner.close()
+
+    def discard(self):
+        self._release()
+        self.inner.discard()
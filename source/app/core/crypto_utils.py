@@ -1,17 +1,191 @@
 import hashlib
+import threading
+from collections import OrderedDict
 
 SALT_LEN = 16
 KDF_ITERS = 200_000
+KDF_BLOCK = 32  # one PBKDF2-HMAC-SHA256 block; shorter dklen values are prefixes of it
 
-def kdf_seed(passphrase: str, salt: bytes, out_bytes: int = 16) -> bytes:
+def _passphrase_bytes(passphrase) -> bytes:
+    if isinstance(passphrase, str):
+        return passphrase.encode("utf-8")
+    return bytes(passphrase)
+
+def _derive(passphrase: bytes, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", passphrase, salt, iterations, dklen=KDF_BLOCK)
+
+class _Entry:
+    __slots__ = ("key_block", "slot_orders")
+
+    def __init__(self, key_block: bytes):
+        self.key_block = bytearray(key_block)
+        self.slot_orders = {}
+
+    def zeroize(self):
+        for i in range(len(self.key_block)):
+            self.key_block[i] = 0
+        for order in self.slot_orders.values():
+            if hasattr(order, "fill"):
+                order.fill(0)
+        self.slot_orders.clear()
+
+class KeyScheduleCache:
     """
-    PBKDF2-HMAC-SHA256 -> seed bytes.
+    Bounded LRU of PBKDF2 outputs keyed by SHA-256(passphrase, salt, iterations).
+    Entries can also hold derived slot orders (e.g. the full shuffle for an image
+    shape) when cache_slots is enabled. Evicted entries are zeroized.
     """
-    if isinstance(passphrase, str):
-        passphrase = passphrase.encode("utf-8")
-    dk = hashlib.pbkdf2_hmac("sha256", passphrase, salt, KDF_ITERS, dklen=out_bytes)
-    return dk
+    def __init__(self, maxsize: int = 32, cache_slots: bool = False):
+        self.maxsize = maxsize
+        self.cache_slots = cache_slots
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()  # per-thread hits/misses, see thread_counts
+
+    @staticmethod
+    def _key(passphrase: bytes, salt: bytes, iterations: int) -> bytes:
+        h = hashlib.sha256()
+        for part in (passphrase, bytes(salt), iterations.to_bytes(8, "big")):
+            h.update(len(part).to_bytes(4, "big"))
+            h.update(part)
+        return h.digest()
+
+    def _lookup(self, key: bytes):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _insert(self, key: bytes, entry: _Entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            _, old = self._entries.popitem(last=False)
+            old.zeroize()
+
+    def key_block(self, passphrase, salt: bytes, iterations: int = KDF_ITERS) -> bytes:
+        """
+        32-byte PBKDF2 output, derived on miss.
+        """
+        pw = _passphrase_bytes(passphrase)
+        key = self._key(pw, salt, iterations)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                self._local.hits = getattr(self._local, "hits", 0) + 1
+                return bytes(entry.key_block)
+            self.misses += 1
+            self._local.misses = getattr(self._local, "misses", 0) + 1
+        block = _derive(pw, salt, iterations)
+        if self.maxsize > 0:
+            with self._lock:
+                if key not in self._entries:
+                    self._insert(key, _Entry(block))
+        return block
+
+    def slot_order(self, passphrase, salt: bytes, shape_key, build, iterations: int = KDF_ITERS):
+        """
+        Cached slot order for shape_key, computed with build() on miss.
+        Only stored when cache_slots is enabled and the key entry exists.
+        """
+        if not self.cache_slots:
+            return build()
+        key = self._key(_passphrase_bytes(passphrase), salt, iterations)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None and shape_key in entry.slot_orders:
+                return entry.slot_orders[shape_key]
+        order = build()
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                entry.slot_orders[shape_key] = order
+        return order
+
+    def evict(self, passphrase, salt: bytes, iterations: int = KDF_ITERS) -> bool:
+        key = self._key(_passphrase_bytes(passphrase), salt, iterations)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry.zeroize()
+        return True
+
+    def clear(self):
+        """
+        Zeroize and drop every entry. Counters are kept.
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            entry.zeroize()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def thread_counts(self):
+        """
+        (hits, misses) of the lookups made by the calling thread; the difference of two
+        calls counts one operation even while other threads use the cache.
+        """
+        return getattr(self._local, "hits", 0), getattr(self._local, "misses", 0)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+KDF_CACHE = KeyScheduleCache()
+
+def kdf_seed(passphrase: str, salt: bytes, out_bytes: int = 16, cache: KeyScheduleCache = KDF_CACHE) -> bytes:
+    """
+    PBKDF2-HMAC-SHA256 -> seed bytes. Pass cache=None to bypass the key-schedule cache.
+    """
+    if out_bytes > KDF_BLOCK:
+        raise ValueError(f"out_bytes must be <= {KDF_BLOCK}.")
+    if cache is None:
+        return _derive(_passphrase_bytes(passphrase), salt, KDF_ITERS)[:out_bytes]
+    return cache.key_block(passphrase, salt, KDF_ITERS)[:out_bytes]
 
 def crc32_bytes(data: bytes) -> int:
     import zlib
     return zlib.crc32(data) & 0xFFFFFFFF
+
+def _gf2_times(mat, vec: int) -> int:
+    s, i = 0, 0
+    while vec:
+        if vec & 1:
+            s ^= mat[i]
+        vec >>= 1
+        i += 1
+    return s
+
+def _gf2_square(mat):
+    return [_gf2_times(mat, mat[n]) for n in range(32)]
+
+def crc32_combine(crc1: int, crc2: int, len2: int) -> int:
+    """
+    CRC32 of A + B from crc32(A), crc32(B) and len(B) (zlib's crc32_combine),
+    so shards can checksum their ranges independently.
+    """
+    if len2 <= 0:
+        return crc1
+    odd = [0xEDB88320] + [1 << n for n in range(31)]  # operator for one zero bit
+    even = _gf2_square(odd)
+    odd = _gf2_square(even)
+    while True:
+        even = _gf2_square(odd)
+        if len2 & 1:
+            crc1 = _gf2_times(even, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+        odd = _gf2_square(even)
+        if len2 & 1:
+            crc1 = _gf2_times(odd, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+    return (crc1 ^ crc2) & 0xFFFFFFFF
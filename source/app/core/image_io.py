@@ -0,0 +1,382 @@
+import io
+import os
+import sys
+import zlib
+import numpy as np
+from PIL import Image
+
+def _open_image(src) -> Image.Image:
+    if isinstance(src, Image.Image):
+        return src
+    if isinstance(src, (str, os.PathLike)):
+        return Image.open(src)
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(src))
+    raise TypeError(f"Unsupported image source: {type(src).__name__}")
+
+def load_rgb_array(src, reporter=None) -> np.ndarray:
+    """
+    (H, W, 3) uint8 view of an image given as a path, encoded bytes/memoryview,
+    PIL image or pixel array. Arrays are used as-is and RGB images are exposed
+    through the PIL buffer without an extra copy, so the result may be read-only.
+    reporter (progress.Reporter) gets a "convert" stage after the image is decoded.
+    """
+    if isinstance(src, np.ndarray):
+        if src.ndim != 3 or src.shape[2] != 3 or src.dtype != np.uint8:
+            raise ValueError("Pixel arrays must be (H, W, 3) uint8.")
+        if reporter is not None:
+            reporter.stage("convert")
+        return np.ascontiguousarray(src)
+    img = _open_image(src)
+    if reporter is not None:
+        img.load()
+        reporter.stage("convert")
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return np.asarray(img)
+
+# Pillow modes the codecs embed into as-is -> channels; other modes are converted first.
+# 16-bit RGB/RGBA/LA PNGs (which Pillow would reduce to 8 bits) are read by _read_png16.
+NATIVE_MODES = {"L": 1, "LA": 2, "RGB": 3, "RGBA": 4, "I;16": 1}
+_PIL_MODES = {(1, 1): "L", (2, 1): "LA", (3, 1): "RGB", (4, 1): "RGBA", (1, 2): "I;16"}
+
+def _target_mode(img: Image.Image) -> str:
+    if img.mode in NATIVE_MODES:
+        return img.mode
+    if img.mode in ("I;16B", "I;16L"):
+        return "I;16"
+    if img.mode in ("PA", "La") or (img.mode == "P" and "transparency" in img.info):
+        return "RGBA"
+    return "RGB"
+
+def pixel_mode(arr: np.ndarray) -> str:
+    """
+    Mode name of a load_pixels array: a Pillow mode, or "RGB;16" / "RGBA;16" / "LA;16"
+    for 16-bit layouts Pillow can't hold.
+    """
+    channels, size = arr.shape[2], arr.dtype.itemsize
+    if (channels, size) in _PIL_MODES:
+        return _PIL_MODES[channels, size]
+    return f"{_PIL_MODES[channels, 1]};16"
+
+def _check_pixels(arr: np.ndarray) -> np.ndarray:
+    if arr.ndim == 2:
+        arr = arr[..., None]
+    if arr.ndim != 3 or arr.dtype not in (np.uint8, np.uint16) or not 1 <= arr.shape[2] <= 4:
+        raise ValueError("Pixel arrays must be (H, W) or (H, W, 1..4) uint8/uint16.")
+    return np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder("="))
+
+def load_pixels(src, reporter=None) -> np.ndarray:
+    """
+    (H, W, C) pixel array of an image in its own sample layout: uint8 with C = 1
+    (L), 2 (LA), 3 (RGB) or 4 (RGBA), or uint16 for 16-bit images (I;16 and 16-bit
+    PNG). Supported modes are not converted (the array may be a read-only view of
+    the PIL buffer); palette images become RGB, or RGBA with transparency, and
+    anything else RGB. Arrays are checked and used as-is. reporter as in load_rgb_array.
+    """
+    if isinstance(src, np.ndarray):
+        arr = _check_pixels(src)
+        if reporter is not None:
+            reporter.stage("convert")
+        return arr
+    head = _read_head(src, 33)
+    if head is not None and _png16_ihdr(head):
+        arr = _read_png16(src)
+        if reporter is not None:
+            reporter.stage("convert")
+        return arr
+    img = _open_image(src)
+    if reporter is not None:
+        img.load()
+        reporter.stage("convert")
+    mode = _target_mode(img)
+    if img.mode != mode and not img.mode.startswith("I;16"):
+        img = img.convert(mode)
+    return _check_pixels(np.asarray(img))
+
+def slot_view(arr: np.ndarray) -> np.ndarray:
+    """
+    Flat LSB slot stream of a load_pixels array, one slot per sample in row-major
+    order: the array itself for 8-bit samples, the low byte of every sample for
+    16-bit ones (a strided view, so embedding still writes into arr).
+    """
+    flat = arr.reshape(-1)
+    if flat.dtype == np.uint8:
+        return flat
+    return flat.view(np.uint8)[0 if sys.byteorder == "little" else 1::2]
+
+def as_byte_view(data) -> memoryview:
+    """
+    Flat byte view of any buffer (bytes, bytearray, memoryview, NumPy array).
+    """
+    mv = data if isinstance(data, memoryview) else memoryview(data)
+    if mv.format != "B" or mv.ndim != 1:
+        mv = mv.cast("B")
+    return mv
+
+def encode_image_bytes(arr: np.ndarray, format: str = "PNG", profile: str = "balanced", workers: int = None) -> bytes:
+    """
+    Lossless encode through the output writer (see writer.PROFILES).
+    """
+    from .writer import encode_image
+    return encode_image(arr, format, profile, workers)
+
+def image_size(path) -> tuple:
+    """
+    (width, height) from the image header only; pixel data is not decoded.
+    """
+    with Image.open(path) as img:
+        return img.size
+
+def _header_slots(head: bytes):
+    """
+    Slots of a non-palette 8/16-bit PNG or a 24-bit BMP from its first bytes, None
+    for anything else. These formats load with one sample per channel, so no
+    Pillow plugin is needed to size them.
+    """
+    if len(head) >= 33 and head[:8] == _PNG_SIG and head[12:16] == b"IHDR":
+        w, h, depth, color, _ = _ihdr_fields(head[16:29])
+        if depth in (8, 16) and color != 3 and color in _PNG_CHANNELS:
+            return w * h * _PNG_CHANNELS[color]
+    if len(head) >= 34 and head[:2] == b"BM" and int.from_bytes(head[14:18], "little") >= 40:
+        if int.from_bytes(head[28:30], "little") == 24 and int.from_bytes(head[30:34], "little") == 0:
+            w = int.from_bytes(head[18:22], "little", signed=True)
+            h = int.from_bytes(head[22:26], "little", signed=True)
+            return w * abs(h) * 3
+    return None
+
+def image_slots(path) -> int:
+    """
+    Slots (samples) load_pixels would give for path, from the image header only.
+    """
+    head = _read_head(path, 34)
+    slots = _header_slots(head) if head is not None else None
+    if slots is not None:  # also 16-bit LA, which Pillow reports as RGBA
+        return slots
+    with Image.open(path) as img:
+        w, h = img.size
+        return w * h * NATIVE_MODES[_target_mode(img)]
+
+_PNG_SIG = b"\x89PNG\r\n\x1a\n"
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}  # samples per pixel by color type
+
+def _read_head(src, n: int):
+    if isinstance(src, (str, os.PathLike)):
+        with open(src, "rb") as f:
+            return f.read(n)
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        return bytes(as_byte_view(src)[:n])
+    return None
+
+def _ihdr_fields(data: bytes) -> tuple:
+    """
+    (width, height, bit depth, color type, interlace) from IHDR chunk data.
+    """
+    return int.from_bytes(data[0:4], "big"), int.from_bytes(data[4:8], "big"), data[8], data[9], data[12]
+
+def _png16_ihdr(head: bytes) -> bool:
+    """
+    True if head (the first 33 file bytes) starts a 16-bit RGB, RGBA or LA PNG.
+    """
+    if len(head) < 33 or head[:8] != _PNG_SIG or head[12:16] != b"IHDR":
+        return False
+    _, _, depth, color, _ = _ihdr_fields(head[16:29])
+    return depth == 16 and color in (2, 4, 6)
+
+def _png_chunks(f):
+    """
+    (chunk type, data) pairs of a PNG file positioned at its start, read lazily.
+    """
+    if f.read(8) != _PNG_SIG:
+        return
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            return
+        data = f.read(int.from_bytes(head[:4], "big"))
+        f.seek(4, io.SEEK_CUR)  # CRC
+        yield head[4:8], data
+
+def _png_predict(ftype: np.ndarray, a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """
+    PNG filter predictors, element-wise: ftype per element (broadcast), a/b/c the
+    left, upper and upper-left bytes as int16.
+    """
+    p = a + b - c
+    pa, pb, pc = np.abs(p - a), np.abs(p - b), np.abs(p - c)
+    paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+    return np.select([ftype == 1, ftype == 2, ftype == 3, ftype == 4], [a, b, (a + b) >> 1, paeth], 0)
+
+def _png_unfilter_wavefront(filt: np.ndarray, ftypes: np.ndarray, bpp: int) -> np.ndarray:
+    """
+    Undoes any mix of filters at once: pixel (r, i) only depends on (r, i - 1),
+    (r - 1, i) and (r - 1, i - 1), so every anti-diagonal r + i = d is one NumPy step
+    (height + width steps in all, instead of a Python loop per byte).
+    """
+    height, width = filt.shape[0], filt.shape[1] // bpp
+    filt = filt.reshape(height, width, bpp)
+    pad = np.zeros(((height + 1) * (width + 1), bpp), dtype=np.int16)  # zero top row and left column
+    for d in range(height + width - 1):
+        r = np.arange(max(0, d - width + 1), min(height, d + 1))
+        i = d - r
+        up = r * (width + 1) + i + 1  # pad position of (r - 1, i)
+        here = up + width + 1
+        a, b, c = pad[here - 1], pad[up], pad[up - 1]
+        pred = _png_predict(ftypes[r, None], a, b, c)
+        pad[here] = (filt[r, i] + pred) & 0xFF
+    return pad.reshape(height + 1, width + 1, bpp)[1:, 1:].astype(np.uint8).reshape(height, -1)
+
+def _png_unfilter_rows(raw: bytes, height: int, row_len: int, bpp: int) -> np.ndarray:
+    """
+    (height, row_len) scanlines from filtered PNG data (bpp whole bytes per pixel).
+    With only None/Sub/Up rows each row is one NumPy step; Average and Paeth rows,
+    which depend on the byte to their left, send the image through _png_unfilter_wavefront.
+    """
+    lines = np.frombuffer(raw, dtype=np.uint8, count=height * (row_len + 1)).reshape(height, row_len + 1)
+    ftypes = lines[:, 0]
+    if ftypes.size and ftypes.max() > 4:
+        raise ValueError(f"Bad PNG filter type {ftypes.max()}.")
+    if np.any(ftypes >= 3):
+        return _png_unfilter_wavefront(lines[:, 1:], ftypes, bpp)
+    out = np.empty((height, row_len), dtype=np.uint8)
+    prev = np.zeros(row_len, dtype=np.uint8)
+    for r in range(height):
+        ftype, cur = ftypes[r], lines[r, 1:]
+        if ftype == 0:
+            out[r] = cur
+        elif ftype == 1:
+            out[r] = np.cumsum(cur.reshape(-1, bpp), axis=0, dtype=np.uint8).reshape(-1)
+        else:
+            np.add(cur, prev, out=out[r])
+        prev = out[r]
+    return out
+
+def _read_png16(src) -> np.ndarray:
+    """
+    (H, W, C) uint16 array of a non-interlaced 16-bit RGB, RGBA or LA PNG, which
+    Pillow only opens reduced to 8 bits per sample.
+    """
+    f = open(src, "rb") if isinstance(src, (str, os.PathLike)) else io.BytesIO(as_byte_view(src))
+    with f:
+        ihdr, idat = None, []
+        for ctype, data in _png_chunks(f):
+            if ctype == b"IHDR":
+                ihdr = _ihdr_fields(data)
+            elif ctype == b"IDAT":
+                idat.append(data)
+            elif ctype == b"IEND":
+                break
+    if ihdr is None or not idat:
+        raise ValueError("Truncated or invalid PNG file.")
+    width, height, _, color, interlace = ihdr
+    if interlace:
+        raise ValueError("Interlaced 16-bit PNGs are not supported.")
+    channels = _PNG_CHANNELS[color]
+    row_len = width * channels * 2
+    try:
+        raw = zlib.decompress(b"".join(idat))
+    except zlib.error as e:
+        raise ValueError(f"Corrupted PNG image data ({e}).") from e
+    if len(raw) < height * (row_len + 1):
+        raise ValueError("Truncated PNG image data.")
+    rows = _png_unfilter_rows(raw, height, row_len, channels * 2)
+    return rows.view(">u2").reshape(height, width, channels).astype(np.uint16)
+
+def _png_leading(f, n_slots: int):
+    width = height = None
+    palette = trns = None
+    d = zlib.decompressobj()
+    raw = bytearray()
+    need = None
+    for ctype, data in _png_chunks(f):
+        if ctype == b"IHDR":
+            width, height, depth, color, interlace = _ihdr_fields(data)
+            if depth not in (8, 16) or color not in _PNG_CHANNELS or interlace != 0:
+                return None
+            bpp = _PNG_CHANNELS[color] * depth // 8
+            row_bytes = width * bpp
+        elif ctype == b"PLTE":
+            palette = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        elif ctype == b"tRNS":
+            trns = np.frombuffer(data, dtype=np.uint8)
+        elif ctype == b"IDAT":
+            if width is None:
+                return None
+            if need is None:  # palette images with tRNS load as RGBA
+                per_pixel = (4 if trns is not None else 3) if color == 3 else _PNG_CHANNELS[color]
+                n_pixels = min(-(-n_slots // per_pixel), width * height)
+                rows = -(-n_pixels // width)
+                need = rows * (1 + row_bytes)
+            raw += d.decompress(d.unconsumed_tail + data, need - len(raw))
+            while d.unconsumed_tail and len(raw) < need:
+                raw += d.decompress(d.unconsumed_tail, need - len(raw))
+            if len(raw) >= need:
+                break
+        elif ctype == b"IEND":
+            return None
+    if need is None or len(raw) < need:
+        return None
+
+    px = _png_unfilter_rows(bytes(raw[:need]), rows, row_bytes, bpp).reshape(-1, bpp)[:n_pixels]
+    if depth == 16:
+        return px[:, 1::2]  # big-endian samples: the low byte carries the LSB slot
+    if color != 3:
+        return px
+    if palette is None:
+        return None
+    rgb = palette[np.minimum(px[:, 0], len(palette) - 1)]
+    if trns is None:
+        return rgb
+    alpha = np.full(len(palette), 255, dtype=np.uint8)
+    alpha[:min(len(trns), len(palette))] = trns[:len(palette)]
+    return np.column_stack([rgb, alpha[np.minimum(px[:, 0], len(palette) - 1)]])
+
+def _bmp_leading_rgb(f, n_pixels: int):
+    head = f.read(54)
+    if len(head) < 54 or head[:2] != b"BM" or int.from_bytes(head[14:18], "little") < 40:
+        return None
+    offset = int.from_bytes(head[10:14], "little")
+    width = int.from_bytes(head[18:22], "little", signed=True)
+    height = int.from_bytes(head[22:26], "little", signed=True)
+    bits = int.from_bytes(head[28:30], "little")
+    compression = int.from_bytes(head[30:34], "little")
+    if bits != 24 or compression != 0 or width <= 0 or height == 0:
+        return None
+    top_down = height < 0
+    height = abs(height)
+    stride = ((width * bits + 31) // 32) * 4
+    n_pixels = min(n_pixels, width * height)
+    rows = -(-n_pixels // width)
+    out = []
+    for r in range(rows):
+        file_row = r if top_down else height - 1 - r
+        f.seek(offset + file_row * stride)
+        out.append(f.read(width * 3))
+    px = np.frombuffer(b"".join(out), dtype=np.uint8).reshape(-1, 3)[:n_pixels]
+    return px[:, ::-1]  # BGR -> RGB
+
+def read_leading_slots(path, n_slots: int):
+    """
+    First n_slots slots (same order as slot_view(load_pixels(path))) read without
+    decoding the whole image. path may also be encoded image bytes. Supports
+    non-interlaced 8/16-bit PNG and 24-bit uncompressed BMP; returns None for
+    anything else (other formats, PIL images, pixel arrays).
+    """
+    if isinstance(path, (bytes, bytearray, memoryview)):
+        f = io.BytesIO(path)
+    elif isinstance(path, (str, os.PathLike)):
+        f = open(path, "rb")
+    else:
+        return None
+    with f:
+        sig = f.read(8)
+        f.seek(0)
+        if sig == _PNG_SIG:
+            px = _png_leading(f, n_slots)
+        elif sig[:2] == b"BM":
+            px = _bmp_leading_rgb(f, -(-n_slots // 3))
+        else:
+            return None
+    if px is None:
+        return None
+    return np.ascontiguousarray(px).reshape(-1)[:n_slots]
@@ -0,0 +1,115 @@
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+_sink = None
+_memory = False
+
+class MemorySink:
+    """
+    Keeps records in a list (thread-safe append).
+    """
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict):
+        with self._lock:
+            self.records.append(record)
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+
+class JsonlSink:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict):
+        line = json.dumps(record)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+class LoggingSink:
+    def __init__(self, logger: logging.Logger = None, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger("app.core.instrument")
+        self.level = level
+
+    def emit(self, record: dict):
+        stages = " ".join(f"{s['stage']}={s['ms']:.1f}ms" for s in record["stages"])
+        self.logger.log(self.level, "%s total=%.1fms %s", record["op"], record["total_ms"], stages)
+
+def enable(sink, memory: bool = True):
+    """
+    Install sink for all subsequent encode/decode calls. Stages are the ones the
+    codecs report through progress.Reporter; while no sink is installed that costs
+    one None check per call. With memory=True, tracemalloc is started (if needed)
+    and each stage also reports its peak allocation.
+    """
+    global _sink, _memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _sink, _memory = sink, memory
+
+def disable():
+    global _sink, _memory
+    _sink, _memory = None, False
+
+def enabled() -> bool:
+    return _sink is not None
+
+@contextmanager
+def instrumented(sink, memory: bool = True):
+    prev = (_sink, _memory)
+    enable(sink, memory)
+    try:
+        yield sink
+    finally:
+        enable(*prev) if prev[0] is not None else disable()
+
+class OpRecorder:
+    """
+    Collects wall time (and peak traced bytes) per stage of one operation.
+    """
+    def __init__(self, op: str):
+        self.op = op
+        self.sink = _sink
+        self.memory = _memory and tracemalloc.is_tracing()
+        self.stages = []
+        self._name = None
+        self._t_op = time.perf_counter()
+
+    def _close(self):
+        if self._name is None:
+            return
+        rec = {"stage": self._name, "ms": round((time.perf_counter() - self._t0) * 1000, 3)}
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            rec["peak_bytes"] = max(0, peak - self._mem0)
+        self.stages.append(rec)
+        self._name = None
+
+    def enter(self, name: str):
+        self._close()
+        self._name = name
+        if self.memory:
+            tracemalloc.reset_peak()
+            self._mem0 = tracemalloc.get_traced_memory()[0]
+        self._t0 = time.perf_counter()
+
+    def finish(self):
+        self._close()
+        self.sink.emit({"op": self.op, "total_ms": round((time.perf_counter() - self._t_op) * 1000, 3),
+                        "stages": self.stages})
+
+def recorder(op: str):
+    """
+    OpRecorder for op, or None when instrumentation is disabled.
+    """
+    if _sink is None or op is None:
+        return None
+    return OpRecorder(op)
@@ -0,0 +1,218 @@
+import numpy as np
+
+# Byte b <-> 8 consecutive channel LSBs viewed as one little-endian uint64:
+# slot m of the group carries bit (7 - m) of b (MSB first, same order as np.unpackbits).
+_LSB_MASK = np.uint64(0x0101010101010101)
+_KEEP_MASK = np.uint64(0xFEFEFEFEFEFEFEFE)
+_SPREAD = np.uint64(0x8040201008040201)
+_S7 = np.uint64(7)
+_S56 = np.uint64(56)
+
+CHUNK_BYTES = 1 << 16  # payload bytes handled per step; bounds temporaries to ~1 MB
+
+def _as_bytes(data) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.uint8)
+
+def _spread(part: np.ndarray) -> np.ndarray:
+    """
+    Payload bytes -> uint64 groups holding one bit in the LSB of each byte.
+    """
+    x = part.astype(np.uint64)
+    x *= _SPREAD
+    x >>= _S7
+    x &= _LSB_MASK
+    return x
+
+def _pack_groups(groups: np.ndarray) -> np.ndarray:
+    """
+    uint64 groups of 8 slots -> payload bytes.
+    """
+    x = groups & _LSB_MASK
+    x *= _SPREAD
+    x >>= _S56
+    return x.astype(np.uint8)
+
+def _slot_block(flat, start: int, n_bytes: int):
+    if not isinstance(flat, np.ndarray):  # remapped slot stream (raw_pixels), no direct view
+        return None
+    blk = flat[start:start + n_bytes * 8]
+    if blk.flags.c_contiguous:
+        return blk.view(np.uint64)
+    return None
+
+def _write_groups(words: np.ndarray, part: np.ndarray) -> np.ndarray:
+    """
+    Replaces the LSBs of words (in place) with the bits of part; returns the
+    per-slot flip mask (one uint8 0/1 per slot).
+    """
+    bits = _spread(part)
+    flips = words & _LSB_MASK
+    words &= _KEEP_MASK
+    words |= bits
+    flips ^= bits
+    return flips.view(np.uint8)
+
+def embed_seq(flat: np.ndarray, start: int, data, step=None, delta=None) -> None:
+    """
+    Writes data into the LSBs of flat[start : start + 8 * len(data)] in place,
+    eight slots per uint64 word. step(n_bytes) is called after each chunk;
+    delta (metrics.SlotDelta) receives the indices of slots that changed.
+    """
+    src = _as_bytes(data)
+    for off in range(0, len(src), CHUNK_BYTES):
+        part = src[off:off + CHUNK_BYTES]
+        pos = start + off * 8
+        words = _slot_block(flat, pos, len(part))
+        if words is None:
+            tmp = np.ascontiguousarray(flat[pos:pos + len(part) * 8]).view(np.uint64)
+            flips = _write_groups(tmp, part)
+            flat[pos:pos + len(part) * 8] = tmp.view(np.uint8)
+        else:
+            flips = _write_groups(words, part)
+        if delta is not None:
+            delta.add(np.flatnonzero(flips) + pos, len(flips))
+        if step is not None:
+            step(len(part))
+
+def extract_seq(flat: np.ndarray, start: int, n_bytes: int, step=None) -> bytes:
+    out = np.empty(n_bytes, dtype=np.uint8)
+    for off in range(0, n_bytes, CHUNK_BYTES):
+        n = min(CHUNK_BYTES, n_bytes - off)
+        pos = start + off * 8
+        words = _slot_block(flat, pos, n)
+        if words is None:
+            words = np.ascontiguousarray(flat[pos:pos + n * 8]).view(np.uint64)
+        out[off:off + n] = _pack_groups(words)
+        if step is not None:
+            step(n)
+    return out.tobytes()
+
+def shift_slots(slots, bit_off: int):
+    """
+    The slot source for payload bits starting at bit_off (array view or wrapped callable).
+    """
+    if callable(slots):
+        return lambda off, n: slots(bit_off + off, n)
+    return slots[bit_off:]
+
+def _chunk_slots(slots, bit_off: int, n_bits: int) -> np.ndarray:
+    if callable(slots):
+        return slots(bit_off, n_bits)
+    return slots[bit_off:bit_off + n_bits]
+
+def embed_at(flat: np.ndarray, slots, data, step=None, delta=None) -> None:
+    """
+    Writes data into the LSBs of flat at the given slot indices (MSB first).
+    slots is an index array or a callable (bit_offset, n_bits) -> indices, so
+    index generation can be chunked together with the embedding.
+    """
+    src = _as_bytes(data)
+    for off in range(0, len(src), CHUNK_BYTES):
+        part = src[off:off + CHUNK_BYTES]
+        idx = _chunk_slots(slots, off * 8, len(part) * 8)
+        groups = flat[idx].view(np.uint64)
+        flips = _write_groups(groups, part)
+        flat[idx] = groups.view(np.uint8)
+        if delta is not None:
+            delta.add(idx[flips.view(bool)], len(idx))
+        if step is not None:
+            step(len(part))
+
+def extract_at(flat: np.ndarray, slots, n_bytes: int, step=None) -> bytes:
+    out = np.empty(n_bytes, dtype=np.uint8)
+    for off in range(0, n_bytes, CHUNK_BYTES):
+        n = min(CHUNK_BYTES, n_bytes - off)
+        idx = _chunk_slots(slots, off * 8, n * 8)
+        out[off:off + n] = _pack_groups(flat[idx].view(np.uint64))
+        if step is not None:
+            step(n)
+    return out.tobytes()
+
+# k-bit slots: payload bit i (MSB first) goes to bit k - 1 - i % k of slot i // k,
+# so a byte spans 8 / k slots for k = 1, 2, 4 and symbols straddle bytes for k = 3.
+MAX_BITS = 4
+
+def _bit_weights(k: int) -> np.ndarray:
+    return np.arange(k - 1, -1, -1, dtype=np.uint8)
+
+def _symbols_to_bits(sym: np.ndarray, k: int) -> np.ndarray:
+    return ((sym[:, None] >> _bit_weights(k)) & 1).reshape(-1)
+
+def _bits_to_symbols(bits: np.ndarray, k: int) -> np.ndarray:
+    return np.bitwise_or.reduce(bits.reshape(-1, k) << _bit_weights(k), axis=1)
+
+def _k_slots(slots, s0: int, n: int):
+    """
+    Slots s0 .. s0 + n of a k-bit slot source: a slice for a contiguous run starting
+    at an int position, otherwise as _chunk_slots.
+    """
+    if isinstance(slots, (int, np.integer)):
+        return slice(slots + s0, slots + s0 + n)
+    return _chunk_slots(slots, s0, n)
+
+def _k_span(bit_off: int, n_bytes: int, k: int):
+    b0 = bit_off
+    s0, s1 = b0 // k, -(-(b0 + n_bytes * 8) // k)
+    return s0, s1, b0 - s0 * k, s1 * k - b0 - n_bytes * 8  # slots, unused leading / trailing bits
+
+def embed_k(flat, slots, bit_off: int, data, k: int, step=None, delta=None) -> None:
+    """
+    Writes data into the low k bits of flat, k payload bits per slot, starting at
+    payload bit bit_off of the slot source (an int start position for a contiguous
+    run, an index array or a callable as in embed_at, indexed per slot). Whole bytes
+    are split into symbols with one shift-and-mask when k divides 8; otherwise, and
+    for the slots shared with neighbouring bits at either end, through a bit array.
+    delta receives the changed slots with their squared error.
+    """
+    if k == 1:
+        if isinstance(slots, (int, np.integer)):
+            return embed_seq(flat, slots + bit_off, data, step, delta)
+        return embed_at(flat, shift_slots(slots, bit_off), data, step, delta)
+    src = _as_bytes(data)
+    mask = np.uint8((1 << k) - 1)
+    shifts = np.arange(8 - k, -1, -k, dtype=np.uint8)
+    per_step = CHUNK_BYTES - CHUNK_BYTES % k  # keeps step boundaries on slot boundaries
+    for off in range(0, len(src), per_step):
+        part = src[off:off + per_step]
+        s0, s1, lead, tail = _k_span(bit_off + off * 8, len(part), k)
+        where = _k_slots(slots, s0, s1 - s0)
+        cur = flat[where]
+        if lead == 0 and tail == 0 and 8 % k == 0:
+            sym = ((part[:, None] >> shifts) & mask).reshape(-1)
+        else:
+            bits = _symbols_to_bits(cur & mask, k)
+            bits[lead:lead + len(part) * 8] = np.unpackbits(part)
+            sym = _bits_to_symbols(bits, k)
+        new = (cur & ~mask) | sym
+        if delta is not None:
+            changed = np.flatnonzero(new != cur)
+            err = new[changed].astype(np.int32) - cur[changed]
+            pos = changed + where.start if isinstance(where, slice) else where[changed]
+            delta.add(pos, len(part) * 8, err * err)
+        flat[where] = new
+        if step is not None:
+            step(len(part))
+
+def extract_k(flat, slots, bit_off: int, n_bytes: int, k: int, step=None) -> bytes:
+    """
+    Reads n_bytes written by embed_k with the same slot source, bit_off and k.
+    """
+    if k == 1:
+        if isinstance(slots, (int, np.integer)):
+            return extract_seq(flat, slots + bit_off, n_bytes, step)
+        return extract_at(flat, shift_slots(slots, bit_off), n_bytes, step)
+    out = np.empty(n_bytes, dtype=np.uint8)
+    mask = np.uint8((1 << k) - 1)
+    shifts = np.arange(8 - k, -1, -k, dtype=np.uint8)
+    per_step = CHUNK_BYTES - CHUNK_BYTES % k
+    for off in range(0, n_bytes, per_step):
+        n = min(per_step, n_bytes - off)
+        s0, s1, lead, tail = _k_span(bit_off + off * 8, n, k)
+        sym = flat[_k_slots(slots, s0, s1 - s0)] & mask
+        if lead == 0 and tail == 0 and 8 % k == 0:
+            out[off:off + n] = np.bitwise_or.reduce(sym.reshape(-1, 8 // k) << shifts, axis=1)
+        else:
+            out[off:off + n] = np.packbits(_symbols_to_bits(sym, k)[lead:lead + n * 8])
+        if step is not None:
+            step(n)
+    return out.tobytes()
@@ -0,0 +1,91 @@
+import hashlib
+import numpy as np
+
+FEISTEL_ROUNDS = 6
+BLOCK = 1 << 18  # positions evaluated per batch, keeps temporaries cache-sized
+
+_M1 = np.uint64(0x9E3779B97F4A7C15)
+_M2 = np.uint64(0xBF58476D1CE4E5B9)
+_S29 = np.uint64(29)
+_S32 = np.uint64(32)
+
+def _round_keys(seed: bytes, rounds: int = FEISTEL_ROUNDS) -> np.ndarray:
+    keys = []
+    for r in range(rounds):
+        d = hashlib.sha256(seed + b"perm" + bytes([r])).digest()
+        keys.append(int.from_bytes(d[:8], "little"))
+    return np.array(keys, dtype=np.uint64)
+
+def _split_bits(domain: int):
+    bits = max(2, (domain - 1).bit_length())
+    return bits - bits // 2, bits // 2
+
+def _mix(v: np.ndarray, k: np.uint64, out: np.ndarray) -> np.ndarray:
+    np.bitwise_xor(v, k, out=out)
+    out *= _M1
+    out ^= out >> _S29
+    out *= _M2
+    out ^= out >> _S32
+    return out
+
+def _feistel(x: np.ndarray, keys: np.ndarray, lbits: int, rbits: int) -> np.ndarray:
+    """
+    Alternating (unbalanced) Feistel network on lbits + rbits bit values.
+    Each round xors one side with a keyed mix of the other, so it stays a
+    bijection for odd bit widths and the walk domain is < 2 * domain.
+    """
+    sh = np.uint64(rbits)
+    lmask = np.uint64((1 << lbits) - 1)
+    rmask = np.uint64((1 << rbits) - 1)
+    left = x >> sh
+    right = x & rmask
+    f = np.empty_like(x)
+    for i, k in enumerate(keys):
+        if i % 2 == 0:
+            left ^= _mix(right, k, f) & lmask
+        else:
+            right ^= _mix(left, k, f) & rmask
+    left <<= sh
+    left |= right
+    return left
+
+class KeyedPermutation:
+    """
+    Keyed bijection on [0, domain) built from a Feistel network with
+    cycle-walking. Any slice of the permutation can be evaluated without
+    materializing the whole domain.
+    """
+    def __init__(self, seed: bytes, domain: int):
+        if domain <= 0:
+            raise ValueError("Permutation domain must be positive.")
+        self.domain = domain
+        self._lbits, self._rbits = _split_bits(domain)
+        self._keys = _round_keys(seed)
+
+    def _apply(self, x: np.ndarray) -> np.ndarray:
+        y = _feistel(x, self._keys, self._lbits, self._rbits)
+        n = np.uint64(self.domain)
+        out = np.flatnonzero(y >= n)
+        while len(out):
+            y[out] = _feistel(y[out], self._keys, self._lbits, self._rbits)
+            out = out[y[out] >= n]
+        return y
+
+    def __getitem__(self, positions) -> np.ndarray:
+        x = np.asarray(positions, dtype=np.uint64).reshape(-1)
+        res = np.empty(len(x), dtype=np.int64)
+        for i in range(0, len(x), BLOCK):
+            res[i:i + BLOCK] = self._apply(x[i:i + BLOCK])
+        return res
+
+    def take(self, start: int, count: int) -> np.ndarray:
+        """
+        Permuted values of positions [start, start + count).
+        """
+        if start < 0 or count < 0 or start + count > self.domain:
+            raise ValueError("Requested range exceeds permutation domain.")
+        res = np.empty(count, dtype=np.int64)
+        for i in range(0, count, BLOCK):
+            n = min(BLOCK, count - i)
+            res[i:i + n] = self._apply(np.arange(start + i, start + i + n, dtype=np.uint64))
+        return res
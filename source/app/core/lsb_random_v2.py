@@ -1,14 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+import hashlib
+import hmac
 import os
 import numpy as np
-from PIL import Image
 
-from .crypto_utils import SALT_LEN, kdf_seed, crc32_bytes
-from .metrics import psnr
+from .compression import CODEC_NAMES, DecompressingSink, check_codec, compress_source
+from .crypto_utils import SALT_LEN, KDF_CACHE, kdf_seed, crc32_combine
+from .image_io import as_byte_view, encode_image_bytes, image_slots, load_pixels, read_leading_slots, slot_view
+from .kernels import MAX_BITS, embed_at, embed_k, embed_seq, extract_at, extract_k, extract_seq, shift_slots
+from .keyed_perm import KeyedPermutation
+from .metrics import PIXEL_MAX, QualityMetrics, SlotDelta, sample_peak
+from .payload_stream import PayloadSink, PayloadSource, embed_chunks, extract_chunks
+from .writer import write_image
+from .raw_pixels import copy_for_output, open_raw, raw_output
+from .progress import DECODE_STAGES, ENCODE_STAGES, NULL_REPORTER, Reporter
 
 MAGIC = b"ST"
-ALG_VER = 1
+ALG_VER = 1        # full shuffle of every slot
+ALG_VER_LAZY = 2   # keyed Feistel permutation, only payload slots generated
+ALG_VER_CHECKED = 3  # as v2, plus a key-check tag so wrong passphrases fail before extraction
+ALG_VER_SHARDED = 4  # as v3, slot space split into independently keyed shards processed in parallel
+ALG_VER_COMPRESSED = 5  # as v4, payload compressed; header adds codec id and uncompressed length
+ALG_VER_KBIT = 6   # as v5 (codec 0 when stored), plus the payload bits per slot
+# Modes and the options that change the header version (encode_v2):
+# - shards: mode="sharded" only, DEFAULT_SHARDS when not given.
+# - compress="zlib" | "bz2" | "lzma" | "auto" (+ compress_level): v5 over the v4 slot layout;
+#   more than one shard only with mode="sharded". "auto" tries each codec on the first
+#   256 KiB and keeps the best, or none when nothing saves at least 3%.
+# - bits=2..4: v6, that many payload bits per sample, about bits times the capacity for
+#   a lower PSNR. adaptive=True makes bits the maximum and picks 1..bits per run of
+#   TEXTURE_RUN samples from the local texture (_texture_bits); a single shard.
+# Covers keep their pixel mode (L, LA, RGB, RGBA, 16-bit; image_io.load_pixels): alpha
+# samples carry payload too, 16-bit ones in their low byte, and 16-bit color needs PNG.
+MODES = {"shuffle": ALG_VER, "lazy": ALG_VER_LAZY, "checked": ALG_VER_CHECKED, "sharded": ALG_VER_SHARDED}
 HEADER_FIXED_LEN = 2 + 1 + 1 + 4 + 4 + SALT_LEN  # 28 bytes
+KEY_TAG_LEN = 4
+TAGGED_VERSIONS = (ALG_VER_CHECKED, ALG_VER_SHARDED, ALG_VER_COMPRESSED, ALG_VER_KBIT)
+SHARDED_VERSIONS = (ALG_VER_SHARDED, ALG_VER_COMPRESSED, ALG_VER_KBIT)
+CODEC_VERSIONS = (ALG_VER_COMPRESSED, ALG_VER_KBIT)
+HEADER_LEN = {ALG_VER: HEADER_FIXED_LEN, ALG_VER_LAZY: HEADER_FIXED_LEN,
+              ALG_VER_CHECKED: HEADER_FIXED_LEN + KEY_TAG_LEN,
+              ALG_VER_SHARDED: HEADER_FIXED_LEN + KEY_TAG_LEN + 1,
+              ALG_VER_COMPRESSED: HEADER_FIXED_LEN + KEY_TAG_LEN + 1 + 1 + 8,
+              ALG_VER_KBIT: HEADER_FIXED_LEN + KEY_TAG_LEN + 1 + 1 + 8 + 1}
+MAX_SHARDS = 255
+DEFAULT_SHARDS = 4  # mode="sharded" without shards=; fixed so output does not depend on the host
+HEADER_PREFIX_LEN = 4  # MAGIC + version + salt length
+HEADER_MAX_LEN = max(HEADER_LEN.values())
+BITS_ADAPTIVE = 0x80  # v6 bits byte flag: bits per slot chosen per run from local texture, up to the low bits
+TEXTURE_RUN = 64      # slots per run of the adaptive texture map
+TEXTURE_LAG = 12      # slot distance compared in a run: the same channel for 1..4 interleaved channels
+
+class KeyCheckError(ValueError):
+    """
+    Raised when the passphrase does not match the header key-check tag.
+    """
+
+@dataclass
+class Header:
+    magic: bytes
+    ver: int
+    salt_len: int
+    payload_len: int
+    crc: int
+    salt: bytes
+    tag: bytes = b""
+    shards: int = 1
+    codec: int = 0    # compression.CODECS id; 0 = stored as-is
+    raw_len: int = 0  # payload length after decompression (payload_len when not compressed)
+    bits: int = 1     # payload bits per slot (v6; | BITS_ADAPTIVE for the texture-adaptive layout)
 
 @dataclass
 class EncodeResult:
@@ -16,34 +77,16 @@ class EncodeResult:
     capacity_bytes: int
     used_bytes: int
     psnr_db: float
+    quality: QualityMetrics = None  # delta-based metrics (changed slots, per-channel MSE)
+    compression: str = "none"       # codec used for the embedded bytes (see compression.CODECS)
 
 @dataclass
 class DecodeResult:
     output_path: str
     payload_len: int
     crc_ok: bool
-
-def _to_bits(data: bytes) -> np.ndarray:
-    arr = np.frombuffer(data, dtype=np.uint8)
-    bits = np.unpackbits(arr)
-    return bits
-
-def _bits_to_bytes(bits: np.ndarray) -> bytes:
-    if len(bits) % 8 != 0:
-        pad = 8 - (len(bits) % 8)
-        bits = np.concatenate([bits, np.zeros(pad, dtype=np.uint8)])
-    arr = np.packbits(bits)
-    return arr.tobytes()
-
-def _open_rgb(path: str) -> Image.Image:
-    img = Image.open(path)
-    return img.convert("RGB")
-
-def _img_to_array(img: Image.Image) -> np.ndarray:
-    return np.array(img, dtype=np.uint8)
-
-def _array_to_img(arr: np.ndarray) -> Image.Image:
-    return Image.fromarray(arr, mode="RGB")
+    kdf_cache_hits: int = 0    # KDF_CACHE lookups of this decode (process totals: KDF_CACHE.stats())
+    kdf_cache_misses: int = 0
 
 def _rng_from_seed(seed_bytes: bytes) -> np.random.Generator:
     if len(seed_bytes) < 16:
@@ -53,117 +96,529 @@ def _rng_from_seed(seed_bytes: bytes) -> np.random.Generator:
     bitgen = np.random.PCG64(seed=(s0, s1))
     return np.random.Generator(bitgen)
 
-def capacity_bytes_for_image(path: str) -> int:
-    img = _open_rgb(path)
-    w, h = img.size
-    total_slots = w * h * 3  # 1 bit per channel
-    cap_bytes = (total_slots // 8) - HEADER_FIXED_LEN
+def capacity_bytes_for_image(path: str, mode: str = "shuffle", shards: int = None, bits: int = 1,
+                             adaptive: bool = False) -> int:
+    """
+    bits / adaptive as in encode_v2; the adaptive capacity depends on the pixels, so
+    only that case decodes the image.
+    """
+    code = _bits_code(bits, adaptive)
+    ver = _mode_version(mode) if code == 1 else ALG_VER_KBIT
+    if code & BITS_ADAPTIVE:
+        flat = slot_view(load_pixels(path))
+        return _adaptive_capacity(_texture_bits(flat, _first_run(HEADER_LEN[ver] * 8), bits))
+    total_slots = image_slots(path)
+    if ver in SHARDED_VERSIONS:
+        shards = _shard_count(shards) if mode == "sharded" else 1
+        return _shard_capacity(max(0, total_slots - HEADER_LEN[ver] * 8), shards, bits)
+    cap_bytes = (total_slots // 8) - HEADER_LEN[ver]
     return max(0, cap_bytes)
 
-def _build_header(payload: bytes, salt: bytes) -> bytes:
-    payload_len = len(payload)
-    crc = crc32_bytes(payload)
+def _bits_code(bits: int, adaptive: bool = False) -> int:
+    """
+    The v6 header bits byte for bits payload bits per slot (1 = the plain LSB versions).
+    """
+    if not 1 <= bits <= MAX_BITS:
+        raise ValueError(f"bits must be in 1..{MAX_BITS}.")
+    if adaptive:
+        if bits == 1:
+            raise ValueError("Adaptive embedding needs bits >= 2 (the most bits per slot).")
+        return BITS_ADAPTIVE | bits
+    return bits
+
+def _mode_version(mode: str) -> int:
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}. Expected one of: {', '.join(MODES)}.")
+    return MODES[mode]
+
+def _derive_key(passphrase: str, salt: bytes, ver: int):
+    """
+    (seed, key-check tag) from one KDF call; the tag is empty for versions without one.
+    """
+    if ver in TAGGED_VERSIONS:
+        dk = kdf_seed(passphrase, salt, out_bytes=16 + KEY_TAG_LEN)
+        return dk[:16], dk[16:]
+    return kdf_seed(passphrase, salt, out_bytes=16), b""
+
+def _build_header(payload_len: int, crc: int, salt: bytes, ver: int = ALG_VER, tag: bytes = b"",
+                  shards: int = 1, codec: int = 0, raw_len: int = 0, bits: int = 1) -> bytes:
     header = bytearray()
     header += b"ST"                          # 2B
-    header += bytes([ALG_VER])               # 1B
+    header += bytes([ver])                   # 1B
     header += bytes([SALT_LEN])              # 1B
     header += payload_len.to_bytes(4, "big") # 4B
     header += crc.to_bytes(4, "big")         # 4B
     header += salt                           # 16B
+    if ver in TAGGED_VERSIONS:
+        header += tag                        # 4B key-check tag
+    if ver in SHARDED_VERSIONS:
+        header += bytes([shards])            # 1B shard manifest (count)
+    if ver in CODEC_VERSIONS:
+        header += bytes([codec])             # 1B compression codec id
+        header += raw_len.to_bytes(8, "big") # 8B uncompressed length
+    if ver == ALG_VER_KBIT:
+        header += bytes([bits])              # 1B bits per slot (| BITS_ADAPTIVE)
     return bytes(header)
 
-def _parse_header(header_bytes: bytes):
+def _parse_header(header_bytes: bytes) -> Header:
     magic = header_bytes[0:2]
     ver = header_bytes[2]
     salt_len = header_bytes[3]
     payload_len = int.from_bytes(header_bytes[4:8], "big")
     crc = int.from_bytes(header_bytes[8:12], "big")
     salt = header_bytes[12:12+salt_len]
-    return magic, ver, salt_len, payload_len, crc, salt
-
-def _lsb_embed_at_indices(flat, bit_indices, bits):
-    flat[bit_indices] = (flat[bit_indices] & 0xFE) | bits
-
-def _lsb_read_at_indices(flat, bit_indices):
-    return flat[bit_indices] & 1
-
-def encode_v2(cover_path: str, payload_path: str, passphrase: str, out_path: str) -> EncodeResult:
-    cover_img = _open_rgb(cover_path)
-    arr = _img_to_array(cover_img)
-    H, W, C = arr.shape
-    assert C == 3
-
-    with open(payload_path, "rb") as f:
-        payload = f.read()
-
-    total_slots = H * W * C
-    flat = arr.reshape(-1)
-
-    salt = os.urandom(SALT_LEN)
-    header = _build_header(payload, salt)
-    header_bits = _to_bits(header)
-
-    cap_bytes = (total_slots // 8) - len(header)
-    if len(payload) > cap_bytes:
-        raise ValueError(f"Payload too large. Capacity ~{cap_bytes} bytes (excludes 28B header).")
-
-    # Stage 1: header sequential at the beginning
-    header_bit_indices = np.arange(len(header_bits), dtype=np.int64)
-    _lsb_embed_at_indices(flat, header_bit_indices, header_bits)
-
-    # Stage 2: payload randomized after header region
-    payload_bits = _to_bits(payload)
-    remaining_slots = np.arange(len(flat), dtype=np.int64)[len(header_bits):]
-    seed = kdf_seed(passphrase, salt, out_bytes=16)
-    rng = _rng_from_seed(seed)
-    rng.shuffle(remaining_slots)
-    payload_bit_indices = remaining_slots[:len(payload_bits)]
-    _lsb_embed_at_indices(flat, payload_bit_indices, payload_bits)
-
-    stego_arr = flat.reshape(H, W, C)
-    p = psnr(arr, stego_arr)
-    Image.fromarray(stego_arr, "RGB").save(out_path, format="PNG")
-
-    used_bytes = len(header) + len(payload)
-    return EncodeResult(stego_path=out_path, capacity_bytes=cap_bytes, used_bytes=used_bytes, psnr_db=float(p))
-
-def decode_v2(stego_path: str, passphrase: str, out_dir: str) -> DecodeResult:
-    stego_img = _open_rgb(stego_path)
-    arr = _img_to_array(stego_img)
-    H, W, C = arr.shape
-    assert C == 3
-
-    flat = arr.reshape(-1)
-
-    # Stage 1: read header sequentially
-    header_bits_len = (2 + 1 + 1 + 4 + 4 + 16) * 8
-    header_bit_indices = np.arange(header_bits_len, dtype=np.int64)
-    header_bits = _lsb_read_at_indices(flat, header_bit_indices).astype(np.uint8)
-    header = _bits_to_bytes(header_bits)
-
-    magic, ver, salt_len, payload_len, crc, salt = _parse_header(header)
-    if magic != b"ST":
+    tag = header_bytes[12+salt_len:12+salt_len+KEY_TAG_LEN] if ver in TAGGED_VERSIONS else b""
+    shards = header_bytes[12+salt_len+KEY_TAG_LEN] if ver in SHARDED_VERSIONS else 1
+    codec, raw_len, bits = 0, payload_len, 1
+    pos = 12 + salt_len + KEY_TAG_LEN + 1
+    if ver in CODEC_VERSIONS:
+        codec, raw_len = header_bytes[pos], int.from_bytes(header_bytes[pos+1:pos+9], "big")
+    if ver == ALG_VER_KBIT:
+        bits = header_bytes[pos+9]
+    return Header(magic, ver, salt_len, payload_len, crc, salt, tag, shards, codec, raw_len, bits)
+
+def _read_header(flat: np.ndarray) -> Header:
+    """
+    Reads and validates the sequential header at the start of the slot stream.
+    """
+    if len(flat) < HEADER_PREFIX_LEN * 8:
+        raise ValueError("Image too small for header.")
+    prefix = extract_seq(flat, 0, HEADER_PREFIX_LEN)
+    if prefix[0:2] != MAGIC:
         raise ValueError("Not a valid stego image (MAGIC mismatch).")
-    if ver != 1 or salt_len != 16:
+    if prefix[2] not in HEADER_LEN or prefix[3] != SALT_LEN:
         raise ValueError("Unsupported version or salt length.")
+    header_bits_len = HEADER_LEN[prefix[2]] * 8
+    if header_bits_len > len(flat):
+        raise ValueError("Image too small for header.")
+    return _parse_header(extract_seq(flat, 0, header_bits_len // 8))
+
+def _check_key(header: Header, passphrase: str) -> bytes:
+    """
+    Derives the payload seed and rejects a wrong passphrase when the header carries a tag.
+    """
+    seed, tag = _derive_key(passphrase, header.salt, header.ver)
+    if header.tag and not hmac.compare_digest(tag, header.tag):
+        raise KeyCheckError("Wrong passphrase (key-check tag mismatch).")
+    return seed
+
+def _permutation_slots(perm: KeyedPermutation, offset: int):
+    """
+    Slot source for the kernels: payload bit range -> permuted slot indices shifted by offset.
+    """
+    def slots(bit_off, n_bits):
+        return perm.take(bit_off, n_bits) + offset
+    return slots
+
+def _payload_slots(ver: int, seed: bytes, total_slots: int, header_bits_len: int, n_bits: int,
+                   passphrase=None, salt: bytes = None):
+    """
+    Slots carrying the first n_bits payload bits for the given header version: an index
+    array (full shuffle) or a chunked slot source (lazy permutation, see kernels.embed_at).
+    With passphrase/salt given, the full shuffle is served from KDF_CACHE when slot caching is on.
+    """
+    if ver in (ALG_VER_LAZY, ALG_VER_CHECKED):
+        return _permutation_slots(KeyedPermutation(seed, total_slots - header_bits_len), header_bits_len)
+
+    def build():
+        remaining_slots = np.arange(total_slots, dtype=np.int64)[header_bits_len:]
+        rng = _rng_from_seed(seed)
+        rng.shuffle(remaining_slots)
+        return remaining_slots
+
+    if passphrase is None:
+        return build()[:n_bits]
+    order = KDF_CACHE.slot_order(passphrase, salt, (ver, total_slots, header_bits_len), build)
+    return order[:n_bits]
+
+def _shard_layout(n_slots: int, shards: int):
+    """
+    [start, stop) of each shard over the post-header slot domain of n_slots slots.
+    """
+    size = n_slots // shards
+    return [(i * size, n_slots if i == shards - 1 else (i + 1) * size) for i in range(shards)]
+
+def _shard_chunks(payload_len: int, shards: int):
+    """
+    [start, stop) byte range of the payload carried by each shard.
+    """
+    chunk = -(-payload_len // shards)
+    return [(min(i * chunk, payload_len), min((i + 1) * chunk, payload_len)) for i in range(shards)]
+
+def _shard_seed(seed: bytes, index: int) -> bytes:
+    return hashlib.sha256(seed + b"shard" + index.to_bytes(2, "big")).digest()[:16]
+
+def _shard_capacity(n_slots: int, shards: int, bits: int = 1) -> int:
+    return (n_slots // shards * bits // 8) * shards
+
+def _shard_slots(seed: bytes, header_bits_len: int, region, index: int):
+    start, stop = region
+    return _permutation_slots(KeyedPermutation(_shard_seed(seed, index), stop - start), header_bits_len + start)
+
+def _run_shards(fn, shards: int, workers: int = None):
+    if shards <= 1:
+        return [fn(i) for i in range(shards)]
+    with ThreadPoolExecutor(max_workers=workers or min(shards, os.cpu_count() or 1)) as ex:
+        return list(ex.map(fn, range(shards)))
+
+def _combine_crcs(crcs, chunks) -> int:
+    crc = 0
+    for c, (c0, c1) in zip(crcs, chunks):
+        crc = crc32_combine(crc, c, c1 - c0)
+    return crc
+
+def _first_run(header_bits_len: int) -> int:
+    return -(-header_bits_len // TEXTURE_RUN)
+
+def _texture_bits(flat, first_run: int, max_bits: int) -> np.ndarray:
+    """
+    Payload bits per slot for each run of TEXTURE_RUN consecutive slots from run
+    first_run on: floor(log2) of the run's mean absolute difference between slots
+    TEXTURE_LAG apart, clipped to 1..max_bits, so smooth runs keep one bit and noisy
+    ones take up to max_bits. Only the sample bits above the low max_bits enter the
+    estimate; embedding leaves them alone, so the decoder rebuilds the same map.
+    """
+    n_runs = max(0, len(flat) // TEXTURE_RUN - first_run)
+    out = np.empty(n_runs, dtype=np.uint8)
+    block = 1 << 14  # runs per pass, bounds the temporaries
+    for r0 in range(0, n_runs, block):
+        r1 = min(n_runs, r0 + block)
+        v = np.asarray(flat[(first_run + r0) * TEXTURE_RUN:(first_run + r1) * TEXTURE_RUN]) >> max_bits
+        v = v.reshape(-1, TEXTURE_RUN).astype(np.int16)
+        activity = np.abs(v[:, TEXTURE_LAG:] - v[:, :-TEXTURE_LAG]).mean(axis=1, dtype=np.float32)
+        out[r0:r1] = np.clip(np.log2(np.maximum(activity * (1 << max_bits), 1.0)), 1, max_bits)
+    return out
+
+def _adaptive_capacity(run_bits: np.ndarray) -> int:
+    return sum(int(np.count_nonzero(run_bits == k)) * TEXTURE_RUN * k // 8 for k in range(1, MAX_BITS + 1))
+
+def _run_slots(seed: bytes, runs: np.ndarray, bits: int):
+    """
+    Keyed order over the slots of the given runs: slot j of the level is slot
+    j % TEXTURE_RUN of run runs[j // TEXTURE_RUN].
+    """
+    perm = KeyedPermutation(hashlib.sha256(seed + b"bits" + bytes([bits])).digest()[:16], len(runs) * TEXTURE_RUN)
+
+    def slots(off, n):
+        idx = perm.take(off, n)
+        return runs[idx // TEXTURE_RUN] * TEXTURE_RUN + idx % TEXTURE_RUN
+    return slots
+
+def _adaptive_parts(flat, seed: bytes, header_bits_len: int, code: int, payload_len: int = None):
+    """
+    Texture-adaptive layout: one part per bits level, from the most bits per slot
+    down, each filled before the next. Returns (parts, capacity_bytes); payload_len
+    defaults to the capacity.
+    """
+    first_run = _first_run(header_bits_len)
+    run_bits = _texture_bits(flat, first_run, code & ~BITS_ADAPTIVE)
+    capacity = _adaptive_capacity(run_bits)
+    payload_len = capacity if payload_len is None else payload_len
+    parts, c0 = [], 0
+    for k in range(code & ~BITS_ADAPTIVE, 0, -1):
+        runs = np.flatnonzero(run_bits == k) + first_run
+        if not len(runs):
+            continue
+        c1 = min(payload_len, c0 + len(runs) * TEXTURE_RUN * k // 8)
+        parts.append((_run_slots(seed, runs, k), k, len(runs) * TEXTURE_RUN, (c0, c1)))
+        c0 = c1
+    return parts, capacity
+
+def _shard_parts(n_slots: int, seed: bytes, header_bits_len: int, shards: int, bits: int, payload_len: int):
+    regions = _shard_layout(n_slots - header_bits_len, shards)
+    return [(_shard_slots(seed, header_bits_len, region, i), bits, region[1] - region[0], chunk)
+            for i, (region, chunk) in enumerate(zip(regions, _shard_chunks(payload_len, shards)))]
+
+def _embed_parts(flat, source: PayloadSource, parts, workers: int = None, step=None, delta=None) -> int:
+    """
+    Streams each part's payload range into its slots; parts are (slot source, bits
+    per slot, slot count, (start, stop) payload bytes). Returns the payload CRC32.
+    """
+    def work(i):
+        slots, bits, _, (c0, c1) = parts[i]
+        return embed_chunks(source, c0, c1,
+                            lambda off, data: embed_k(flat, slots, (off - c0) * 8, data, bits, step, delta))
+
+    return _combine_crcs(_run_shards(work, len(parts), workers), [p[3] for p in parts])
+
+def _extract_parts(flat, parts, sink: PayloadSink, payload_len: int, workers: int = None, step=None) -> int:
+    for _, bits, n_slots, (c0, c1) in parts:
+        if (c1 - c0) * 8 > n_slots * bits:
+            raise ValueError("Header payload length exceeds shard capacity.")
+    if (parts[-1][3][1] if parts else 0) != payload_len:
+        raise ValueError("Header payload length exceeds image capacity.")
+
+    sink.open(payload_len)
+
+    def work(i):
+        slots, bits, _, (c0, c1) = parts[i]
+        return extract_chunks(c0, c1, lambda off, n: extract_k(flat, slots, (off - c0) * 8, n, bits, step), sink)
+
+    return _combine_crcs(_run_shards(work, len(parts), workers), [p[3] for p in parts])
+
+def _embed(cover: np.ndarray, payload, passphrase: str, ver: int, shards: int = 1, workers: int = None,
+           reporter: Reporter = NULL_REPORTER, bits: int = 1):
+    """
+    Embeds payload into a copy of cover (a load_pixels array).
+    Returns (stego, capacity_bytes, used_bytes, quality).
+    """
+    stego = cover.copy()
+    return (stego, *_embed_slots(slot_view(stego), payload, passphrase, ver, shards, workers, reporter,
+                                 stego.shape[2], sample_peak(stego), bits))
+
+def _embed_slots(flat, payload, passphrase: str, ver: int, shards: int = 1, workers: int = None,
+                 reporter: Reporter = NULL_REPORTER, channels: int = 3, peak: float = PIXEL_MAX, bits: int = 1):
+    """
+    Embeds payload (bytes-like or PayloadSource) into the slot stream flat in place
+    (an array or a raw_pixels slot view). Returns (capacity_bytes, used_bytes, quality);
+    quality is derived from the slots that actually flipped, not a full-image comparison.
+    The payload is streamed in chunks and the header is written last, once its CRC is known.
+    bits is the v6 bits byte (see _bits_code); the header itself always uses one bit per slot.
+    """
+    source = payload if isinstance(payload, PayloadSource) else PayloadSource(payload)
+    total_slots = len(flat)
+
+    if bits != 1:  # k-bit payloads get the v6 header over the v4 slot layout
+        shards = shards if ver == ALG_VER_SHARDED and not bits & BITS_ADAPTIVE else 1
+        ver = ALG_VER_KBIT
+    elif source.codec:  # compressed payloads get the v5 header over the v4 slot layout
+        shards = shards if ver == ALG_VER_SHARDED else 1
+        ver = ALG_VER_COMPRESSED
+    if ver not in SHARDED_VERSIONS:
+        shards = 1
+    elif not 1 <= shards <= MAX_SHARDS:
+        raise ValueError(f"shards must be in 1..{MAX_SHARDS}.")
+
+    reporter.stage("kdf")
+    salt = os.urandom(SALT_LEN)
+    seed, tag = _derive_key(passphrase, salt, ver)
+    header_len = HEADER_LEN[ver]
+    header_bits_len = header_len * 8
+
+    parts = None
+    cap_bytes = (total_slots // 8) - header_len
+    if bits & BITS_ADAPTIVE:
+        parts, cap_bytes = _adaptive_parts(flat, seed, header_bits_len, bits, source.size)
+    elif ver in SHARDED_VERSIONS:
+        cap_bytes = _shard_capacity(total_slots - header_bits_len, shards, bits)
+    if source.size > cap_bytes:
+        raise ValueError(f"Payload too large. Capacity ~{cap_bytes} bytes (excludes {header_len}B header).")
+
+    # Stage 1: payload randomized after header region, streamed chunk by chunk
+    delta = SlotDelta(total_slots, channels, peak)
+    reporter.stage("permutation")
+    if ver in SHARDED_VERSIONS:
+        if parts is None:
+            parts = _shard_parts(total_slots, seed, header_bits_len, shards, bits, source.size)
+        reporter.stage("embed", source.size)
+        crc = _embed_parts(flat, source, parts, workers, reporter.step, delta)
+    else:
+        slots = _payload_slots(ver, seed, total_slots, header_bits_len, source.size * 8, passphrase, salt)
+        reporter.stage("embed", source.size)
+        crc = embed_chunks(source, 0, source.size,
+                           lambda off, data: embed_at(flat, shift_slots(slots, off * 8), data, reporter.step, delta))
+
+    # Stage 2: header sequential at the beginning
+    raw_len = source.raw_size if source.codec else source.size
+    embed_seq(flat, 0, _build_header(source.size, crc, salt, ver, tag, shards, source.codec, raw_len, bits),
+              delta=delta)
+
+    reporter.stage("psnr")
+    return cap_bytes, header_len + source.size, delta.metrics()
+
+def _extract(flat, passphrase: str, sink: PayloadSink, workers: int = None, reporter: Reporter = NULL_REPORTER):
+    """
+    Streams the payload from the slot stream flat into sink chunk by chunk.
+    Returns (header, crc_ok).
+    """
 
-    # Stage 2: read payload with PRNG
-    seed = kdf_seed(passphrase, salt, out_bytes=16)
-    rng = _rng_from_seed(seed)
-
-    remaining_slots = np.arange(len(flat), dtype=np.int64)[header_bits_len:]
-    rng.shuffle(remaining_slots)
-
-    payload_bits = _lsb_read_at_indices(flat, remaining_slots[:payload_len * 8]).astype(np.uint8)
-    payload = _bits_to_bytes(payload_bits)
-
-    calc_crc = crc32_bytes(payload)
-    crc_ok = (calc_crc == crc)
-
-    os.makedirs(out_dir, exist_ok=True)
+    # Stage 1: read header sequentially
+    reporter.stage("header")
+    header = _read_header(flat)
+    ver, payload_len, salt = header.ver, header.payload_len, header.salt
+    header_bits_len = HEADER_LEN[ver] * 8
+
+    # Stage 2: derive key (fails fast on a tagged header) and read payload with PRNG
+    reporter.stage("kdf")
+    seed = _check_key(header, passphrase)
+    max_bits = header.bits & ~BITS_ADAPTIVE
+    if not 1 <= max_bits <= MAX_BITS:
+        raise ValueError("Invalid bits per slot in header.")
+    if payload_len * 8 > (len(flat) - header_bits_len) * max_bits:
+        raise ValueError("Header payload length exceeds image capacity.")
+    if header.codec:  # decompressed on the fly; sink receives the original bytes
+        sink = DecompressingSink(sink, header.codec, header.raw_len)
+    reporter.stage("permutation")
+    if header.bits & BITS_ADAPTIVE:
+        parts, _ = _adaptive_parts(flat, seed, header_bits_len, header.bits, payload_len)
+        reporter.stage("extract", payload_len)
+        crc = _extract_parts(flat, parts, sink, payload_len, workers, reporter.step)
+    elif ver in SHARDED_VERSIONS:
+        if header.shards < 1:
+            raise ValueError("Invalid shard count in header.")
+        parts = _shard_parts(len(flat), seed, header_bits_len, header.shards, header.bits, payload_len)
+        reporter.stage("extract", payload_len)
+        crc = _extract_parts(flat, parts, sink, payload_len, workers, reporter.step)
+    else:
+        slots = _payload_slots(ver, seed, len(flat), header_bits_len, payload_len * 8, passphrase, salt)
+        reporter.stage("extract", payload_len)
+        sink.open(payload_len)
+        crc = extract_chunks(0, payload_len,
+                             lambda off, n: extract_at(flat, shift_slots(slots, off * 8), n, reporter.step), sink)
+    reporter.stage("verify")
+    if header.codec and crc == header.crc:
+        sink.finish()
+    return header, crc == header.crc
+
+def encode_bytes(cover, payload, passphrase: str, mode: str = "shuffle", format: str = "PNG",
+                 shards: int = None, workers: int = None, progress=None, cancel=None,
+                 profile: str = "balanced", compress: str = None, compress_level: int = None,
+                 bits: int = 1, adaptive: bool = False) -> bytes:
+    """
+    In-memory encode. cover: path, encoded image bytes/memoryview, PIL image or
+    pixel array (see image_io.load_pixels); payload: any bytes-like buffer.
+    Returns the encoded stego image, in the cover's pixel mode.
+    """
+    code = _bits_code(bits, adaptive)
+    reporter = Reporter(ENCODE_STAGES, progress, cancel, op="encode_bytes")
+    reporter.stage("load")
+    source = _compressed(PayloadSource(as_byte_view(payload)), compress, compress_level, reporter)
+    stego, _, _, _ = _embed(load_pixels(cover, reporter), source, passphrase, _mode_version(mode),
+                            _shard_count(shards), workers, reporter, code)
+    reporter.stage("save")
+    data = encode_image_bytes(stego, format, profile, workers)
+    reporter.done()
+    return data
+
+def decode_bytes(stego, passphrase: str, verify: bool = True, workers: int = None,
+                 progress=None, cancel=None) -> bytes:
+    """
+    In-memory decode of a stego image given as path, bytes, PIL image or pixel array.
+    Raises ValueError on CRC mismatch unless verify is False.
+    """
+    reporter = Reporter(DECODE_STAGES, progress, cancel, op="decode_bytes")
+    reporter.stage("load")
+    sink = PayloadSink()
+    _, crc_ok = _extract(slot_view(load_pixels(stego, reporter)), passphrase, sink, workers, reporter)
+    if verify and not crc_ok:
+        raise ValueError("CRC mismatch (wrong passphrase or corrupted data).")
+    reporter.done()
+    return sink.getvalue()
+
+def _shard_count(shards: int) -> int:
+    """
+    shards, or DEFAULT_SHARDS when None; ValueError outside 1..MAX_SHARDS.
+    """
+    shards = DEFAULT_SHARDS if shards is None else shards
+    if not 1 <= shards <= MAX_SHARDS:
+        raise ValueError(f"shards must be in 1..{MAX_SHARDS}.")
+    return shards
+
+def _compressed(source: PayloadSource, compress: str, level: int, reporter: Reporter) -> PayloadSource:
+    if check_codec(compress) == "none":
+        return source
+    reporter.stage("compress")
+    return compress_source(source, compress, level)
+
+def encode_v2(cover_path: str, payload_path: str, passphrase: str, out_path: str,
+              mode: str = "shuffle", shards: int = None, workers: int = None,
+              progress=None, cancel=None, profile: str = "balanced", compress: str = None,
+              compress_level: int = None, bits: int = 1, adaptive: bool = False) -> EncodeResult:
+    """
+    mode is a MODES key; compress, bits and adaptive pick the later header versions
+    (see the notes above MODES). The output format follows the out_path extension
+    with a writer profile (see writer.PROFILES); workers also sizes the PNG encoder.
+    progress(stage, fraction) is called per stage (progress.ENCODE_STAGES) and a
+    CancelToken aborts with progress.Cancelled before the file is written.
+    Raw BMP/PPM covers written to the same type are patched in a copy of the file.
+    payload_path may also be a payload_stream.PayloadSource.
+    """
+    ver = _mode_version(mode)
+    code = _bits_code(bits, adaptive)
+    reporter = Reporter(ENCODE_STAGES, progress, cancel, op="encode_v2")
+    reporter.stage("load")
+    payload = payload_path if isinstance(payload_path, PayloadSource) else PayloadSource(payload_path)
+    payload = _compressed(payload, compress, compress_level, reporter)
+    try:
+        if raw_output(cover_path, out_path):  # payload is read chunk by chunk during embedding
+            return _encode_raw(cover_path, payload, passphrase, out_path, ver, shards, workers, reporter, code)
+        stego, cap_bytes, used_bytes, q = _embed(load_pixels(cover_path, reporter), payload, passphrase, ver,
+                                                 _shard_count(shards), workers, reporter, code)
+    finally:
+        payload.close()
+    reporter.stage("save")
+    write_image(stego, out_path, profile, workers=workers)
+    reporter.done()
+    return EncodeResult(stego_path=out_path, capacity_bytes=cap_bytes, used_bytes=used_bytes, psnr_db=q.psnr_db,
+                        quality=q, compression=CODEC_NAMES[payload.codec])
+
+def _encode_raw(cover_path: str, payload: PayloadSource, passphrase: str, out_path: str, ver: int,
+                shards: int, workers: int, reporter: Reporter, bits: int = 1) -> EncodeResult:
+    """
+    encode_v2 for raw BMP/PPM: embeds into a memory-mapped copy of the cover file
+    (or the cover itself when out_path is the cover path).
+    """
+    raw = copy_for_output(cover_path, out_path)
+    try:
+        cap_bytes, used_bytes, q = _embed_slots(raw.slots, payload, passphrase, ver, _shard_count(shards),
+                                                workers, reporter, bits=bits)
+        reporter.stage("save")
+    except BaseException:
+        raw.close()
+        if os.path.abspath(cover_path) != os.path.abspath(out_path):
+            os.remove(out_path)
+        raise
+    raw.close()
+    reporter.done()
+    return EncodeResult(stego_path=out_path, capacity_bytes=cap_bytes, used_bytes=used_bytes, psnr_db=q.psnr_db,
+                        quality=q, compression=CODEC_NAMES[payload.codec])
+
+def decode_v2(stego_path: str, passphrase: str, out_dir: str, workers: int = None,
+              progress=None, cancel=None) -> DecodeResult:
+    """
+    Uncompressed BMP/PPM stego files are read through a memory map instead of being decoded.
+    """
+    reporter = Reporter(DECODE_STAGES, progress, cancel, op="decode_v2")
+    reporter.stage("load")
+    hits0, misses0 = KDF_CACHE.thread_counts()
+    raw = open_raw(stego_path)
+    if raw is None:
+        leading = read_leading_slots(stego_path, HEADER_MAX_LEN * 8)
+        if leading is not None:
+            _read_header(leading)  # reject non-stego files before decoding the full image
     out_path = os.path.join(out_dir, "extracted_payload.bin")
-    with open(out_path, "wb") as f:
-        f.write(payload)
-
-    from dataclasses import dataclass
-    return DecodeResult(output_path=out_path, payload_len=payload_len, crc_ok=crc_ok)
+    sink = PayloadSink(out_path)  # extracted chunks go straight to the file
+    try:
+        flat = raw.slots if raw is not None else slot_view(load_pixels(stego_path, reporter))
+        header, crc_ok = _extract(flat, passphrase, sink, workers, reporter)
+    except BaseException:
+        sink.discard()
+        raise
+    finally:
+        if raw is not None:
+            raw.close()
+
+    reporter.stage("save")
+    sink.close()
+
+    reporter.done()
+    hits, misses = KDF_CACHE.thread_counts()
+    return DecodeResult(output_path=out_path, payload_len=header.raw_len, crc_ok=crc_ok,
+                        kdf_cache_hits=hits - hits0, kdf_cache_misses=misses - misses0)
+
+def check_key(stego, passphrase: str) -> bool:
+    """
+    True if passphrase matches the key-check tag of a v3+ stego image.
+    PNG/BMP paths and bytes only have their header slots read (see
+    image_io.read_leading_slots); other formats, PIL images and arrays are
+    loaded in full. One KDF call either way.
+    """
+    flat = read_leading_slots(stego, HEADER_MAX_LEN * 8)
+    header = _read_header(flat if flat is not None else slot_view(load_pixels(stego)))
+    if not header.tag:
+        raise ValueError(f"Header version {header.ver} has no key-check tag.")
+    try:
+        _check_key(header, passphrase)
+    except KeyCheckError:
+        return False
+    return True
@@ -1,12 +1,23 @@
 from dataclasses import dataclass
 import numpy as np
-from PIL import Image
-from .crypto_utils import SALT_LEN, crc32_bytes
-from .metrics import psnr
+import os
+from .compression import CODEC_NAMES, DecompressingSink, check_codec, compress_source
+from .crypto_utils import SALT_LEN
+from .kernels import MAX_BITS, embed_k, embed_seq, extract_k, extract_seq
+from .image_io import as_byte_view, encode_image_bytes, image_slots, load_pixels, slot_view
+from .metrics import PIXEL_MAX, QualityMetrics, SlotDelta, sample_peak
+from .payload_stream import PayloadSink, PayloadSource, embed_chunks, extract_chunks
+from .writer import write_image
+from .raw_pixels import copy_for_output, open_raw, raw_output
+from .progress import SEQ_DECODE_STAGES, SEQ_ENCODE_STAGES, NULL_REPORTER, Reporter
 
 MAGIC = b"ST"
 ALG_VER = 1
+ALG_VER_COMPRESSED = 2  # payload compressed; header adds codec id and uncompressed length
 HEADER_FIXED_LEN = 2 + 1 + 1 + 4 + 4 + SALT_LEN  # 28 bytes
+ALG_VER_KBIT = 3  # as v2 (codec 0 when stored), plus the payload bits per slot
+HEADER_LEN = {ALG_VER: HEADER_FIXED_LEN, ALG_VER_COMPRESSED: HEADER_FIXED_LEN + 1 + 8,
+              ALG_VER_KBIT: HEADER_FIXED_LEN + 1 + 8 + 1}
 
 @dataclass
 class EncodeResult:
@@ -14,6 +25,8 @@ class EncodeResult:
     capacity_bytes: int
     used_bytes: int
     psnr_db: float
+    quality: QualityMetrics = None
+    compression: str = "none"
 
 @dataclass
 class DecodeResult:
@@ -21,40 +34,30 @@ class DecodeResult:
     payload_len: int
     crc_ok: bool
 
-def _to_bits(data: bytes) -> np.ndarray:
-    arr = np.frombuffer(data, dtype=np.uint8)
-    return np.unpackbits(arr)
-
-def _bits_to_bytes(bits: np.ndarray) -> bytes:
-    if len(bits) % 8 != 0:
-        pad = 8 - (len(bits) % 8)
-        bits = np.concatenate([bits, np.zeros(pad, dtype=np.uint8)])
-    arr = np.packbits(bits)
-    return arr.tobytes()
-
-def _open_rgb(path: str) -> Image.Image:
-    img = Image.open(path)
-    return img.convert("RGB")
-
-def _img_to_array(img: Image.Image) -> np.ndarray:
-    return np.array(img, dtype=np.uint8)
-
-def capacity_bytes_for_image(path: str) -> int:
-    img = _open_rgb(path)
-    w, h = img.size
-    total_slots = w * h * 3
-    return max(0, (total_slots // 8) - HEADER_FIXED_LEN)
-
-def _build_header(payload: bytes, salt: bytes) -> bytes:
-    payload_len = len(payload)
-    crc = crc32_bytes(payload)
+def capacity_bytes_for_image(path: str, bits: int = 1) -> int:
+    total_slots = image_slots(path)
+    return _capacity(total_slots, HEADER_LEN[ALG_VER_KBIT] if bits != 1 else HEADER_FIXED_LEN, bits)
+
+def _capacity(total_slots: int, header_len: int, bits: int) -> int:
+    return max(0, (total_slots - header_len * 8) * bits // 8)
+
+def _version(codec: int, bits: int) -> int:
+    return ALG_VER_KBIT if bits != 1 else ALG_VER_COMPRESSED if codec else ALG_VER
+
+def _build_header(payload_len: int, crc: int, salt: bytes, codec: int = 0, raw_len: int = 0, bits: int = 1) -> bytes:
+    ver = _version(codec, bits)
     header = bytearray()
     header += b"ST"
-    header += bytes([ALG_VER])
+    header += bytes([ver])
     header += bytes([SALT_LEN])
     header += payload_len.to_bytes(4, "big")
     header += crc.to_bytes(4, "big")
     header += salt
+    if ver != ALG_VER:
+        header += bytes([codec])
+        header += raw_len.to_bytes(8, "big")
+    if ver == ALG_VER_KBIT:
+        header += bytes([bits])
     return bytes(header)
 
 def _parse_header(header_bytes: bytes):
@@ -66,54 +69,173 @@ def _parse_header(header_bytes: bytes):
     salt = header_bytes[12:12+salt_len]
     return magic, ver, salt_len, payload_len, crc, salt
 
-def encode_sequential(cover_path: str, payload_path: str, out_path: str) -> EncodeResult:
-    cover_img = _open_rgb(cover_path)
-    arr = _img_to_array(cover_img)
-    H, W, C = arr.shape
-    assert C == 3
-
-    with open(payload_path, "rb") as f:
-        payload = f.read()
-
-    total_slots = H * W * 3
-    cap_bytes = (total_slots // 8) - HEADER_FIXED_LEN
-    if len(payload) > cap_bytes:
-        raise ValueError(f"Payload too large. Capacity ~{cap_bytes} bytes (excludes 28B header).")
+def _read_extra(flat, ver: int):
+    """
+    (codec, raw_len, bits) from the header fields after the fixed part; (0, 0, 1) for version 1.
+    """
+    if ver == ALG_VER:
+        return 0, 0, 1
+    extra = extract_seq(flat, HEADER_FIXED_LEN * 8, HEADER_LEN[ver] - HEADER_FIXED_LEN)
+    bits = extra[9] if ver == ALG_VER_KBIT else 1
+    if not 1 <= bits <= MAX_BITS:
+        raise ValueError("Invalid bits per slot in header.")
+    return extra[0], int.from_bytes(extra[1:9], "big"), bits
+
+def _embed(cover: np.ndarray, payload, reporter: Reporter = NULL_REPORTER, bits: int = 1):
+    """
+    Returns (stego, capacity_bytes, used_bytes, quality); cover (a load_pixels array) is left untouched.
+    """
+    stego = cover.copy()
+    return (stego, *_embed_slots(slot_view(stego), payload, reporter, stego.shape[2], sample_peak(stego), bits))
+
+def _embed_slots(flat, payload, reporter: Reporter = NULL_REPORTER, channels: int = 3, peak: float = PIXEL_MAX,
+                 bits: int = 1):
+    """
+    Embeds into the slot stream flat in place. Returns (capacity_bytes, used_bytes, quality).
+    payload (bytes-like or PayloadSource) is streamed in chunks; the header goes last.
+    bits payload bits go into each slot after the header (version 3 when not 1).
+    """
+    if not 1 <= bits <= MAX_BITS:
+        raise ValueError(f"bits must be in 1..{MAX_BITS}.")
+    source = payload if isinstance(payload, PayloadSource) else PayloadSource(payload)
+    total_slots = len(flat)
+    header_len = HEADER_LEN[_version(source.codec, bits)]
+    if total_slots < header_len * 8:
+        raise ValueError("Image too small for header.")
+    cap_bytes = _capacity(total_slots, header_len, bits)
+    if source.size > cap_bytes:
+        raise ValueError(f"Payload too large. Capacity ~{cap_bytes} bytes (excludes {header_len}B header).")
 
     salt = bytes([0]*SALT_LEN)  # sequential variant uses fixed zero salt (no key)
-    header = _build_header(payload, salt)
-    stream = header + payload
-    bits = _to_bits(stream)
-
-    flat = arr.reshape(-1)
-    flat[:len(bits)] = (flat[:len(bits)] & 0xFE) | bits
-
-    from PIL import Image as _I
-    _I.fromarray(flat.reshape(H, W, C), "RGB").save(out_path, format="PNG")
-    return EncodeResult(out_path, cap_bytes, len(stream), float(psnr(arr, flat.reshape(H, W, C))))
-
-def decode_sequential(stego_path: str, out_dir: str) -> DecodeResult:
-    img = _open_rgb(stego_path)
-    arr = _img_to_array(img)
-    H, W, C = arr.shape
-    flat = arr.reshape(-1)
-
-    header_bits_len = HEADER_FIXED_LEN * 8
-    header_bits = flat[:header_bits_len] & 1
-    header = _bits_to_bytes(header_bits.astype(np.uint8))
+    header_bits_len = header_len * 8
+
+    reporter.stage("embed", source.size)
+    delta = SlotDelta(total_slots, channels, peak)
+    crc = embed_chunks(source, 0, source.size,
+                       lambda off, data: embed_k(flat, header_bits_len, off * 8, data, bits, reporter.step, delta))
+    raw_len = source.raw_size if source.codec else source.size
+    embed_seq(flat, 0, _build_header(source.size, crc, salt, source.codec, raw_len, bits), delta=delta)
+    reporter.stage("psnr")
+    return cap_bytes, header_len + source.size, delta.metrics()
+
+def _extract(flat, sink: PayloadSink, reporter: Reporter = NULL_REPORTER):
+    """
+    Streams the payload from the slot stream flat into sink. Returns (payload_len, crc_ok);
+    payload_len is the uncompressed length for compressed (version 2/3) headers.
+    """
+
+    reporter.stage("header")
+    if len(flat) < HEADER_FIXED_LEN * 8:
+        raise ValueError("Image too small for header.")
+    header = extract_seq(flat, 0, HEADER_FIXED_LEN)
 
     magic, ver, salt_len, payload_len, crc, salt = _parse_header(header)
-    if magic != b"ST" or ver != 1:
+    if magic != b"ST" or ver not in HEADER_LEN:
         raise ValueError("Invalid header.")
-
-    payload_bits = flat[header_bits_len:header_bits_len + payload_len*8] & 1
-    payload = _bits_to_bytes(payload_bits.astype(np.uint8))
-
-    import os
-    os.makedirs(out_dir, exist_ok=True)
+    header_bits_len = HEADER_LEN[ver] * 8
+    if header_bits_len > len(flat):
+        raise ValueError("Image too small for header.")
+    codec, raw_len, bits = _read_extra(flat, ver)
+    raw_len = raw_len if codec else payload_len
+    if codec:
+        sink = DecompressingSink(sink, codec, raw_len)
+
+    if payload_len * 8 > (len(flat) - header_bits_len) * bits:
+        raise ValueError("Header payload length exceeds image capacity.")
+    reporter.stage("extract", payload_len)
+    sink.open(payload_len)
+    crc_read = extract_chunks(0, payload_len,
+                              lambda off, n: extract_k(flat, header_bits_len, off * 8, n, bits, reporter.step), sink)
+    reporter.stage("verify")
+    if codec and crc_read == crc:
+        sink.finish()
+    return raw_len, crc_read == crc
+
+def encode_bytes(cover, payload, format: str = "PNG", progress=None, cancel=None, profile: str = "balanced",
+                 compress: str = None, compress_level: int = None, bits: int = 1, workers: int = None) -> bytes:
+    """
+    In-memory encode; cover may be a path, encoded bytes, PIL image or pixel array (see image_io.load_pixels).
+    workers: PNG encoder threads (see writer.encode_png_bands).
+    """
+    reporter = Reporter(SEQ_ENCODE_STAGES, progress, cancel, op="encode_bytes")
+    reporter.stage("load")
+    source = _compressed(PayloadSource(as_byte_view(payload)), compress, compress_level, reporter)
+    stego, _, _, _ = _embed(load_pixels(cover, reporter), source, reporter, bits)
+    reporter.stage("save")
+    data = encode_image_bytes(stego, format, profile, workers)
+    reporter.done()
+    return data
+
+def decode_bytes(stego, verify: bool = True, progress=None, cancel=None) -> bytes:
+    reporter = Reporter(SEQ_DECODE_STAGES, progress, cancel, op="decode_bytes")
+    reporter.stage("load")
+    sink = PayloadSink()
+    _, crc_ok = _extract(slot_view(load_pixels(stego, reporter)), sink, reporter)
+    if verify and not crc_ok:
+        raise ValueError("CRC mismatch (corrupted data).")
+    reporter.done()
+    return sink.getvalue()
+
+def _compressed(source: PayloadSource, compress: str, level: int, reporter: Reporter) -> PayloadSource:
+    if check_codec(compress) == "none":
+        return source
+    reporter.stage("compress")
+    return compress_source(source, compress, level)
+
+def encode_sequential(cover_path: str, payload_path: str, out_path: str,
+                      progress=None, cancel=None, profile: str = "balanced", workers: int = None,
+                      compress: str = None, compress_level: int = None, bits: int = 1) -> EncodeResult:
+    """
+    Raw BMP/PPM covers written to the same type are patched in a copy of the file (no decode).
+    Otherwise the format follows the out_path extension, written with a writer profile.
+    compress / compress_level as in lsb_random_v2.encode_v2 (header version 2 when compressed).
+    bits = 2..4 payload bits per sample as in encode_v2 (header version 3).
+    """
+    reporter = Reporter(SEQ_ENCODE_STAGES, progress, cancel, op="encode_sequential")
+    reporter.stage("load")
+    payload = PayloadSource(payload_path)  # read chunk by chunk during embedding
+    payload = _compressed(payload, compress, compress_level, reporter)
+    codec = CODEC_NAMES[payload.codec]
+    try:
+        if raw_output(cover_path, out_path):
+            raw = copy_for_output(cover_path, out_path)
+            try:
+                cap_bytes, used_bytes, q = _embed_slots(raw.slots, payload, reporter, bits=bits)
+                reporter.stage("save")
+            except BaseException:
+                raw.close()
+                if os.path.abspath(cover_path) != os.path.abspath(out_path):
+                    os.remove(out_path)
+                raise
+            raw.close()
+            reporter.done()
+            return EncodeResult(out_path, cap_bytes, used_bytes, q.psnr_db, q, codec)
+        stego, cap_bytes, used_bytes, q = _embed(load_pixels(cover_path, reporter), payload, reporter, bits)
+    finally:
+        payload.close()
+    reporter.stage("save")
+    write_image(stego, out_path, profile, workers=workers)
+    reporter.done()
+    return EncodeResult(out_path, cap_bytes, used_bytes, q.psnr_db, q, codec)
+
+def decode_sequential(stego_path: str, out_dir: str, progress=None, cancel=None) -> DecodeResult:
+    reporter = Reporter(SEQ_DECODE_STAGES, progress, cancel, op="decode_sequential")
+    reporter.stage("load")
+    raw = open_raw(stego_path)  # uncompressed BMP/PPM: memory-mapped, not decoded
     out_path = os.path.join(out_dir, "extracted_payload_seq.bin")
-    with open(out_path, "wb") as f:
-        f.write(payload)
-
-    crc_ok = (crc32_bytes(payload) == crc)
+    sink = PayloadSink(out_path)  # extracted chunks go straight to the file
+    try:
+        flat = raw.slots if raw is not None else slot_view(load_pixels(stego_path, reporter))
+        payload_len, crc_ok = _extract(flat, sink, reporter)
+    except BaseException:
+        sink.discard()
+        raise
+    finally:
+        if raw is not None:
+            raw.close()
+
+    reporter.stage("save")
+    sink.close()
+
+    reporter.done()
     return DecodeResult(out_path, payload_len, crc_ok)
@@ -1,13 +1,119 @@
+import threading
+from dataclasses import dataclass
 import numpy as np
 
+PIXEL_MAX = 255.0
+BAND_ROWS = 256  # image rows per step for the full-image metrics
+
+def psnr_from_mse(mse: float, peak: float = PIXEL_MAX) -> float:
+    if mse == 0:
+        return float("inf")
+    return 20 * np.log10(peak) - 10 * np.log10(mse)
+
+def sample_peak(arr: np.ndarray) -> float:
+    """
+    Peak sample value of an image array: 255 for uint8, 65535 for uint16.
+    """
+    return float(np.iinfo(arr.dtype).max) if arr.dtype.kind in "ui" else PIXEL_MAX
+
 def psnr(orig: np.ndarray, stego: np.ndarray) -> float:
     """
-    Compute PSNR between two uint8 RGB images (H,W,3).
+    Compute PSNR between two images of the same shape and dtype (peak 255 for
+    uint8, 65535 for uint16). Full-image pass in row bands, so temporaries stay small.
     """
-    orig = orig.astype(np.float64)
-    stego = stego.astype(np.float64)
-    mse = np.mean((orig - stego) ** 2)
-    if mse == 0:
-        return float("inf")
-    PIXEL_MAX = 255.0
-    return 20 * np.log10(PIXEL_MAX) - 10 * np.log10(mse)
+    sse = 0
+    for r in range(0, orig.shape[0], BAND_ROWS):
+        d = (orig[r:r + BAND_ROWS].astype(np.int64) - stego[r:r + BAND_ROWS]).ravel()
+        sse += int(np.dot(d, d))
+    return psnr_from_mse(sse / orig.size, sample_peak(orig))
+
+@dataclass
+class QualityMetrics:
+    mse: float
+    psnr_db: float
+    changed_slots: int
+    embedded_bits: int
+    changed_bit_ratio: float   # changed_slots / embedded_bits (~0.5 for random payloads)
+    channel_mse: tuple         # per channel (e.g. R, G, B, A)
+
+class SlotDelta:
+    """
+    Counts the slots whose LSB actually flipped while the kernels embed (see
+    kernels.embed_at/embed_seq `delta=`). An LSB flip changes a channel value by
+    exactly 1, so MSE/PSNR follow from the counts in O(payload) time and memory;
+    k-bit embeds (kernels.embed_k) pass the squared error of each changed slot.
+    peak is the maximum sample value (65535 for 16-bit images).
+    Thread-safe, so sharded embeds can share one instance.
+    """
+    def __init__(self, n_slots: int, channels: int = 3, peak: float = PIXEL_MAX):
+        self.n_slots = n_slots
+        self.channels = channels
+        self.peak = peak
+        self.flips = np.zeros(channels, dtype=np.int64)
+        self.sq_err = np.zeros(channels, dtype=np.float64)
+        self.bits = 0
+        self._lock = threading.Lock()
+
+    def add(self, flipped: np.ndarray, n_bits: int, sq_err: np.ndarray = None):
+        """
+        flipped: flat slot indices whose LSB changed among n_bits written slots;
+        sq_err: their squared errors for k-bit slots (default 1 each).
+        """
+        ch = flipped % self.channels
+        counts = np.bincount(ch, minlength=self.channels)
+        sq = counts if sq_err is None else np.bincount(ch, weights=sq_err, minlength=self.channels)
+        with self._lock:
+            self.flips += counts
+            self.sq_err += sq
+            self.bits += n_bits
+
+    def metrics(self) -> QualityMetrics:
+        changed = int(self.flips.sum())
+        mse = float(self.sq_err.sum()) / self.n_slots
+        per_channel = self.n_slots / self.channels
+        return QualityMetrics(
+            mse=mse,
+            psnr_db=float(psnr_from_mse(mse, self.peak)),
+            changed_slots=changed,
+            embedded_bits=self.bits,
+            changed_bit_ratio=changed / self.bits if self.bits else 0.0,
+            channel_mse=tuple(float(f / per_channel) for f in self.sq_err),
+        )
+
+def _box_sums(x: np.ndarray, win: int) -> np.ndarray:
+    """
+    Sums over every win x win window (valid positions) of a 2-D array.
+    """
+    c = np.zeros((x.shape[0] + 1, x.shape[1] + 1), dtype=np.float64)
+    np.cumsum(x, axis=0, out=c[1:, 1:])
+    np.cumsum(c[1:, 1:], axis=1, out=c[1:, 1:])
+    return c[win:, win:] - c[:-win, win:] - c[win:, :-win] + c[:-win, :-win]
+
+def ssim(orig: np.ndarray, stego: np.ndarray, win: int = 7, band_rows: int = BAND_ROWS) -> float:
+    """
+    Mean SSIM over all channels with a uniform win x win window. Full-image metric,
+    computed in row bands (overlapping by win - 1 rows) to bound memory.
+    """
+    H, W = orig.shape[:2]
+    if H < win or W < win:
+        raise ValueError(f"Image smaller than the {win}x{win} SSIM window.")
+    peak = sample_peak(orig)
+    c1, c2 = (0.01 * peak) ** 2, (0.03 * peak) ** 2
+    n = win * win
+    mid = (peak + 1) / 2
+    total, count = 0.0, 0
+    for r in range(0, H - win + 1, band_rows):
+        rows = slice(r, min(H, r + band_rows + win - 1))
+        for ch in range(orig.shape[2] if orig.ndim == 3 else 1):
+            x = (orig[rows, :, ch] if orig.ndim == 3 else orig[rows]).astype(np.float64) - mid
+            y = (stego[rows, :, ch] if stego.ndim == 3 else stego[rows]).astype(np.float64) - mid
+            mx, my = _box_sums(x, win) / n, _box_sums(y, win) / n
+            vx = _box_sums(x * x, win) / n - mx * mx
+            vy = _box_sums(y * y, win) / n - my * my
+            cov = _box_sums(x * y, win) / n - mx * my
+            mx += mid  # variances are shift-invariant, the luminance term is not
+            my += mid
+            s = ((2 * mx * my + c1) * (2 * cov + c2)) / ((mx * mx + my * my + c1) * (vx + vy + c2))
+            total += float(s.sum())
+            count += s.size
+    return total / count
@@ -0,0 +1,294 @@
+import os
+import struct
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .image_io import load_pixels, slot_view
+from .lsb_random_v2 import _extract, capacity_bytes_for_image, encode_v2
+from .payload_stream import STREAM_CHUNK, PayloadSink, PayloadSource
+from .raw_pixels import open_raw
+
+# Every cover carries an ordinary stego payload that starts with this fragment header:
+# MAGIC, version, set id, fragment index, fragment count, total payload length,
+# fragment offset in the payload, CRC32 of the whole payload.
+FRAG_MAGIC = b"SM"
+FRAG_VER = 1
+FRAG_STRUCT = struct.Struct(">2sB8sHHQQI")
+FRAG_HEADER_LEN = FRAG_STRUCT.size  # 35 bytes
+SET_ID_LEN = 8
+MAX_FRAGMENTS = 0xFFFF
+
+@dataclass
+class FragmentHeader:
+    set_id: bytes
+    index: int
+    count: int
+    total_len: int
+    offset: int
+    crc: int
+
+@dataclass
+class Fragment:
+    cover_index: int  # position in the cover list given to plan_fragments / encode_multi
+    offset: int
+    length: int
+
+@dataclass
+class MultiEncodeResult:
+    set_id: str
+    payload_len: int
+    crc: int
+    plan: list
+    fragments: list = field(default_factory=list)  # EncodeResult per used cover, in fragment order
+
+@dataclass
+class MultiDecodeResult:
+    output_path: str
+    payload_len: int
+    crc_ok: bool
+    set_id: str
+    fragments: int
+
+def _pack_fragment(h: FragmentHeader) -> bytes:
+    return FRAG_STRUCT.pack(FRAG_MAGIC, FRAG_VER, h.set_id, h.index, h.count, h.total_len, h.offset, h.crc)
+
+def _parse_fragment(data: bytes) -> FragmentHeader:
+    magic, ver, set_id, index, count, total_len, offset, crc = FRAG_STRUCT.unpack(data)
+    if magic != FRAG_MAGIC:
+        raise ValueError("Not a multi-cover fragment (fragment MAGIC mismatch: wrong passphrase or not in a set).")
+    if ver != FRAG_VER:
+        raise ValueError(f"Unsupported fragment version {ver}.")
+    if not index < count:
+        raise ValueError(f"Fragment index {index} out of range for {count} fragments.")
+    return FragmentHeader(set_id, index, count, total_len, offset, crc)
+
+def plan_fragments(capacities, payload_len: int, max_load: float = 1.0):
+    """
+    Chooses covers for a payload from their per-image capacities (bytes, as from
+    capacity_bytes_for_image) and splits it into Fragments. The largest covers
+    are taken until the payload fits with no cover filled beyond max_load of its
+    capacity; the payload is then split in proportion to capacity so every chosen
+    cover carries the same share of its capacity. Fragments follow cover order.
+    """
+    if not 0 < max_load <= 1:
+        raise ValueError("max_load must be in (0, 1].")
+    usable = [max(0, int(c * max_load) - FRAG_HEADER_LEN) for c in capacities]
+    chosen, total = [], 0
+    for i in sorted(range(len(usable)), key=lambda i: (-usable[i], i)):
+        if total >= payload_len and chosen:
+            break
+        if usable[i] == 0:
+            break
+        chosen.append(i)
+        total += usable[i]
+    if total < payload_len or not chosen:
+        raise ValueError(f"Payload too large. Combined capacity ~{total} bytes at max_load={max_load} "
+                         f"across {len(capacities)} covers.")
+    if len(chosen) > MAX_FRAGMENTS:
+        raise ValueError(f"At most {MAX_FRAGMENTS} fragments per set.")
+    chosen.sort()
+    lengths = [payload_len * usable[i] // total for i in chosen]
+    rest = payload_len - sum(lengths)
+    for k, i in enumerate(chosen):  # rounding remainder (< len(chosen) bytes) goes to covers with room
+        take = min(rest, usable[i] - lengths[k])
+        lengths[k] += take
+        rest -= take
+    plan, off = [], 0
+    for i, n in zip(chosen, lengths):
+        plan.append(Fragment(i, off, n))
+        off += n
+    return plan
+
+class _FragmentSource(PayloadSource):
+    """
+    Fragment payload: the packed fragment header followed by payload bytes
+    [offset, offset + length) of source, streamed without copying the payload.
+    """
+    def __init__(self, source: PayloadSource, head: bytes, offset: int, length: int):
+        self.chunk, self.path, self.buf = source.chunk, None, None
+        self.size = len(head) + length
+        self._source, self._head, self._offset = source, head, offset
+
+    def chunks(self, start: int = 0, stop: int = None):
+        stop = self.size if stop is None else stop
+        h = len(self._head)
+        if start < h:
+            yield start, self._head[start:min(stop, h)]
+        base = self._offset - h
+        for off, data in self._source.chunks(base + max(start, h), base + max(stop, h)):
+            yield off - base, data
+
+def _payload_crc(source: PayloadSource) -> int:
+    crc = 0
+    for _, data in source.chunks():
+        crc = zlib.crc32(data, crc)
+    return crc & 0xFFFFFFFF
+
+def _run(fn, n: int, workers: int = None):
+    workers = min(n, workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return [fn(i) for i in range(n)]
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(fn, range(n)))
+
+def encode_multi(cover_paths, payload_path: str, passphrase: str, out_dir: str, mode: str = "checked",
+                 max_load: float = 1.0, workers: int = None, profile: str = "balanced",
+                 shards: int = None) -> MultiEncodeResult:
+    """
+    Spreads one payload over several covers (see plan_fragments). Each chosen
+    cover gets an ordinary encode_v2 stego whose payload is a fragment header
+    plus its slice of the payload, written to out_dir/<cover stem>.png; the
+    covers are embedded concurrently on workers threads.
+    """
+    stems = [Path(p).stem for p in cover_paths]
+    if len(set(stems)) != len(stems):
+        raise ValueError("Cover file names must be unique (outputs are named after them).")
+    source = PayloadSource(payload_path)
+    caps = [capacity_bytes_for_image(p, mode, shards) for p in cover_paths]
+    plan = plan_fragments(caps, source.size, max_load)
+    set_id, crc = os.urandom(SET_ID_LEN), _payload_crc(source)
+    os.makedirs(out_dir, exist_ok=True)
+    inner = 1 if len(plan) > 1 else workers  # parallel across covers, or within a single one
+
+    def work(k):
+        frag = plan[k]
+        head = _pack_fragment(FragmentHeader(set_id, k, len(plan), source.size, frag.offset, crc))
+        out_path = os.path.join(out_dir, f"{stems[frag.cover_index]}.png")
+        return encode_v2(cover_paths[frag.cover_index], _FragmentSource(source, head, frag.offset, frag.length),
+                         passphrase, out_path, mode=mode, shards=shards, workers=inner, profile=profile)
+
+    try:
+        results = _run(work, len(plan), workers)
+    except BaseException:
+        for frag in plan:
+            try:
+                os.remove(os.path.join(out_dir, f"{stems[frag.cover_index]}.png"))
+            except OSError:
+                pass
+        raise
+    return MultiEncodeResult(set_id.hex(), source.size, crc, plan, results)
+
+class _Assembly:
+    """
+    Shared output of decode_multi: checks that fragments belong to one set,
+    and receives their bytes at payload offsets.
+    """
+    def __init__(self, out_path: str):
+        self.sink = PayloadSink(out_path)
+        self.first = None
+        self.spans = {}  # fragment index -> (offset, length)
+        self._lock = threading.Lock()
+
+    def register(self, frag: FragmentHeader, length: int):
+        with self._lock:
+            if self.first is None:
+                self.first = frag
+                self.sink.open(frag.total_len)
+            elif (frag.set_id, frag.count, frag.total_len, frag.crc) != \
+                    (self.first.set_id, self.first.count, self.first.total_len, self.first.crc):
+                raise ValueError("Stego images belong to different multi-cover sets.")
+            if frag.index in self.spans:
+                raise ValueError(f"Fragment {frag.index} given twice.")
+            if frag.offset + length > frag.total_len:
+                raise ValueError(f"Fragment {frag.index} extends past the payload end.")
+            self.spans[frag.index] = (frag.offset, length)
+
+    def check_complete(self):
+        if self.first is None:
+            raise ValueError("No fragments decoded.")
+        missing = sorted(set(range(self.first.count)) - set(self.spans))
+        if missing:
+            raise ValueError(f"Missing fragments {missing} of {self.first.count}.")
+        off = 0
+        for index in range(self.first.count):
+            start, length = self.spans[index]
+            if start != off:
+                raise ValueError(f"Fragment {index} does not continue the payload at offset {off}.")
+            off += length
+        if off != self.first.total_len:
+            raise ValueError("Fragments do not cover the whole payload.")
+
+class _FragmentSink:
+    """
+    PayloadSink for one stego image: parses the fragment header from the first
+    FRAG_HEADER_LEN payload bytes and forwards the rest to the assembly at the
+    fragment's offset. Chunks that arrive before the header is complete (other
+    shards of a sharded stego) are held until it is.
+    """
+    def __init__(self, assembly: _Assembly):
+        self.assembly = assembly
+        self.offset = None
+        self.size = 0
+        self._head = bytearray(FRAG_HEADER_LEN)
+        self._have = 0
+        self._held = []
+        self._lock = threading.Lock()
+
+    def open(self, size: int):
+        if size < FRAG_HEADER_LEN:
+            raise ValueError("Not a multi-cover fragment (payload shorter than the fragment header).")
+        self.size = size
+
+    def write(self, off: int, data):
+        with self._lock:
+            if self.offset is None:
+                if off < FRAG_HEADER_LEN:
+                    n = min(len(data), FRAG_HEADER_LEN - off)
+                    self._head[off:off + n] = data[:n]
+                    self._have += n
+                    data, off = data[n:], off + n
+                if len(data):
+                    self._held.append((off, bytes(data)))
+                if self._have < FRAG_HEADER_LEN:
+                    return
+                frag = _parse_fragment(bytes(self._head))
+                self.assembly.register(frag, self.size - FRAG_HEADER_LEN)
+                self.offset = frag.offset - FRAG_HEADER_LEN
+                pending, self._held = self._held, []
+            else:
+                pending = [(off, data)]
+        for o, d in pending:
+            self.assembly.sink.write(self.offset + o, d)
+
+def _file_crc(path: str) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        while data := f.read(STREAM_CHUNK):
+            crc = zlib.crc32(data, crc)
+    return crc & 0xFFFFFFFF
+
+def decode_multi(stego_paths, passphrase: str, out_dir: str, workers: int = None) -> MultiDecodeResult:
+    """
+    Reassembles a payload from the stego images of one set, given in any order.
+    Images are extracted concurrently straight into out_dir/extracted_payload.bin;
+    each image's own CRC and the set's whole-payload CRC are checked, and the
+    output is removed again on any error (wrong set, missing fragment, wrong key).
+    """
+    out_path = os.path.join(out_dir, "extracted_payload.bin")
+    assembly = _Assembly(out_path)
+    inner = 1 if len(stego_paths) > 1 else workers
+
+    def work(i):
+        raw = open_raw(stego_paths[i])
+        try:
+            flat = raw.slots if raw is not None else slot_view(load_pixels(stego_paths[i]))
+            _, crc_ok = _extract(flat, passphrase, _FragmentSink(assembly), inner)
+        finally:
+            if raw is not None:
+                raw.close()
+        if not crc_ok:
+            raise ValueError(f"CRC mismatch in {stego_paths[i]} (wrong passphrase or corrupted data).")
+
+    try:
+        _run(work, len(stego_paths), workers)
+        assembly.check_complete()
+        assembly.sink.close()
+    except BaseException:
+        assembly.sink.discard()
+        raise
+    first = assembly.first
+    return MultiDecodeResult(out_path, first.total_len, _file_crc(out_path) == first.crc, first.set_id.hex(),
+                             first.count)
@@ -0,0 +1,469 @@
+import hashlib
+import hmac
+import io
+import os
+import struct
+from dataclasses import dataclass, field
+import numpy as np
+from PIL import Image
+
+from .crypto_utils import SALT_LEN
+from .image_io import load_pixels, pixel_mode, slot_view
+from .kernels import embed_at, embed_seq, extract_at, extract_seq, shift_slots
+from .keyed_perm import KeyedPermutation
+from .lsb_random_v2 import ALG_VER_CHECKED, KeyCheckError, _combine_crcs, _derive_key, _permutation_slots
+from .metrics import QualityMetrics, SlotDelta, sample_peak
+from .multi_cover import _run
+from .payload_stream import PayloadSink, PayloadSource, embed_chunks, extract_chunks
+from .writer import FORMAT_MODES, PNG_PROFILES, SAVE_OPTIONS, _check_profile, _chunk, encode_png_bands
+
+# Frame 0 starts with a container header, embedded sequentially: MAGIC, version,
+# salt length, frame count, payload length, CRC32 of the payload, salt, key-check
+# tag; then the frame table, the payload byte count of every frame (4 bytes each).
+# Frame i carries payload bytes [sum(table[:i]), sum(table[:i+1])) at slots picked
+# by its own keyed permutation (in frame 0, after the header and table).
+FRAME_MAGIC = b"SF"
+FRAME_VER = 1
+FRAME_STRUCT = struct.Struct(">2sBBHQI16s4s")
+FRAME_HEADER_LEN = FRAME_STRUCT.size  # 38 bytes, + 4 per frame for the table
+FRAME_PREFIX_LEN = 6  # MAGIC + version + salt length + frame count
+MAX_FRAMES = 0xFFFF
+CONTAINER_EXTENSIONS = {"GIF": (".gif",), "APNG": (".png", ".apng"), "TIFF": (".tif", ".tiff")}
+
+_PNG_SIG = b"\x89PNG\r\n\x1a\n"
+_PNG_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}  # 8-bit color types -> samples per pixel
+
+@dataclass
+class FrameEncodeResult:
+    stego_path: str
+    format: str
+    frames: int
+    capacity_bytes: int
+    used_bytes: int
+    psnr_db: float
+    quality: QualityMetrics = None
+    frame_bytes: list = field(default_factory=list)  # payload bytes carried by each frame
+
+@dataclass
+class FrameDecodeResult:
+    output_path: str
+    payload_len: int
+    crc_ok: bool
+    frames: int
+
+class _MaskedSlots:
+    """
+    Slot stream over the samples of base at positions pos. Supports the reads and
+    writes the kernels use, like raw_pixels._BmpSlots.
+    """
+    ndim = 1
+
+    def __init__(self, base: np.ndarray, pos: np.ndarray):
+        self._base, self._pos = base, pos
+        self.size = len(pos)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key) -> np.ndarray:
+        return self._base[self._pos[key]]
+
+    def __setitem__(self, key, value):
+        self._base[self._pos[key]] = value
+
+# GIF: a frame is the raw palette-index rectangle of one image block, before any
+# disposal or compositing. Everything else in the file is copied byte for byte.
+
+@dataclass
+class _GifImage:
+    descriptor: bytes  # 0x2C + 9-byte image descriptor
+    table: bytes       # local color table (b"" when the global one applies)
+    palette: bytes     # color table the indices refer to (may be empty)
+    lzw: bytes         # LZW minimum code size + data sub-blocks
+    transparency: int  # transparent index from the image's graphic control extension, or None
+    width: int
+    height: int
+
+def _gif_sub_blocks(data: bytes, pos: int) -> int:
+    """
+    Position after the data sub-blocks starting at pos (past the 0 terminator).
+    """
+    while True:
+        n = data[pos]
+        pos += 1 + n
+        if n == 0:
+            return pos
+
+def _gif_table_len(packed: int) -> int:
+    return 3 << ((packed & 7) + 1) if packed & 0x80 else 0
+
+def _gif_parse(data: bytes):
+    """
+    (segments, images): the file as verbatim byte strings with the index of an
+    image in place of each image block.
+    """
+    if data[:6] not in (b"GIF87a", b"GIF89a"):
+        raise ValueError("Not a GIF file.")
+    pos = 13 + _gif_table_len(data[10])
+    global_table = data[13:pos]
+    segments, images, start, transparency = [], [], 0, None
+    while pos < len(data):
+        kind = data[pos]
+        if kind == 0x3B:
+            segments.append(data[start:pos + 1])
+            return segments, images
+        if kind == 0x21:
+            if data[pos + 1] == 0xF9 and data[pos + 2] >= 4:  # graphic control extension
+                transparency = data[pos + 6] if data[pos + 3] & 1 else None
+            pos = _gif_sub_blocks(data, pos + 2)
+        elif kind == 0x2C:
+            w, h, packed = struct.unpack("<HHB", data[pos + 5:pos + 10])
+            lzw = pos + 10 + _gif_table_len(packed)
+            end = _gif_sub_blocks(data, lzw + 1)
+            table = data[pos + 10:lzw]
+            images.append(_GifImage(data[pos:pos + 10], table, table or global_table, data[lzw:end],
+                                    transparency, w, h))
+            segments += [data[start:pos], len(images) - 1]
+            pos = start = end
+            transparency = None
+        else:
+            raise ValueError(f"Corrupt GIF file (block type 0x{kind:02x}).")
+    raise ValueError("Truncated GIF file.")
+
+def _gif_decode(image: _GifImage) -> np.ndarray:
+    """
+    (H, W, 1) palette indices of one image block, decoded by Pillow as a GIF of its own
+    (at (0, 0), no transparency) so nothing is composited over it.
+    """
+    palette = image.palette or bytes(range(256)) * 3
+    bits = (len(palette) // 3).bit_length() - 2
+    lsd = struct.pack("<HHBBB", image.width, image.height, 0xF0 | bits, 0, 0)
+    desc = struct.pack("<BHHHHB", 0x2C, 0, 0, image.width, image.height, image.descriptor[9] & 0x40)
+    with Image.open(io.BytesIO(b"GIF89a" + lsd + palette + desc + image.lzw + b"\x3B")) as img:
+        return np.array(img, dtype=np.uint8).reshape(image.height, image.width, 1)
+
+def _gif_encode(indices: np.ndarray) -> bytes:
+    """
+    LZW minimum code size + data sub-blocks for an (H, W) index array, from Pillow's GIF encoder.
+    """
+    img = Image.fromarray(indices, "P")
+    img.putpalette(bytes(range(256)) * 3)
+    buf = io.BytesIO()
+    img.save(buf, format="GIF", optimize=False, interlace=False)
+    return _gif_parse(buf.getvalue())[1][0].lzw
+
+class _GifFrames:
+    """
+    Frames of a GIF. Indices that an LSB flip could turn into, or out of, an image's
+    transparent index (the pair t, t ^ 1) are left out of its slot stream, so
+    embedding never changes which pixels are transparent.
+    """
+    format = "GIF"
+
+    def __init__(self, data: bytes, workers: int = None):
+        self._segments, self._images = _gif_parse(data)
+        if not self._images:
+            raise ValueError("GIF file has no image blocks.")
+        self.frames = _run(lambda i: _gif_decode(self._images[i]), len(self._images), workers)
+
+    def slots(self, i: int):
+        flat = self.frames[i].reshape(-1)
+        t = self._images[i].transparency
+        if t is None:
+            return flat
+        return _MaskedSlots(flat, np.flatnonzero((flat >> 1) != (t >> 1)))
+
+    def mux(self, profile: str, workers: int = None) -> bytes:
+        lzw = _run(lambda i: _gif_encode(self.frames[i][..., 0]), len(self.frames), workers)
+        out = []
+        for seg in self._segments:
+            if isinstance(seg, int):  # written non-interlaced; the position and color table stay
+                d = self._images[seg].descriptor
+                out += [d[:9], bytes([d[9] & 0xBF]), self._images[seg].table, lzw[seg]]
+            else:
+                out.append(seg)
+        return b"".join(out)
+
+# APNG: a frame is the default image (IDAT) or one fcTL's fdAT data, decoded on its
+# own; frame control (offsets, delays, dispose/blend ops) and other chunks are kept.
+
+def _png_chunks(data: bytes):
+    if data[:8] != _PNG_SIG:
+        raise ValueError("Not a PNG file.")
+    pos, chunks = 8, []
+    while pos + 8 <= len(data):
+        n, ctype = struct.unpack(">I4s", data[pos:pos + 8])
+        chunks.append((ctype, data[pos + 8:pos + 8 + n]))
+        pos += 12 + n
+        if ctype == b"IEND":
+            return chunks
+    raise ValueError("Truncated PNG file.")
+
+def _png_idat(png: bytes) -> bytes:
+    return b"".join(body for ctype, body in _png_chunks(png) if ctype == b"IDAT")
+
+class _ApngFrames:
+    """
+    Frames of an (animated) 8-bit gray, gray+alpha, RGB or RGBA PNG. Frames are
+    re-encoded non-interlaced with the band writer; fcTL/fdAT sequence numbers are
+    renumbered, every other chunk is copied.
+    """
+    format = "APNG"
+
+    def __init__(self, data: bytes, workers: int = None):
+        chunks = _png_chunks(data)
+        w, h, depth, ctype, _, _, interlace = struct.unpack(">IIBBBBB", chunks[0][1])
+        if depth != 8 or ctype not in _PNG_CHANNELS:
+            raise ValueError("Multi-frame PNG covers must be 8-bit gray, gray+alpha, RGB or RGBA.")
+        self._ihdr = (depth, ctype, interlace)
+        self._segments, self._sizes, self._kinds, data_parts = [], [], [], []
+        size, last = (w, h), None
+        for ctype_, body in chunks:
+            if ctype_ == b"fcTL":
+                size = struct.unpack(">II", body[4:12])
+                self._segments.append((ctype_, body))
+            elif ctype_ in (b"IDAT", b"fdAT"):
+                part = body if ctype_ == b"IDAT" else body[4:]
+                if last != ctype_:
+                    self._segments.append(len(self._sizes))
+                    self._sizes.append(size)
+                    self._kinds.append(ctype_)
+                    data_parts.append([])
+                data_parts[-1].append(part)
+            else:
+                self._segments.append((ctype_, body))
+            last = ctype_
+        self.frames = _run(lambda i: self._decode(i, b"".join(data_parts[i])), len(self._sizes), workers)
+
+    def _decode(self, i: int, zdata: bytes) -> np.ndarray:
+        (w, h), (depth, ctype, interlace) = self._sizes[i], self._ihdr
+        ihdr = struct.pack(">IIBBBBB", w, h, depth, ctype, 0, 0, interlace)
+        png = _PNG_SIG + _chunk(b"IHDR", ihdr) + _chunk(b"IDAT", zdata) + _chunk(b"IEND", b"")
+        with Image.open(io.BytesIO(png)) as img:
+            return np.array(img, dtype=np.uint8).reshape(h, w, _PNG_CHANNELS[ctype])
+
+    def slots(self, i: int):
+        return self.frames[i].reshape(-1)
+
+    def mux(self, profile: str, workers: int = None) -> bytes:
+        level, filter = PNG_PROFILES.get(profile, (9, "up"))
+        zdata = _run(lambda i: _png_idat(encode_png_bands(self.frames[i], level, filter, 1)), len(self.frames),
+                     workers)
+        out, seq = [_PNG_SIG], 0
+        for seg in self._segments:
+            if isinstance(seg, int):
+                if self._kinds[seg] == b"IDAT":
+                    out.append(_chunk(b"IDAT", zdata[seg]))
+                else:
+                    out.append(_chunk(b"fdAT", struct.pack(">I", seq) + zdata[seg]))
+                    seq += 1
+                continue
+            ctype, body = seg
+            if ctype == b"IHDR":
+                body = body[:12] + b"\x00"  # frames are written non-interlaced
+            elif ctype == b"fcTL":
+                body = struct.pack(">I", seq) + body[4:]
+                seq += 1
+            out.append(_chunk(ctype, body))
+        return b"".join(out)
+
+class _TiffFrames:
+    """
+    Pages of a multi-page TIFF, decoded concurrently (one file handle per page) and
+    written back with Pillow in the modes writer.FORMAT_MODES allows for TIFF.
+    """
+    format = "TIFF"
+
+    def __init__(self, data: bytes, workers: int = None):
+        with Image.open(io.BytesIO(data)) as img:
+            n = getattr(img, "n_frames", 1)
+
+        def decode(i):
+            with Image.open(io.BytesIO(data)) as img:
+                img.seek(i)
+                arr = np.array(load_pixels(img))
+            if pixel_mode(arr) not in FORMAT_MODES["TIFF"]:
+                raise ValueError(f"TIFF page {i} has {pixel_mode(arr)} pixels, which TIFF output can't store.")
+            return arr
+
+        self.frames = _run(decode, n, workers)
+
+    def slots(self, i: int):
+        return slot_view(self.frames[i])
+
+    def mux(self, profile: str, workers: int = None) -> bytes:
+        pages = [Image.fromarray(a[..., 0] if a.shape[2] == 1 else a) for a in self.frames]
+        buf = io.BytesIO()
+        pages[0].save(buf, format="TIFF", save_all=True, append_images=pages[1:], **SAVE_OPTIONS["TIFF"][profile])
+        return buf.getvalue()
+
+def open_frames(path, workers: int = None):
+    """
+    Frame container for a GIF, (animated) PNG or (multi-page) TIFF file; frames are
+    decoded concurrently into (H, W, C) arrays that embedding modifies in place.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return _GifFrames(data, workers)
+    if data[:8] == _PNG_SIG:
+        return _ApngFrames(data, workers)
+    if data[:4] in (b"II*\x00", b"MM\x00*"):
+        return _TiffFrames(data, workers)
+    raise ValueError("Multi-frame covers must be GIF, PNG/APNG or TIFF files.")
+
+def _frame_seed(seed: bytes, index: int) -> bytes:
+    return hashlib.sha256(seed + b"frame" + index.to_bytes(2, "big")).digest()[:16]
+
+def _frame_slots(seed: bytes, index: int, n_slots: int, reserved: int):
+    return _permutation_slots(KeyedPermutation(_frame_seed(seed, index), n_slots - reserved), reserved)
+
+def _capacities(streams) -> list:
+    """
+    Payload bytes each frame can carry, frame 0 less the container header and frame table.
+    """
+    header_bits = (FRAME_HEADER_LEN + 4 * len(streams)) * 8
+    if len(streams) > MAX_FRAMES:
+        raise ValueError(f"At most {MAX_FRAMES} frames per container.")
+    if len(streams[0]) < header_bits:
+        raise ValueError(f"First frame too small for the {header_bits // 8}-byte container header.")
+    return [(len(s) - (header_bits if i == 0 else 0)) // 8 for i, s in enumerate(streams)]
+
+def _split(capacities, payload_len: int) -> list:
+    """
+    Payload bytes per frame, in proportion to capacity so every frame carries the
+    same share of its capacity.
+    """
+    total = sum(capacities)
+    if payload_len > total:
+        raise ValueError(f"Payload too large. Capacity ~{total} bytes across {len(capacities)} frames.")
+    lengths = [payload_len * c // total for c in capacities] if total else [0] * len(capacities)
+    rest = payload_len - sum(lengths)
+    for i, c in enumerate(capacities):
+        take = min(rest, c - lengths[i])
+        lengths[i] += take
+        rest -= take
+    return lengths
+
+def _spans(lengths) -> list:
+    spans, off = [], 0
+    for n in lengths:
+        spans.append((off, off + n))
+        off += n
+    return spans
+
+def capacity_bytes_for_frames(path) -> int:
+    """
+    Payload bytes a GIF/APNG/TIFF cover can carry over all its frames.
+    """
+    container = open_frames(path)
+    return sum(_capacities([container.slots(i) for i in range(len(container.frames))]))
+
+def _out_format(container, out_path):
+    ext = os.path.splitext(os.fspath(out_path))[1].lower()
+    if ext not in CONTAINER_EXTENSIONS[container.format]:
+        raise ValueError(f"A {container.format} cover needs a {' or '.join(CONTAINER_EXTENSIONS[container.format])} "
+                         f"output path.")
+
+def encode_frames(cover_path: str, payload_path, passphrase: str, out_path: str, workers: int = None,
+                  profile: str = "balanced") -> FrameEncodeResult:
+    """
+    Embeds a payload across every frame of an animated GIF, APNG or multi-page TIFF
+    cover (random LSB slots, one KDF call). The payload is split over the frames in
+    proportion to their capacity, frames are embedded concurrently on workers threads
+    and re-encoded the same way, and the container is re-muxed into out_path (same
+    format) with frame timing, disposal and palettes unchanged. GIF frames carry
+    payload in palette-index LSBs. payload_path may also be a PayloadSource.
+    All frames are held in memory.
+    """
+    _check_profile(profile)
+    container = open_frames(cover_path, workers)
+    _out_format(container, out_path)
+    source = payload_path if isinstance(payload_path, PayloadSource) else PayloadSource(payload_path)
+    frames, n = container.frames, len(container.frames)
+    streams = [container.slots(i) for i in range(n)]
+    caps = _capacities(streams)
+    lengths = _split(caps, source.size)
+    spans = _spans(lengths)
+    header_bits = (FRAME_HEADER_LEN + 4 * n) * 8
+
+    salt = os.urandom(SALT_LEN)
+    seed, tag = _derive_key(passphrase, salt, ALG_VER_CHECKED)
+    channels = {a.shape[2] for a in frames}
+    delta = SlotDelta(sum(a.size for a in frames), channels.pop() if len(channels) == 1 else 1,
+                      sample_peak(frames[0]))
+
+    def work(i):
+        c0, c1 = spans[i]
+        if c0 == c1:
+            return 0
+        slots = _frame_slots(seed, i, len(streams[i]), header_bits if i == 0 else 0)
+        return embed_chunks(source, c0, c1,
+                            lambda off, data: embed_at(streams[i], shift_slots(slots, (off - c0) * 8), data,
+                                                       None, delta))
+
+    crc = _combine_crcs(_run(work, n, workers), spans)
+    header = FRAME_STRUCT.pack(FRAME_MAGIC, FRAME_VER, SALT_LEN, n, source.size, crc, salt, tag)
+    embed_seq(streams[0], 0, header + struct.pack(f">{n}I", *lengths), delta=delta)
+    data = container.mux(profile, workers)
+    with open(out_path, "wb") as f:
+        f.write(data)
+    q = delta.metrics()
+    return FrameEncodeResult(out_path, container.format, n, sum(caps), source.size, q.psnr_db, q, lengths)
+
+def _read_frame_header(streams):
+    """
+    (payload_len, crc, salt, tag, lengths) from the start of frame 0.
+    """
+    if len(streams[0]) < FRAME_HEADER_LEN * 8:
+        raise ValueError("First frame too small for a container header.")
+    magic, ver, salt_len, n = struct.unpack(">2sBBH", extract_seq(streams[0], 0, FRAME_PREFIX_LEN))
+    if magic != FRAME_MAGIC:
+        raise ValueError("Not a multi-frame stego file (MAGIC mismatch).")
+    if ver != FRAME_VER or salt_len != SALT_LEN:
+        raise ValueError("Unsupported container version or salt length.")
+    if n != len(streams):
+        raise ValueError(f"Container header lists {n} frames, the file has {len(streams)} (re-encoded file?).")
+    caps = _capacities(streams)
+    head = extract_seq(streams[0], 0, FRAME_HEADER_LEN + 4 * n)
+    _, _, _, _, payload_len, crc, salt, tag = FRAME_STRUCT.unpack(head[:FRAME_HEADER_LEN])
+    lengths = list(struct.unpack(f">{n}I", head[FRAME_HEADER_LEN:]))
+    if sum(lengths) != payload_len or any(l > c for l, c in zip(lengths, caps)):
+        raise ValueError("Frame table does not match the payload length or frame capacities.")
+    return payload_len, crc, salt, tag, lengths
+
+def decode_frames(stego_path: str, passphrase: str, out_dir: str, workers: int = None) -> FrameDecodeResult:
+    """
+    Extracts the payload of encode_frames from all frames concurrently into
+    out_dir/extracted_payload.bin. A wrong passphrase raises KeyCheckError before
+    anything is extracted; the output is removed again on errors.
+    """
+    container = open_frames(stego_path, workers)
+    n = len(container.frames)
+    streams = [container.slots(i) for i in range(n)]
+    payload_len, crc, salt, tag, lengths = _read_frame_header(streams)
+    seed, expected = _derive_key(passphrase, salt, ALG_VER_CHECKED)
+    if not hmac.compare_digest(expected, tag):
+        raise KeyCheckError("Wrong passphrase (key-check tag mismatch).")
+    spans = _spans(lengths)
+    header_bits = (FRAME_HEADER_LEN + 4 * n) * 8
+
+    out_path = os.path.join(out_dir, "extracted_payload.bin")
+    sink = PayloadSink(out_path)
+    sink.open(payload_len)
+
+    def work(i):
+        c0, c1 = spans[i]
+        if c0 == c1:
+            return 0
+        slots = _frame_slots(seed, i, len(streams[i]), header_bits if i == 0 else 0)
+        return extract_chunks(c0, c1, lambda off, k: extract_at(streams[i], shift_slots(slots, (off - c0) * 8), k),
+                              sink)
+
+    try:
+        got = _combine_crcs(_run(work, n, workers), spans)
+    except BaseException:
+        sink.discard()
+        raise
+    sink.close()
+    return FrameDecodeResult(out_path, payload_len, got == crc, n)
@@ -0,0 +1,115 @@
+import os
+import threading
+import zlib
+
+from .image_io import as_byte_view
+
+STREAM_CHUNK = 1 << 20  # payload bytes read / extracted per step
+
+class PayloadSource:
+    """
+    Payload given as a file path (read in STREAM_CHUNK pieces, never whole) or
+    an in-memory buffer (sliced without copies).
+    """
+    codec = 0  # compression.CODECS id of the bytes served; see compression.CompressedSource
+
+    def __init__(self, src, chunk: int = STREAM_CHUNK):
+        self.chunk = chunk
+        if isinstance(src, (str, os.PathLike)):
+            self.path, self.buf = os.fspath(src), None
+            self.size = os.path.getsize(self.path)
+        else:
+            self.path, self.buf = None, as_byte_view(src)
+            self.size = len(self.buf)
+
+    def close(self):
+        """
+        Releases anything held for the payload (temporary files of subclasses).
+        """
+
+    def chunks(self, start: int = 0, stop: int = None):
+        """
+        (offset, data) pairs covering payload bytes [start, stop).
+        Each call opens its own file handle, so shards can stream concurrently.
+        """
+        stop = self.size if stop is None else stop
+        if self.buf is not None:
+            for off in range(start, stop, self.chunk):
+                yield off, self.buf[off:min(stop, off + self.chunk)]
+            return
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            off = start
+            while off < stop:
+                data = f.read(min(self.chunk, stop - off))
+                if not data:
+                    raise ValueError("Payload file is shorter than its reported size.")
+                yield off, data
+                off += len(data)
+
+class PayloadSink:
+    """
+    Receives extracted chunks at their payload offsets: written straight to
+    path when given (positional writes, safe across shard threads), otherwise
+    collected in memory for getvalue().
+    """
+    def __init__(self, path: str = None):
+        self.path = path
+        self._f = None
+        self._buf = None
+        self._lock = threading.Lock()
+
+    def open(self, size: int):
+        if self.path is None:
+            self._buf = bytearray(size)
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._f = open(self.path, "wb")
+
+    def write(self, off: int, data):
+        if self._buf is not None:
+            self._buf[off:off + len(data)] = data
+            return
+        with self._lock:
+            if self._f.tell() != off:
+                self._f.seek(off)
+            self._f.write(data)
+
+    def getvalue(self) -> bytes:
+        return bytes(self._buf)
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+
+    def discard(self):
+        """
+        Closes and removes a partially written output file.
+        """
+        if self._f is not None:
+            self._f.close()
+            os.remove(self.path)
+            self._f = None
+
+def embed_chunks(source: PayloadSource, start: int, stop: int, write) -> int:
+    """
+    Calls write(offset, data) for each chunk of payload bytes [start, stop);
+    returns the CRC32 of the range, computed incrementally.
+    """
+    crc = 0
+    for off, data in source.chunks(start, stop):
+        write(off, data)
+        crc = zlib.crc32(data, crc)
+    return crc & 0xFFFFFFFF
+
+def extract_chunks(start: int, stop: int, read, sink: PayloadSink, chunk: int = STREAM_CHUNK) -> int:
+    """
+    Moves payload bytes [start, stop) from read(offset, n) -> bytes into sink,
+    one chunk at a time; returns the CRC32 of the range.
+    """
+    crc = 0
+    for off in range(start, stop, chunk):
+        data = read(off, min(chunk, stop - off))
+        sink.write(off, data)
+        crc = zlib.crc32(data, crc)
+    return crc & 0xFFFFFFFF
@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from .image_io import image_slots, load_pixels, read_leading_slots, slot_view
+from .lsb_random_v2 import BITS_ADAPTIVE, HEADER_LEN, HEADER_MAX_LEN, _read_header
+from .lsb_sequential import HEADER_LEN as SEQ_HEADER_LEN, _read_extra as _read_seq_extra
+
+@dataclass
+class ProbeResult:
+    path: str
+    method: str        # "sequential" or "random"
+    ver: int
+    payload_len: int
+    capacity_bytes: int
+    fast_path: bool    # header read without a full image decode
+
+def capacity_from_metadata(path: str, header_len: int = 28, bits: int = 1) -> int:
+    """
+    Capacity in bytes using only the image size and mode from the file header,
+    with bits payload bits per slot after the header.
+    """
+    return max(0, (image_slots(path) - header_len * 8) * bits // 8)
+
+def probe_header(path: str, allow_full_decode: bool = True) -> Optional[ProbeResult]:
+    """
+    Checks whether path carries an ST header. Only the first pixel rows are decoded
+    for PNG/BMP; other formats fall back to a full decode unless allow_full_decode is False.
+    Returns None when no valid header is found.
+    """
+    slots = read_leading_slots(path, HEADER_MAX_LEN * 8)
+    fast = slots is not None
+    if not fast:
+        if not allow_full_decode:
+            return None
+        slots = slot_view(load_pixels(path))
+    try:
+        header = _read_header(slots)
+    except ValueError:
+        return None
+    # The sequential codec writes an all-zero salt; its later versions lay out the header differently.
+    method = "random" if any(header.salt) else "sequential"
+    try:
+        if method == "sequential":
+            header_len = SEQ_HEADER_LEN[header.ver]
+            bits = _read_seq_extra(slots, header.ver)[2]
+        else:
+            header_len, bits = HEADER_LEN[header.ver], header.bits & ~BITS_ADAPTIVE
+    except (KeyError, ValueError):
+        return None
+    capacity = capacity_from_metadata(path, header_len, bits)
+    if header.payload_len > capacity:
+        return None
+    return ProbeResult(str(path), method, header.ver, header.payload_len, capacity, fast)
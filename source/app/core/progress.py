@@ -0,0 +1,84 @@
+import threading
+from typing import Callable, Optional
+
+from . import instrument
+
+# "load" = file read + image decode, "convert" = mode conversion / pixel buffer exposure
+# "compress" only runs when payload compression is requested
+ENCODE_STAGES = ("load", "compress", "convert", "kdf", "permutation", "embed", "psnr", "save")
+DECODE_STAGES = ("load", "convert", "header", "kdf", "permutation", "extract", "verify", "save")
+SEQ_ENCODE_STAGES = ("load", "compress", "convert", "embed", "psnr", "save")
+SEQ_DECODE_STAGES = ("load", "convert", "header", "extract", "verify", "save")
+
+ProgressCallback = Callable[[str, float], None]
+
+class Cancelled(Exception):
+    """
+    Raised inside encode/decode when the job's CancelToken was cancelled.
+    """
+
+class CancelToken:
+    """
+    Thread-safe cancellation flag checked by the codecs between stages and chunks.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled("Operation cancelled.")
+
+class Reporter:
+    """
+    Maps stage names onto an overall 0..1 fraction for a progress callback and
+    checks the cancel token at each report. Stages split the range evenly;
+    step() reports work done inside the current stage (thread-safe).
+    When instrumentation is enabled, stage transitions of op are also timed.
+    """
+    def __init__(self, stages, callback: Optional[ProgressCallback] = None, cancel: Optional[CancelToken] = None,
+                 op: str = None):
+        self.stages = tuple(stages)
+        self.callback = callback
+        self.cancel = cancel
+        self._rec = instrument.recorder(op)
+        self._stage = None
+        self._total = 0
+        self._done = 0
+        self._lock = threading.Lock()
+
+    def _fraction(self, stage: str, within: float) -> float:
+        return (self.stages.index(stage) + within) / len(self.stages)
+
+    def stage(self, name: str, total: int = 0):
+        if self.cancel is not None:
+            self.cancel.raise_if_cancelled()
+        self._stage, self._total, self._done = name, total, 0
+        if self._rec is not None:
+            self._rec.enter(name)
+        if self.callback is not None:
+            self.callback(name, self._fraction(name, 0.0))
+
+    def step(self, n: int):
+        if self.cancel is not None:
+            self.cancel.raise_if_cancelled()
+        if self.callback is None or not self._total:
+            return
+        with self._lock:
+            self._done += n
+            frac = self._fraction(self._stage, min(1.0, self._done / self._total))
+        self.callback(self._stage, frac)
+
+    def done(self):
+        if self._rec is not None:
+            self._rec.finish()
+        if self.callback is not None:
+            self.callback("done", 1.0)
+
+NULL_REPORTER = Reporter(())
@@ -0,0 +1,149 @@
+import os
+import shutil
+import numpy as np
+
+RAW_FORMATS = {".bmp": "BMP", ".ppm": "PPM", ".pnm": "PPM"}
+
+class _BmpSlots:
+    """
+    RGB row-major slot stream (the codec's slot order) over a BMP pixel region
+    stored bottom-up, in BGR order, with padded rows. Supports what the kernels
+    use: reads and writes through integer index arrays and slices.
+    """
+    ndim = 1
+
+    def __init__(self, mm: np.memmap, offset: int, width: int, height: int, stride: int, bottom_up: bool):
+        self._mm = mm
+        self._row_len = width * 3
+        self.size = width * height * 3
+        rows = np.arange(height, dtype=np.int64)
+        if bottom_up:
+            rows = height - 1 - rows
+        self._row_off = offset + rows * stride
+
+    def __len__(self):
+        return self.size
+
+    def _phys(self, key) -> np.ndarray:
+        if isinstance(key, slice):
+            key = np.arange(*key.indices(self.size), dtype=np.int64)
+        r, rem = np.divmod(np.asarray(key, dtype=np.int64), self._row_len)
+        return self._row_off[r] + rem + 2 - 2 * (rem % 3)  # channel c of a pixel sits at byte 2 - c
+
+    def __getitem__(self, key) -> np.ndarray:
+        return np.asarray(self._mm[self._phys(key)])
+
+    def __setitem__(self, key, value):
+        self._mm[self._phys(key)] = value
+
+class RawImage:
+    """
+    Uncompressed 24-bit BMP or binary 8-bit PPM whose pixel region is mapped
+    with np.memmap. `slots` is the flat RGB slot stream the codecs work on:
+    a plain memmap slice for PPM, a row/channel-remapping view for BMP.
+    Nothing is decoded; reads and writes touch only the pages involved.
+    """
+    def __init__(self, path: str, format: str, width: int, height: int, offset: int, stride: int,
+                 bottom_up: bool, writable: bool):
+        self.path, self.format = path, format
+        self.width, self.height = width, height
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r+" if writable else "r")
+        if format == "PPM":
+            self.slots = self._mm[offset:offset + width * height * 3]
+        else:
+            self.slots = _BmpSlots(self._mm, offset, width, height, stride, bottom_up)
+
+    def flush(self):
+        if self._mm.mode == "r+":
+            self._mm.flush()
+
+    def close(self):
+        self.flush()
+        self.slots = None
+        self._mm._mmap.close()
+        self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _bmp_layout(head: bytes):
+    if len(head) < 54 or head[:2] != b"BM" or int.from_bytes(head[14:18], "little") < 40:
+        return None
+    offset = int.from_bytes(head[10:14], "little")
+    width = int.from_bytes(head[18:22], "little", signed=True)
+    height = int.from_bytes(head[22:26], "little", signed=True)
+    bits = int.from_bytes(head[28:30], "little")
+    compression = int.from_bytes(head[30:34], "little")
+    if bits != 24 or compression != 0 or width <= 0 or height == 0:
+        return None
+    stride = ((width * 24 + 31) // 32) * 4
+    return "BMP", width, abs(height), offset, stride, height > 0
+
+def _ppm_layout(head: bytes):
+    if head[:2] != b"P6":
+        return None
+    fields, pos = [], 2
+    while len(fields) < 3:
+        while pos < len(head) and head[pos:pos + 1].isspace():
+            pos += 1
+        if head[pos:pos + 1] == b"#":  # comment up to end of line
+            pos = head.find(b"\n", pos)
+            if pos < 0:
+                return None
+            continue
+        end = pos
+        while end < len(head) and head[end:end + 1].isdigit():
+            end += 1
+        if end == pos:
+            return None
+        fields.append(int(head[pos:end]))
+        pos = end
+    width, height, maxval = fields
+    if maxval != 255 or width <= 0 or height <= 0 or not head[pos:pos + 1].isspace():
+        return None
+    return "PPM", width, height, pos + 1, width * 3, False
+
+def raw_layout(path):
+    """
+    (format, width, height, pixel offset, row stride, bottom_up) for files the raw
+    backend can map, else None.
+    """
+    with open(path, "rb") as f:
+        head = f.read(512)
+    layout = _bmp_layout(head) if head[:2] == b"BM" else _ppm_layout(head)
+    if layout is None:
+        return None
+    _, width, height, offset, stride, _ = layout
+    if os.path.getsize(path) < offset + stride * (height - 1) + width * 3:
+        return None
+    return layout
+
+def open_raw(path, writable: bool = False):
+    """
+    RawImage for an uncompressed BMP/PPM, or None if the file can't be mapped.
+    """
+    layout = raw_layout(path)
+    if layout is None:
+        return None
+    return RawImage(os.fspath(path), *layout, writable)
+
+def raw_output(cover_path, out_path) -> bool:
+    """
+    True if cover_path can be mapped and out_path asks for the same raw format,
+    so the stego can be produced by patching a copy of the cover file.
+    """
+    fmt = RAW_FORMATS.get(os.path.splitext(os.fspath(out_path))[1].lower())
+    layout = raw_layout(cover_path) if fmt else None
+    return layout is not None and layout[0] == fmt
+
+def copy_for_output(cover_path, out_path) -> RawImage:
+    """
+    Copies the cover file byte for byte (no decode) and maps the copy writable;
+    with out_path == cover_path the cover itself is modified in place.
+    """
+    if os.path.abspath(cover_path) != os.path.abspath(out_path):
+        shutil.copyfile(cover_path, out_path)
+    return open_raw(out_path, writable=True)
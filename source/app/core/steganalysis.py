@@ -0,0 +1,247 @@
+from dataclasses import dataclass
+import numpy as np
+
+BAND_ROWS = 64  # image rows per step; bounds the per-band temporaries
+CHI_MIN_EXPECTED = 4  # value pairs with fewer expected samples are left out of the chi-square sum
+CHI_P_THRESHOLD = 0.5
+TILE_HOT_RATE = 0.5  # tiles where both RS and SPA estimate more than this count as hot
+
+@dataclass
+class LsbScores:
+    chi_p: float       # chi-square attack p-value over all samples (near 1: value pairs equalized by LSB replacement)
+    chi_prefix: float  # leading fraction of rows whose cumulative chi-square p stays above CHI_P_THRESHOLD
+    rs_rate: float     # RS-analysis estimate of the fraction of samples carrying message bits (nan: no estimate)
+    spa_rate: float    # sample pair analysis estimate, same scale
+    tile_rs_p90: float = None   # with tile=: 90th percentile of the per-tile estimates
+    tile_spa_p90: float = None
+    tile_hot: float = None      # with tile=: fraction of tiles above TILE_HOT_RATE (localized embedding)
+
+def _normal_sf(z: np.ndarray) -> np.ndarray:
+    """
+    Standard normal survival function, elementwise: erfc(z / sqrt 2) / 2 from
+    Abramowitz-Stegun 7.1.26 (absolute error below 1e-7).
+    """
+    x = np.abs(z) / np.sqrt(2)
+    t = 1 / (1 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    tail = 0.5 * poly * np.exp(-x * x)
+    return np.where(z >= 0, tail, 1 - tail)
+
+def _chi_p(hist: np.ndarray) -> np.ndarray:
+    """
+    Chi-square attack p-value per histogram row (n, levels): observed even-value counts
+    against the pair means, survival function from the Wilson-Hilferty approximation.
+    All rows at once, so per-band prefixes of tall or finely tiled images cost no Python loop.
+    """
+    even, odd = hist[:, 0::2].astype(np.float64), hist[:, 1::2]
+    expected = (even + odd) / 2
+    valid = expected > CHI_MIN_EXPECTED
+    chi = np.where(valid, (even - expected) ** 2 / np.where(valid, expected, 1), 0).sum(axis=1)
+    df = valid.sum(axis=1) - 1
+    p = np.full(len(hist), np.nan)
+    ok = df > 0
+    k = df[ok].astype(np.float64)
+    z = ((chi[ok] / k) ** (1 / 3) - (1 - 2 / (9 * k))) / np.sqrt(2 / (9 * k))
+    p[ok] = _normal_sf(z)
+    return p
+
+def _flip_minus(x):
+    return ((x + 1) ^ 1) - 1  # F-1: 2k <-> 2k - 1
+
+def _rs_counts(x: np.ndarray, per_tile: int) -> np.ndarray:
+    """
+    RS counts (R_M, S_M, R_-M, S_-M for x, then for x with every LSB flipped) of the
+    horizontal groups of four samples in band x (h, W, C; signed ints), mask 0110,
+    per column tile of per_tile groups. Returns (tiles, 8).
+    """
+    h, w, c = x.shape
+    g = x[:, :w - w % 4].reshape(h, -1, 4, c)
+    starts = np.arange(0, g.shape[1], per_tile)
+    out = []
+    for flip in (0, 1):
+        a0, a1, a2, a3 = (g[:, :, i] ^ flip for i in range(4))
+        f0 = np.abs(a1 - a0) + np.abs(a2 - a1) + np.abs(a3 - a2)
+        for fn in (lambda v: v ^ 1, _flip_minus):
+            m1, m2 = fn(a1), fn(a2)
+            fm = np.abs(m1 - a0) + np.abs(m2 - m1) + np.abs(a3 - m2)
+            out += [np.add.reduceat((fm > f0).sum(axis=(0, 2)), starts),
+                    np.add.reduceat((fm < f0).sum(axis=(0, 2)), starts)]
+    return np.stack(out, axis=1)
+
+def _rs_tables():
+    """
+    Lookup tables for 8-bit RS counting. For a group (a0, a1, a2, a3), the change
+    of the discrimination function under each of the 4 flippings (F1, F-1, on x and
+    on x with flipped LSBs) is a sum of per-pair terms; _RS_PAIR[k][a << 8 | b] packs
+    the 4 terms (+ bias) of pair k into 4-bit fields, so one uint16 sum per group
+    holds all four changes. _RS_CLASS maps that sum to R/S bits in _rs_counts order.
+    """
+    v = np.arange(65536, dtype=np.int32)
+    p, q = v >> 8, v & 0xFF
+    f1, fm = (lambda t: t ^ 1), _flip_minus
+    terms = (  # (a0, a1): a1 flipped; (a1, a2): both; (a2, a3): a2 flipped
+        lambda p, q, f: np.abs(f(q) - p) - np.abs(q - p) + 1,
+        lambda p, q, f: np.abs(f(q) - f(p)) - np.abs(q - p) + 2,
+        lambda p, q, f: np.abs(q - f(p)) - np.abs(q - p) + 1,
+    )
+    pair = []
+    for term in terms:
+        fields = [term(p ^ flip, q ^ flip, f) for flip in (0, 1) for f in (f1, fm)]
+        pair.append(sum(t << (4 * k) for k, t in enumerate(fields)).astype(np.uint16))
+    cls = np.zeros(65536, dtype=np.int32)
+    for k in range(4):
+        field = (v >> (4 * k)) & 15
+        cls |= ((field > 4) << (2 * k)) | ((field < 4) << (2 * k + 1))
+    return pair, cls.astype(np.uint8)
+
+def _spa_table() -> np.ndarray:
+    """
+    _SPA_CLASS[u << 8 | v]: bit 0 = pair in X, bit 1 = in Y, bit 2 = in K (see _spa_counts).
+    """
+    v = np.arange(65536, dtype=np.int32)
+    a, b = v >> 8, v & 0xFF
+    odd = (b & 1).astype(bool)
+    x = np.where(odd, a > b, a < b)
+    y = np.where(odd, a < b, a > b)
+    return (x | (y << 1) | (((a >> 1) == (b >> 1)) << 2)).astype(np.uint8)
+
+_RS_PAIR, _RS_CLASS = _rs_tables()
+_SPA_CLASS = _spa_table()
+_BITS = (np.arange(256)[:, None] >> np.arange(8)) & 1  # class -> set bits
+_RS_BITS, _SPA_BITS = _BITS[_RS_CLASS], _BITS[_SPA_CLASS, :3]  # per table index
+
+def _pair_index(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    idx = a.astype(np.uint16)
+    idx <<= 8
+    idx |= b
+    return idx
+
+def _class_counts(values: np.ndarray, table: np.ndarray, value_bits: np.ndarray, per_tile: int) -> np.ndarray:
+    """
+    Counts of each class bit (bit k of table[values]; value_bits[v, k]) per column
+    tile of per_tile columns along axis 1 of values. A single tile is counted with
+    one bincount over the raw values.
+    """
+    cols, bits = values.shape[1], value_bits.shape[1]
+    n = -(-cols // per_tile)
+    if n == 1:
+        return (np.bincount(values.reshape(-1), minlength=65536) @ value_bits)[None]
+    tiles = (np.arange(cols) // per_tile) << bits
+    cls = table[values] + tiles[None, :, None]
+    return np.bincount(cls.reshape(-1), minlength=n << bits).reshape(n, 1 << bits) @ _BITS[:1 << bits, :bits]
+
+def _counts_u8(band: np.ndarray, per_tile: int):
+    """
+    (_rs_counts, _spa_counts) for a uint8 band from one table of adjacent-pair
+    indices: every pair feeds SPA, and the three pairs inside each group of four
+    give the group's RS code through three table lookups.
+    """
+    h, w, c = band.shape
+    pairs = _pair_index(band[:, :-1], band[:, 1:])
+    groups = w // 4
+    code = _RS_PAIR[0][pairs[:, 0:4 * groups:4]]
+    code += _RS_PAIR[1][pairs[:, 1:4 * groups:4]]
+    code += _RS_PAIR[2][pairs[:, 2:4 * groups:4]]
+    rs = _class_counts(code, _RS_CLASS, _RS_BITS, per_tile // 4)
+    spa = _class_counts(pairs, _SPA_CLASS, _SPA_BITS, per_tile)
+    n_pairs = np.diff(np.append(np.arange(0, w - 1, per_tile), w - 1)) * h * c
+    return rs, np.column_stack([spa, n_pairs])
+
+def _rs_rate(counts: np.ndarray) -> np.ndarray:
+    """
+    Fridrich's RS estimate per row of counts from _rs_counts: the smaller root z
+    of 2(d1 + d0)z^2 + (d-0 - d-1 - d1 - 3d0)z + d0 - d-0, rate z / (z - 1/2).
+    """
+    c = counts.astype(np.float64)
+    d0, dn0, d1, dn1 = c[:, 0] - c[:, 1], c[:, 2] - c[:, 3], c[:, 4] - c[:, 5], c[:, 6] - c[:, 7]
+    return _rate(2 * (d1 + d0), dn0 - dn1 - d1 - 3 * d0, d0 - dn0, lambda z: z / (z - 0.5))
+
+def _spa_counts(x: np.ndarray, per_tile: int) -> np.ndarray:
+    """
+    Sample pair counts (X, Y, K, pairs) over horizontally adjacent samples (u, v)
+    of band x (signed ints), per column tile of per_tile pairs. X: v even and u < v
+    or v odd and u > v; Y: the reverse; K: u >> 1 == v >> 1. Returns (tiles, 4).
+    """
+    u, v = x[:, :-1], x[:, 1:]
+    starts = np.arange(0, u.shape[1], per_tile)
+    odd = (v & 1).astype(bool)
+    lt, gt = u < v, u > v
+    cols = [np.where(odd, gt, lt), np.where(odd, lt, gt), (u >> 1) == (v >> 1)]
+    out = [np.add.reduceat(m.sum(axis=(0, 2)), starts) for m in cols]
+    pairs = np.diff(np.append(starts, u.shape[1])) * u.shape[0] * u.shape[2]
+    return np.stack(out + [pairs], axis=1)
+
+def _spa_rate(counts: np.ndarray) -> np.ndarray:
+    """
+    Dumitrescu's sample pair estimate per row of counts from _spa_counts: the
+    smaller root b of 2K b^2 + 2(2X - P) b + Y - X, rate 2b.
+    """
+    x, y, k, n = counts.astype(np.float64).T
+    return _rate(2 * k, 2 * (2 * x - n), y - x, lambda b: 2 * b)
+
+def _rate(a: np.ndarray, b: np.ndarray, c: np.ndarray, scale) -> np.ndarray:
+    """
+    scale(root) for the root of a z^2 + b z + c with the smaller magnitude, clipped to
+    [0, 1]. No real root is what saturated (fully embedded) samples give, reported
+    as 1; nan when the counts carry no information (a = b = 0, e.g. flat tiles).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d = b * b - 4 * a * c
+        disc = np.sqrt(np.maximum(d, 0))
+        r1, r2 = (-b + disc) / (2 * a), (-b - disc) / (2 * a)
+        z = np.where(np.abs(r1) < np.abs(r2), r1, r2)
+        z = np.where(a == 0, -c / b, z)
+        return np.where((d < 0) & (a != 0), 1.0, np.clip(scale(z), 0, 1))
+
+def _p90(values: np.ndarray) -> float:
+    return float(np.nanpercentile(values, 90)) if np.isfinite(values).any() else float("nan")
+
+def analyze(arr: np.ndarray, tile: int = None, band_rows: int = BAND_ROWS) -> LsbScores:
+    """
+    Chi-square, RS and sample pair statistics of an image array (image_io.load_pixels
+    layout) over all its samples, vectorized per band of rows. 8-bit images are
+    counted through lookup tables and bincount without widening; 16-bit images
+    widen one band at a time to int32. No float copy of the image is made.
+    With tile (a multiple of 4), RS and SPA are also estimated per tile x tile
+    block, which shows embeddings confined to part of the image (sequential).
+    """
+    if arr.ndim == 2:
+        arr = arr[..., None]
+    H, W, C = arr.shape
+    if W < 4:
+        raise ValueError("Image too small for analysis (needs at least 4 columns).")
+    if tile is not None:
+        if tile < 4 or tile % 4:
+            raise ValueError("tile must be a positive multiple of 4.")
+        band_rows = tile
+    per_tile = tile or W
+    levels = 1 << (8 * arr.dtype.itemsize)
+
+    hists, rs, spa, tile_rs, tile_spa = [], 0, 0, [], []
+    for r0 in range(0, H, band_rows):
+        band = arr[r0:r0 + band_rows]
+        hists.append(np.bincount(band.reshape(-1), minlength=levels))
+        if arr.dtype == np.uint8:
+            rc, sc = _counts_u8(band, per_tile)
+        else:
+            x = band.astype(np.int32)
+            rc, sc = _rs_counts(x, per_tile // 4), _spa_counts(x, per_tile)
+        rs, spa = rs + rc.sum(axis=0), spa + sc.sum(axis=0)
+        if tile:
+            tile_rs.append(_rs_rate(rc))
+            tile_spa.append(_spa_rate(sc))
+
+    p = _chi_p(np.cumsum(np.stack(hists), axis=0))
+    below = np.flatnonzero(~(p > CHI_P_THRESHOLD))
+    prefix = 1.0 if not len(below) else below[0] * band_rows / H
+    return LsbScores(
+        chi_p=float(p[-1]),
+        chi_prefix=float(prefix),
+        rs_rate=float(_rs_rate(rs[None])[0]),
+        spa_rate=float(_spa_rate(spa[None])[0]),
+        **(_tile_scores(np.concatenate(tile_rs), np.concatenate(tile_spa)) if tile else {}),
+    )
+
+def _tile_scores(rs: np.ndarray, spa: np.ndarray) -> dict:
+    return {"tile_rs_p90": _p90(rs), "tile_spa_p90": _p90(spa),
+            "tile_hot": float(((rs > TILE_HOT_RATE) & (spa > TILE_HOT_RATE)).mean())}
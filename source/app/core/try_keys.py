@@ -0,0 +1,144 @@
+import multiprocessing as mp
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .image_io import load_pixels, slot_view
+from .lsb_random_v2 import KeyCheckError, _check_key, _extract, _read_header
+from .payload_stream import PayloadSink
+from .raw_pixels import open_raw
+
+@dataclass
+class TryKeysResult:
+    passphrase: str      # matching candidate, None if none matched
+    index: int           # its position in the candidate list (-1 if none)
+    output_path: str     # extracted_payload.bin in out_dir, None for in-memory results or no match
+    payload_len: int
+    tried: int           # candidates evaluated before stopping
+    candidates: int      # distinct candidates given
+    payload: bytes = None  # extracted payload when no out_dir was given
+
+class _CrcSink:
+    """
+    Sink that drops the extracted bytes; trial extractions only need the CRC.
+    """
+    def open(self, size: int):
+        pass
+
+    def write(self, off: int, data):
+        pass
+
+_trial_state = None  # (header, slot stream, its shared memory) in pool workers, set by _init_worker
+
+def _init_worker(header, shm_name: str, n_slots: int):
+    global _trial_state
+    shm = shared_memory.SharedMemory(shm_name) if shm_name else None
+    flat = np.ndarray(n_slots, dtype=np.uint8, buffer=shm.buf) if shm is not None else None
+    _trial_state = (header, flat, shm)
+
+def _trial(header, flat, passphrase: str) -> bool:
+    """
+    True if passphrase may be the key: the key-check tag matches (tagged headers,
+    one KDF call), or the payload extracted with it has the header CRC (untagged).
+    """
+    if header.tag:
+        try:
+            _check_key(header, passphrase)
+        except KeyCheckError:
+            return False
+        return True
+    return _extract(flat, passphrase, _CrcSink(), workers=1)[1]
+
+def _worker_trial(index: int, passphrase: str):
+    header, flat, _ = _trial_state
+    return index, _trial(header, flat, passphrase)
+
+def _pool_context():
+    # Callers may run threads (GUI job queue, async API, service), so workers are never
+    # forked from this process: forkserver forks from its own single-threaded server.
+    return mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+
+def _candidates_in_pool(header, flat, candidates, workers: int):
+    """
+    Yields (index, passed) as workers finish; at most 2 * workers trials are queued,
+    so stopping the generator early leaves little work behind.
+    """
+    shm = None
+    if not header.tag:  # tag checks need the header only; CRC trials share one copy of the slot stream
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(flat)))
+        view = np.ndarray(len(flat), dtype=np.uint8, buffer=shm.buf)
+        view[:] = flat[0:len(flat)]
+        del view
+    ex = None
+    try:
+        ex = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(), initializer=_init_worker,
+                                 initargs=(header, shm.name if shm is not None else None, len(flat)))
+        pending, it = set(), iter(enumerate(candidates))
+        while True:
+            for index, pw in it:
+                pending.add(ex.submit(_worker_trial, index, pw))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield fut.result()
+    finally:
+        if ex is not None:
+            ex.shutdown(wait=False, cancel_futures=True)
+        if shm is not None:  # workers still mapping it keep their pages until they exit
+            shm.close()
+            shm.unlink()
+
+def try_keys(stego, passphrases, out_dir: str = None, workers: int = None) -> TryKeysResult:
+    """
+    Finds which of several candidate passphrases opens a random-method stego image.
+    The image (path, bytes, PIL image or pixel array; raw BMP/PPM paths are memory
+    mapped) and its header are read once. Candidates are tried on a process pool
+    of workers processes (default: one per CPU; 1 tries them in this process):
+    tagged headers (modes checked/sharded, compressed) need one KDF call per
+    candidate, older ones a CRC-only extraction. The first candidate that passes is
+    extracted again here with the CRC checked; only that one is written, to
+    out_dir/extracted_payload.bin, or returned in .payload when out_dir is None.
+    Trials still queued are cancelled.
+    """
+    candidates = list(dict.fromkeys(passphrases))
+    raw = open_raw(stego) if isinstance(stego, (str, os.PathLike)) else None
+    try:
+        flat = raw.slots if raw is not None else slot_view(load_pixels(stego))
+        header = _read_header(flat)
+        workers = min(workers or os.cpu_count() or 1, max(1, len(candidates)))
+        if workers == 1:
+            trials = ((i, _trial(header, flat, pw)) for i, pw in enumerate(candidates))
+        else:
+            trials = _candidates_in_pool(header, flat, candidates, workers)
+        tried = 0
+        try:
+            for index, passed in trials:
+                tried += 1
+                if not passed:
+                    continue
+                out_path = os.path.join(out_dir, "extracted_payload.bin") if out_dir is not None else None
+                sink = PayloadSink(out_path)
+                try:
+                    header, crc_ok = _extract(flat, candidates[index], sink)
+                except BaseException:
+                    sink.discard()
+                    raise
+                if not crc_ok:  # tag collision: keep looking
+                    sink.discard()
+                    continue
+                sink.close()
+                return TryKeysResult(candidates[index], index, out_path, header.raw_len, tried, len(candidates),
+                                     None if out_path else sink.getvalue())
+        finally:
+            if hasattr(trials, "close"):
+                trials.close()
+    finally:
+        if raw is not None:
+            raw.close()
+    return TryKeysResult(None, -1, None, 0, tried, len(candidates))
@@ -0,0 +1,167 @@
+import io
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+from PIL import Image, features
+
+from .image_io import pixel_mode
+
+# Per format: Pillow save options for each profile. PNG "fastest"/"balanced" go through
+# the band writer below instead (level, scanline filter); "smallest" uses Pillow's optimizer.
+PROFILES = ("fastest", "balanced", "smallest")
+PNG_PROFILES = {"fastest": (1, "up"), "balanced": (4, "up")}
+SAVE_OPTIONS = {
+    "PNG": {"smallest": {"optimize": True}},
+    "TIFF": {"fastest": {"compression": None}, "balanced": {"compression": None},
+             "smallest": {"compression": "tiff_adobe_deflate"}},
+    "WEBP": {"fastest": {"lossless": True, "method": 0, "quality": 0},
+             "balanced": {"lossless": True, "method": 4, "quality": 50},
+             "smallest": {"lossless": True, "method": 6, "quality": 100}},
+    "BMP": {},
+    "PPM": {},
+}
+# Pixel modes (image_io.pixel_mode) each format stores losslessly and reads back unchanged;
+# PNG takes every mode. WebP drops an all-opaque alpha channel and BMP ignores alpha on read.
+FORMAT_MODES = {"TIFF": ("L", "LA", "RGB", "RGBA", "I;16"), "WEBP": ("RGB",), "BMP": ("L", "RGB"),
+                "PPM": ("L", "RGB")}
+PIL_SAVE_MODES = ("L", "LA", "RGB", "RGBA", "I;16")  # the rest (16-bit color) goes through encode_png_bands
+PNG_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}  # channels -> PNG color type
+EXTENSIONS = {".png": "PNG", ".bmp": "BMP", ".tif": "TIFF", ".tiff": "TIFF", ".webp": "WEBP",
+              ".ppm": "PPM", ".pnm": "PPM"}
+BAND_BYTES = 4 << 20  # raw scanline bytes per compressed PNG band
+
+@dataclass
+class WriteResult:
+    path: str
+    format: str
+    profile: str
+    bytes_written: int
+    seconds: float
+
+def format_for_path(path, format: str = None) -> str:
+    """
+    Output format: explicit format, else from the extension (unknown extensions stay PNG).
+    """
+    if format is not None:
+        format = format.upper()
+    else:
+        format = EXTENSIONS.get(os.path.splitext(os.fspath(path))[1].lower(), "PNG")
+    if format not in SAVE_OPTIONS:
+        raise ValueError(f"Unsupported output format {format!r}. Expected one of: {', '.join(SAVE_OPTIONS)}.")
+    if format == "WEBP" and not features.check("webp"):
+        raise ValueError("This Pillow build has no WebP support.")
+    return format
+
+def _check_profile(profile: str):
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile {profile!r}. Expected one of: {', '.join(PROFILES)}.")
+
+def _chunk(ctype: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + ctype + data + struct.pack(">I", zlib.crc32(data, zlib.crc32(ctype)))
+
+def _filter_rows(rows: np.ndarray, prev: np.ndarray, method: str) -> np.ndarray:
+    """
+    (n, row bytes) scanlines -> (n, 1 + row bytes) filtered PNG lines; prev is the row above rows[0].
+    """
+    out = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    if method == "none":
+        out[:, 0] = 0
+        out[:, 1:] = rows
+    else:  # "up": byte minus the byte above (mod 256)
+        out[:, 0] = 2
+        np.subtract(rows[:1], prev[None], out=out[:1, 1:])
+        np.subtract(rows[1:], rows[:-1], out=out[1:, 1:])
+    return out
+
+def encode_png_bands(arr: np.ndarray, level: int = 1, filter: str = "none", workers: int = None) -> bytes:
+    """
+    PNG encoder that filters and deflates horizontal bands independently on a
+    thread pool (zlib releases the GIL) and joins them into one zlib stream:
+    every band but the last ends on a sync flush, so the raw deflate streams
+    concatenate, and the Adler-32 is accumulated over the bands in order.
+    arr is (H, W, C) with 1..4 channels of uint8 or uint16 samples (16-bit PNG).
+    workers=None uses up to one thread per CPU; callers that already run jobs in
+    parallel (batch processes, service workers, async executors) pass 1.
+    """
+    H, W, C = arr.shape
+    depth = arr.dtype.itemsize * 8
+    row_len = W * C * arr.dtype.itemsize
+    band_rows = max(1, BAND_BYTES // (row_len + 1))
+    bands = [(r, min(H, r + band_rows)) for r in range(0, H, band_rows)]
+    zero = np.zeros(row_len, dtype=np.uint8)
+
+    def scanlines(r0, r1):  # 16-bit samples are stored big-endian
+        return arr[r0:r1].astype(">u2" if depth == 16 else np.uint8, copy=False).view(np.uint8).reshape(-1, row_len)
+
+    def work(i):
+        r0, r1 = bands[i]
+        raw = _filter_rows(scanlines(r0, r1), scanlines(r0 - 1, r0)[0] if r0 else zero, filter).tobytes()
+        c = zlib.compressobj(level, zlib.DEFLATED, -15)
+        body = c.compress(raw) + c.flush(zlib.Z_FINISH if i == len(bands) - 1 else zlib.Z_SYNC_FLUSH)
+        return body, zlib.adler32(raw), len(raw)
+
+    n = workers or min(len(bands), os.cpu_count() or 1)
+    if n > 1:
+        with ThreadPoolExecutor(max_workers=n) as ex:
+            parts = list(ex.map(work, range(len(bands))))
+    else:
+        parts = [work(i) for i in range(len(bands))]
+
+    adler = 1
+    for _, a, length in parts:
+        adler = _adler32_combine(adler, a, length)
+    cmf_flg = b"\x78\x01" if level <= 1 else b"\x78\x9c" if level < 7 else b"\x78\xda"
+    idat = cmf_flg + b"".join(p[0] for p in parts) + struct.pack(">I", adler)
+    ihdr = struct.pack(">IIBBBBB", W, H, depth, PNG_COLOR_TYPES[C], 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", ihdr) + _chunk(b"IDAT", idat) + _chunk(b"IEND", b"")
+
+def _adler32_combine(a1: int, a2: int, len2: int) -> int:
+    """
+    Adler-32 of A + B from adler32(A), adler32(B) and len(B) (zlib's adler32_combine).
+    """
+    base = 65521
+    rem = len2 % base
+    s1 = a1 & 0xFFFF
+    s2 = (rem * s1) % base
+    s1 += (a2 & 0xFFFF) + base - 1
+    s2 += ((a1 >> 16) & 0xFFFF) + ((a2 >> 16) & 0xFFFF) + base - rem
+    s1 %= base
+    s2 %= base
+    return (s2 << 16) | s1
+
+def encode_image(arr: np.ndarray, format: str = "PNG", profile: str = "balanced", workers: int = None) -> bytes:
+    """
+    Encoded bytes of an image in a lossless format and profile, in the image's own
+    mode: arr is an (H, W, 3) uint8 array or any image_io.load_pixels layout.
+    Raises ValueError for modes the format can't store (16-bit color is PNG only).
+    """
+    _check_profile(profile)
+    format = format_for_path("", format)
+    if arr.ndim == 2:
+        arr = arr[..., None]
+    mode = pixel_mode(arr)
+    if format != "PNG" and mode not in FORMAT_MODES[format]:
+        raise ValueError(f"{format} output can't store {mode} pixels losslessly; use PNG.")
+    if format == "PNG" and (profile in PNG_PROFILES or mode not in PIL_SAVE_MODES):
+        level, filter = PNG_PROFILES.get(profile, (9, "up"))
+        return encode_png_bands(arr, level, filter, workers)
+    buf = io.BytesIO()
+    img = Image.fromarray(arr[..., 0] if arr.shape[2] == 1 else arr)  # mode follows shape and dtype
+    img.save(buf, format=format, **SAVE_OPTIONS[format].get(profile, {}))
+    return buf.getvalue()
+
+def write_image(arr: np.ndarray, out_path: str, profile: str = "balanced", format: str = None,
+                workers: int = None) -> WriteResult:
+    """
+    Writes arr to out_path; the format comes from format or the file extension.
+    """
+    t0 = time.perf_counter()
+    fmt = format_for_path(out_path, format)
+    data = encode_image(arr, fmt, profile, workers)
+    with open(out_path, "wb") as f:
+        f.write(data)
+    return WriteResult(os.fspath(out_path), fmt, profile, len(data), time.perf_counter() - t0)
@@ -0,0 +1,72 @@
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Callable
+
+from ..core.progress import CancelToken, Cancelled
+
+@dataclass
+class Job:
+    name: str
+    fn: Callable  # fn(progress=..., cancel=...) -> result
+    token: CancelToken = field(default_factory=CancelToken)
+
+class JobQueue:
+    """
+    Runs jobs one at a time on a daemon worker thread. The Tk side polls
+    `events` (kind, job, data) from the main loop; kinds are "started",
+    "progress" ((stage, fraction)), "done" (result), "error" (exception)
+    and "cancelled".
+    """
+    def __init__(self):
+        self.events = queue.Queue()
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = []
+        self.current = None
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, name: str, fn: Callable) -> Job:
+        job = Job(name, fn)
+        with self._lock:
+            self._pending.append(job)
+        self._jobs.put(job)
+        return job
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def cancel_current(self):
+        job = self.current
+        if job is not None:
+            job.token.cancel()
+
+    def cancel_all(self):
+        with self._lock:
+            jobs = list(self._pending) + ([self.current] if self.current is not None else [])
+        for job in jobs:
+            job.token.cancel()
+
+    def _loop(self):
+        while True:
+            job = self._jobs.get()
+            with self._lock:  # cancel_all sees the job either pending or current
+                self._pending.remove(job)
+                self.current = job
+            if job.token.cancelled:
+                self.current = None
+                self.events.put(("cancelled", job, None))
+                continue
+            self.events.put(("started", job, None))
+            try:
+                res = job.fn(progress=lambda stage, frac, j=job: self.events.put(("progress", j, (stage, frac))),
+                             cancel=job.token)
+                self.events.put(("done", job, res))
+            except Cancelled:
+                self.events.put(("cancelled", job, None))
+            except Exception as e:
+                self.events.put(("error", job, e))
+            finally:
+                self.current = None
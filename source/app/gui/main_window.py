@@ -1,7 +1,14 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
+import os
+import queue
+from functools import partial
+
 from ..core.lsb_random_v2 import capacity_bytes_for_image, encode_v2, decode_v2
+from .jobs import JobQueue
+
+POLL_MS = 100
 
 class App(tk.Tk):
     def __init__(self):
@@ -16,7 +23,60 @@ class App(tk.Tk):
         nb.add(self.decode_tab, text="Decode")
         nb.pack(expand=True, fill="both")
 
-class EncodeTab(ttk.Frame):
+class JobFrame(ttk.Frame):
+    """
+    Tab base: runs codec calls on a JobQueue worker and shows progress, queue size and Cancel
+    (running job) / Cancel all (running and queued).
+    """
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.jobs = JobQueue()
+
+    def build_job_row(self, row: int):
+        pad = {"padx": 8, "pady": 6}
+        self.progress = ttk.Progressbar(self, length=420, maximum=1.0)
+        self.progress.grid(row=row, column=1, sticky="w", **pad)
+        ttk.Button(self, text="Cancel", command=self.jobs.cancel_current).grid(row=row, column=2, **pad)
+        self.status_label = ttk.Label(self, text="Idle")
+        self.status_label.grid(row=row + 1, column=1, sticky="w", **pad)
+        ttk.Button(self, text="Cancel all", command=self.jobs.cancel_all).grid(row=row + 1, column=2, **pad)
+        self.after(POLL_MS, self._poll)
+
+    def _poll(self):
+        try:
+            while True:
+                kind, job, data = self.jobs.events.get_nowait()
+                self._handle(kind, job, data)
+        except queue.Empty:
+            pass
+        self.after(POLL_MS, self._poll)
+
+    def _handle(self, kind, job, data):
+        queued = self.jobs.pending
+        suffix = f" | {queued} queued" if queued else ""
+        if kind == "progress":
+            stage, frac = data
+            self.progress.configure(value=frac)
+            self.status_label.configure(text=f"{job.name}: {stage} ({frac:.0%}){suffix}")
+        elif kind == "started":
+            self.progress.configure(value=0.0)
+            self.status_label.configure(text=f"{job.name}: started{suffix}")
+        elif kind == "cancelled":
+            self.progress.configure(value=0.0)
+            self.status_label.configure(text=f"{job.name}: cancelled{suffix}")
+        elif kind == "error":
+            self.progress.configure(value=0.0)
+            self.status_label.configure(text=f"{job.name}: failed{suffix}")
+            messagebox.showerror("Error", f"{job.name}\n{data}")
+        elif kind == "done":
+            self.progress.configure(value=1.0)
+            self.status_label.configure(text=f"{job.name}: done{suffix}")
+            self.on_done(job, data)
+
+    def on_done(self, job, res):
+        pass
+
+class EncodeTab(JobFrame):
     def __init__(self, parent):
         super().__init__(parent)
         pad = {"padx": 8, "pady": 6}
@@ -44,10 +104,11 @@ class EncodeTab(ttk.Frame):
         ttk.Entry(self, textvariable=self.out_var, width=60).grid(row=4, column=1, **pad)
         ttk.Button(self, text="Save as...", command=self.pick_output).grid(row=4, column=2, **pad)
 
-        ttk.Button(self, text="Embed", command=self.run_embed).grid(row=5, column=1, sticky="w", **pad)
+        ttk.Button(self, text="Embed (add to queue)", command=self.run_embed).grid(row=5, column=1, sticky="w", **pad)
 
         self.result_label = ttk.Label(self, text="", foreground="green")
         self.result_label.grid(row=6, column=1, sticky="w", **pad)
+        self.build_job_row(7)
 
     def pick_cover(self):
         path = filedialog.askopenfilename(filetypes=[("Image", "*.png;*.bmp;*.jpg;*.jpeg"), ("All", "*.*")])
@@ -84,14 +145,14 @@ class EncodeTab(ttk.Frame):
         if not cover or not payload or not out_path or not pw:
             messagebox.showwarning("Warn", "Điền đủ Cover, Payload, Passphrase, Output.")
             return
-        try:
-            res = encode_v2(cover, payload, pw, out_path)
-            self.result_label.configure(text=f"OK -> PSNR={res.psnr_db:.2f} dB | used {res.used_bytes}/{res.capacity_bytes} bytes")
-            messagebox.showinfo("Done", f"Stego saved: {res.stego_path}\nPSNR={res.psnr_db:.2f} dB")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        self.jobs.submit(f"Embed {os.path.basename(cover)}", partial(encode_v2, cover, payload, pw, out_path))
+        self.status_label.configure(text=f"Queued ({self.jobs.pending} pending)")
 
-class DecodeTab(ttk.Frame):
+    def on_done(self, job, res):
+        self.result_label.configure(text=f"OK -> PSNR={res.psnr_db:.2f} dB | used {res.used_bytes}/{res.capacity_bytes} bytes")
+        messagebox.showinfo("Done", f"Stego saved: {res.stego_path}\nPSNR={res.psnr_db:.2f} dB")
+
+class DecodeTab(JobFrame):
     def __init__(self, parent):
         super().__init__(parent)
         pad = {"padx": 8, "pady": 6}
@@ -114,6 +175,7 @@ class DecodeTab(ttk.Frame):
 
         self.result_label = ttk.Label(self, text="", foreground="green")
         self.result_label.grid(row=4, column=1, sticky="w", **pad)
+        self.build_job_row(5)
 
     def pick_stego(self):
         path = filedialog.askopenfilename(filetypes=[("PNG", "*.png"), ("All", "*.*")])
@@ -133,13 +195,12 @@ class DecodeTab(ttk.Frame):
         if not stego or not out_dir or not pw:
             messagebox.showwarning("Warn", "Điền đủ Stego, Passphrase, Output dir.")
             return
-        try:
-            res = decode_v2(stego, pw, out_dir)
-            status = "CRC OK" if res.crc_ok else "CRC FAIL (passphrase sai hoặc dữ liệu hỏng)"
-            self.result_label.configure(text=f"Saved! {status} | size={res.payload_len} bytes")
-            messagebox.showinfo("Done", f"Extracted: {res.output_path}\n{status}")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        self.jobs.submit(f"Extract {os.path.basename(stego)}", partial(decode_v2, stego, pw, out_dir))
+
+    def on_done(self, job, res):
+        status = "CRC OK" if res.crc_ok else "CRC FAIL (passphrase sai hoặc dữ liệu hỏng)"
+        self.result_label.configure(text=f"Saved! {status} | size={res.payload_len} bytes")
+        messagebox.showinfo("Done", f"Extracted: {res.output_path}\n{status}")
 
 def run():
     app = App()
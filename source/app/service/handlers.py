@@ -0,0 +1,91 @@
+import base64
+from dataclasses import asdict
+
+from ..core import lsb_random_v2, lsb_sequential
+from ..core.crypto_utils import KDF_CACHE
+
+# Request bodies are JSON. Images and payloads are given either as local paths
+# ("<name>_path") or inline as base64 ("<name>_b64"); results mirror that choice.
+# Every worker process runs one job at a time, so the codecs get workers=1
+# (no shard or PNG encoder threads on top of the pool).
+
+def _blob(params: dict, name: str):
+    if params.get(f"{name}_path"):
+        return params[f"{name}_path"]
+    if params.get(f"{name}_b64"):
+        return base64.b64decode(params[f"{name}_b64"])
+    raise ValueError(f"Missing {name}_path or {name}_b64.")
+
+def _payload_bytes(params: dict) -> bytes:
+    src = _blob(params, "payload")
+    if isinstance(src, str):
+        with open(src, "rb") as f:
+            return f.read()
+    return src
+
+def _method(params: dict) -> str:
+    method = params.get("method", "random")
+    if method not in ("random", "sequential"):
+        raise ValueError(f"Unknown method {method!r}. Expected random or sequential.")
+    return method
+
+def _passphrase(params: dict) -> str:
+    if not params.get("passphrase"):
+        raise ValueError("passphrase is required for the random method.")
+    return params["passphrase"]
+
+def encode(params: dict) -> dict:
+    method = _method(params)
+    profile = params.get("profile", "balanced")
+    if params.get("out_path"):
+        if method == "sequential":
+            res = lsb_sequential.encode_sequential(params["cover_path"], params["payload_path"], params["out_path"],
+                                                   profile=profile, workers=1)
+        else:
+            res = lsb_random_v2.encode_v2(params["cover_path"], params["payload_path"], _passphrase(params),
+                                          params["out_path"], mode=params.get("mode", "shuffle"),
+                                          shards=params.get("shards"), workers=1, profile=profile)
+        return asdict(res)
+    fmt = params.get("format", "PNG")
+    if method == "sequential":
+        data = lsb_sequential.encode_bytes(_blob(params, "cover"), _payload_bytes(params), fmt, profile=profile,
+                                           workers=1)
+    else:
+        data = lsb_random_v2.encode_bytes(_blob(params, "cover"), _payload_bytes(params), _passphrase(params),
+                                          params.get("mode", "shuffle"), fmt, params.get("shards"), workers=1,
+                                          profile=profile)
+    return {"stego_b64": base64.b64encode(data).decode("ascii"), "stego_bytes": len(data)}
+
+def decode(params: dict) -> dict:
+    method = _method(params)
+    if params.get("out_dir"):
+        if method == "sequential":
+            res = lsb_sequential.decode_sequential(params["stego_path"], params["out_dir"])
+        else:
+            res = lsb_random_v2.decode_v2(params["stego_path"], _passphrase(params), params["out_dir"], workers=1)
+        return asdict(res)
+    verify = params.get("verify", True)
+    if method == "sequential":
+        payload = lsb_sequential.decode_bytes(_blob(params, "stego"), verify)
+    else:
+        payload = lsb_random_v2.decode_bytes(_blob(params, "stego"), _passphrase(params), verify, workers=1)
+    return {"payload_b64": base64.b64encode(payload).decode("ascii"), "payload_len": len(payload)}
+
+def capacity(params: dict) -> dict:
+    if _method(params) == "sequential":
+        return {"capacity_bytes": lsb_sequential.capacity_bytes_for_image(params["path"])}
+    return {"capacity_bytes": lsb_random_v2.capacity_bytes_for_image(params["path"], params.get("mode", "shuffle"),
+                                                                       params.get("shards"))}
+
+def check_key(params: dict) -> dict:
+    return {"ok": lsb_random_v2.check_key(_blob(params, "stego"), _passphrase(params))}
+
+OPS = {"encode": encode, "decode": decode, "capacity": capacity, "check_key": check_key}
+
+def run(op: str, params: dict) -> dict:
+    if op not in OPS:
+        raise ValueError(f"Unknown operation {op!r}.")
+    return OPS[op](params)
+
+def kdf_stats() -> dict:
+    return KDF_CACHE.stats()
@@ -0,0 +1,95 @@
+import bisect
+import collections
+import threading
+import time
+
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+THROUGHPUT_WINDOW_S = 60
+
+class Histogram:
+    """
+    Fixed-bucket histogram in the Prometheus layout (cumulative le buckets, sum, count).
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str = ""):
+        sep = "," if labels else ""
+        acc = 0
+        for bound, n in zip(self.buckets, self.counts):
+            acc += n
+            yield f'{name}_bucket{{{labels}{sep}le="{bound}"}} {acc}'
+        yield f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum:.3f}" if labels else f"{name}_sum {self.sum:.3f}"
+        yield f"{name}_count{{{labels}}} {self.count}" if labels else f"{name}_count {self.count}"
+
+class ServiceMetrics:
+    """
+    Request counters, latency / queue-wait / worker-time histograms and a
+    sliding-window throughput, rendered in the Prometheus text format.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests = collections.Counter()   # (endpoint, status) -> count
+        self.latency = collections.defaultdict(Histogram)
+        self.worker_time = collections.defaultdict(Histogram)
+        self.queue_wait = Histogram()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._done = collections.deque()
+
+    def observe(self, endpoint: str, status: int, latency_ms: float, worker_ms: float = None,
+                bytes_in: int = 0, bytes_out: int = 0):
+        now = time.monotonic()
+        with self._lock:
+            self.requests[(endpoint, status)] += 1
+            self.latency[endpoint].observe(latency_ms)
+            if worker_ms is not None:
+                self.worker_time[endpoint].observe(worker_ms)
+                self.queue_wait.observe(max(0.0, latency_ms - worker_ms))
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            if status < 400:
+                self._done.append(now)
+            while self._done and self._done[0] < now - THROUGHPUT_WINDOW_S:
+                self._done.popleft()
+
+    def throughput(self) -> float:
+        now = time.monotonic()
+        with self._lock:
+            recent = sum(1 for t in self._done if t >= now - THROUGHPUT_WINDOW_S)
+        window = min(THROUGHPUT_WINDOW_S, max(1e-9, time.time() - self.started))
+        return recent / window
+
+    def render(self, pool=None) -> str:
+        out = [f"stego_uptime_seconds {time.time() - self.started:.1f}",
+               f"stego_throughput_rps{{window=\"{THROUGHPUT_WINDOW_S}s\"}} {self.throughput():.3f}"]
+        with self._lock:
+            for (endpoint, status), n in sorted(self.requests.items()):
+                out.append(f'stego_requests_total{{endpoint="{endpoint}",status="{status}"}} {n}')
+            out.append(f"stego_request_bytes_total {self.bytes_in}")
+            out.append(f"stego_response_bytes_total {self.bytes_out}")
+            for endpoint, h in sorted(self.latency.items()):
+                out.extend(h.lines("stego_request_latency_ms", f'endpoint="{endpoint}"'))
+            for endpoint, h in sorted(self.worker_time.items()):
+                out.extend(h.lines("stego_worker_time_ms", f'endpoint="{endpoint}"'))
+            out.extend(self.queue_wait.lines("stego_queue_wait_ms"))
+        if pool is not None:
+            kdf = pool.kdf_stats()
+            out += [f"stego_pool_workers {pool.size}",
+                    f"stego_pool_queue_capacity {pool.queue_size}",
+                    f"stego_pool_in_flight {pool.in_flight}",
+                    f"stego_pool_queued {pool.queued}",
+                    f"stego_pool_abandoned {pool.abandoned}",
+                    f"stego_kdf_cache_hits {kdf['hits']}",
+                    f"stego_kdf_cache_misses {kdf['misses']}"]
+        return "\n".join(out) + "\n"
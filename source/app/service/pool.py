@@ -0,0 +1,221 @@
+import hashlib
+import itertools
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+
+class QueueFull(Exception):
+    """
+    Raised by WorkerPool.submit when queue_size jobs are already waiting.
+    """
+
+class JobError(Exception):
+    """
+    A job failed inside a worker; kind is the exception class name raised there.
+    """
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+def _worker_main(index: int, tasks, results):
+    # Import the codecs once per process; every job after this runs warm.
+    from . import handlers
+    while True:
+        item = tasks.get()
+        if item is None:
+            return
+        job_id, op, params, deadline = item
+        t0 = time.perf_counter()
+        try:
+            if deadline is not None and time.monotonic() > deadline:  # caller gave up while it was queued
+                ok, value = False, ("JobExpired", "Job expired in the queue.")
+            else:
+                ok, value = True, handlers.run(op, params)
+        except Exception as e:
+            ok, value = False, (type(e).__name__, str(e))
+        results.send((job_id, ok, value, (time.perf_counter() - t0) * 1000, handlers.kdf_stats()))
+
+def _default_context():
+    methods = mp.get_all_start_methods()
+    return mp.get_context("fork" if "fork" in methods else "spawn")
+
+def _respawn_context(ctx):
+    """
+    Context for replacement workers. They are started from the collector thread
+    while HTTP threads run and _lock is held, so they must not fork this process:
+    forkserver forks from its own single-threaded server (codecs preloaded), spawn
+    starts a fresh interpreter.
+    """
+    if ctx.get_start_method() != "fork":
+        return ctx
+    if "forkserver" in mp.get_all_start_methods():
+        fs = mp.get_context("forkserver")
+        fs.set_forkserver_preload(["app.service.handlers"])
+        return fs
+    return mp.get_context("spawn")
+
+class WorkerPool:
+    """
+    Pre-started worker processes, each with its own task queue and result pipe
+    (a worker dying mid-write can't wedge a lock shared with the others). At most
+    workers + queue_size jobs are in flight; submit raises QueueFull beyond that.
+    Jobs carrying an affinity key (the passphrase) go to the same worker while it
+    is not clearly busier than the least loaded one, so that worker's KDF cache
+    is reused. Dead workers are replaced (see _respawn_context) and their jobs failed.
+    A caller that stops waiting calls abandon(): the job no longer counts against
+    the in-flight limit, and a worker that has not started it skips it.
+    """
+    def __init__(self, workers: int = None, queue_size: int = 64, ctx=None):
+        self.ctx = ctx or _default_context()
+        self._respawn_ctx = _respawn_context(self.ctx)
+        self.size = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._pending = {}  # job_id -> (future, worker index)
+        self._abandoned = {}  # job_id -> worker index, for jobs the caller stopped waiting on
+        self._load = [0] * self.size
+        self._ids = itertools.count()
+        self._kdf = {}
+        self._closed = False
+        self._workers = [self._spawn(i, self.ctx) for i in range(self.size)]
+        self._collector = threading.Thread(target=self._collect, name="stego-pool-collector", daemon=True)
+        self._collector.start()
+
+    @staticmethod
+    def _spawn(index: int, ctx):
+        tasks = ctx.Queue()
+        reader, writer = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_worker_main, args=(index, tasks, writer), name=f"stego-worker-{index}", daemon=True)
+        proc.start()
+        writer.close()
+        return proc, tasks, reader
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    @property
+    def abandoned(self) -> int:
+        """
+        Jobs whose caller gave up but whose worker has not reported back yet.
+        """
+        with self._lock:
+            return len(self._abandoned)
+
+    @property
+    def queued(self) -> int:
+        """
+        Jobs submitted but not yet picked up (in-flight beyond one per worker).
+        """
+        with self._lock:
+            return sum(max(0, n - 1) for n in self._load)
+
+    def kdf_stats(self) -> dict:
+        """
+        KDF cache hits/misses summed over the workers' last reports.
+        """
+        with self._lock:
+            stats = list(self._kdf.values())
+        return {k: sum(s.get(k, 0) for s in stats) for k in ("hits", "misses", "size")}
+
+    def _pick(self, affinity: bytes) -> int:
+        least = min(range(self.size), key=self._load.__getitem__)
+        if affinity:
+            pref = int.from_bytes(hashlib.sha256(affinity).digest()[:4], "big") % self.size
+            if self._load[pref] <= self._load[least] + 1:
+                return pref
+        return least
+
+    def submit(self, op: str, params: dict, affinity: bytes = None, timeout: float = None) -> Future:
+        """
+        timeout: seconds after which a worker that has not started the job skips it
+        (fails it with JobExpired); match it to how long the caller waits.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Worker pool is closed.")
+            if len(self._pending) >= self.size + self.queue_size:
+                raise QueueFull(f"{len(self._pending)} jobs in flight.")
+            index = self._pick(affinity)
+            job_id = next(self._ids)
+            fut = Future()
+            self._pending[job_id] = (fut, index)
+            self._load[index] += 1
+        self._workers[index][1].put((job_id, op, params, deadline))
+        return fut
+
+    def abandon(self, fut: Future) -> bool:
+        """
+        Stops counting a job the caller no longer waits for against the in-flight
+        limit; its worker stays loaded until it reports back. False if already done.
+        """
+        with self._lock:
+            for job_id, (f, index) in self._pending.items():
+                if f is fut:
+                    del self._pending[job_id]
+                    self._abandoned[job_id] = index
+                    break
+            else:
+                return False
+        fut.cancel()
+        return True
+
+    def _collect(self):
+        while not self._closed:
+            readers = {w[2]: i for i, w in enumerate(self._workers)}
+            for conn in wait(list(readers), timeout=0.5):
+                try:
+                    item = conn.recv()
+                except (EOFError, OSError):
+                    self._workers[readers[conn]][0].join(1.0)  # worker exited; _reap replaces it
+                    continue
+                self._resolve(readers[conn], *item)
+            self._reap()
+
+    def _resolve(self, index: int, job_id: int, ok: bool, value, worker_ms: float, kdf: dict):
+        with self._lock:
+            entry = self._pending.pop(job_id, None)
+            self._kdf[index] = kdf
+            if entry is not None:
+                self._load[entry[1]] -= 1
+            elif self._abandoned.pop(job_id, None) is not None:
+                self._load[index] -= 1
+        if entry is None:
+            return
+        if ok:
+            entry[0].set_result((value, worker_ms))
+        else:
+            entry[0].set_exception(JobError(*value))
+
+    def _reap(self):
+        for index, (proc, _, reader) in enumerate(self._workers):
+            if proc.is_alive() or self._closed:
+                continue
+            reader.close()
+            with self._lock:
+                lost = [(jid, fut) for jid, (fut, i) in self._pending.items() if i == index]
+                for jid, _ in lost:
+                    del self._pending[jid]
+                for jid in [jid for jid, i in self._abandoned.items() if i == index]:
+                    del self._abandoned[jid]
+                self._load[index] = 0
+                self._workers[index] = self._spawn(index, self._respawn_ctx)
+            for _, fut in lost:
+                fut.set_exception(JobError("WorkerDied", f"Worker {index} exited with code {proc.exitcode}."))
+
+    def close(self, timeout: float = 5.0):
+        with self._lock:
+            self._closed = True
+        self._collector.join(timeout)
+        for _, tasks, _ in self._workers:
+            tasks.put(None)
+        for proc, _, reader in self._workers:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+            reader.close()
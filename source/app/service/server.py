@@ -0,0 +1,126 @@
+import argparse
+import json
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .metrics import ServiceMetrics
+from .pool import JobError, QueueFull, WorkerPool
+
+ENDPOINTS = ("encode", "decode", "capacity", "check_key")
+MAX_BODY = 256 << 20
+STATUS_FOR_ERROR = {"ValueError": 400, "KeyCheckError": 403, "FileNotFoundError": 404, "KeyError": 400}
+
+class StegoServer(ThreadingHTTPServer):
+    """
+    HTTP front end: one thread per connection parses JSON and waits on a job in
+    the shared WorkerPool; the heavy work happens in the warm worker processes.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, pool: WorkerPool, timeout: float = 120.0, max_body: int = MAX_BODY):
+        super().__init__(address, _Handler)
+        self.pool = pool
+        self.job_timeout = timeout
+        self.max_body = max_body
+        self.metrics = ServiceMetrics()
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StegoServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+        return len(body)
+
+    def _json(self, status: int, obj, headers=None) -> int:
+        return self._send(status, json.dumps(obj).encode("utf-8"), headers=headers)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(200, self.server.metrics.render(self.server.pool).encode("utf-8"), "text/plain; version=0.0.4")
+        elif self.path == "/health":
+            self._json(200, {"status": "ok", "workers": self.server.pool.size, "in_flight": self.server.pool.in_flight})
+        else:
+            self._json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        t0 = time.perf_counter()
+        endpoint = self.path.strip("/")
+        status, worker_ms, n_in, n_out = 500, None, 0, 0
+        try:
+            if endpoint not in ENDPOINTS:
+                status = 404
+                n_out = self._json(status, {"error": f"Unknown endpoint {self.path}"})
+                return
+            n_in = int(self.headers.get("Content-Length") or 0)
+            if n_in > self.server.max_body:
+                status = 413
+                self.close_connection = True
+                n_out = self._json(status, {"error": f"Body exceeds {self.server.max_body} bytes."})
+                return
+            try:
+                params = json.loads(self.rfile.read(n_in) or b"{}")
+                if not isinstance(params, dict):
+                    raise ValueError("Request body must be a JSON object.")
+            except ValueError as e:
+                status = 400
+                n_out = self._json(status, {"error": str(e)})
+                return
+            status, body, worker_ms, headers = self._run(endpoint, params)
+            n_out = self._json(status, body, headers)
+        finally:
+            self.server.metrics.observe(endpoint if endpoint in ENDPOINTS else "other", status,
+                                        (time.perf_counter() - t0) * 1000, worker_ms, n_in, n_out)
+
+    def _run(self, endpoint: str, params: dict):
+        pw = params.get("passphrase")
+        try:
+            fut = self.server.pool.submit(endpoint, params, pw.encode("utf-8") if isinstance(pw, str) else None,
+                                          self.server.job_timeout)
+        except QueueFull as e:
+            return 503, {"error": f"Queue full: {e}"}, None, {"Retry-After": "1"}
+        try:
+            value, worker_ms = fut.result(self.server.job_timeout)
+        except FutureTimeout:
+            self.server.pool.abandon(fut)  # frees its in-flight slot; the worker skips it if not started
+            return 504, {"error": f"Timed out after {self.server.job_timeout}s."}, None, None
+        except JobError as e:
+            return STATUS_FOR_ERROR.get(e.kind, 500), {"error": str(e), "kind": e.kind}, None, None
+        return 200, value, worker_ms, None
+
+def serve(host: str = "127.0.0.1", port: int = 8765, workers: int = None, queue_size: int = 64,
+          timeout: float = 120.0):
+    pool = WorkerPool(workers, queue_size)
+    server = StegoServer((host, port), pool, timeout)
+    print(f"Listening on http://{host}:{server.server_address[1]} ({pool.size} workers, queue {queue_size})",
+          flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local steganography service backed by a warm worker pool.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--queue", type=int, default=64, help="jobs allowed to wait beyond one per worker")
+    ap.add_argument("--timeout", type=float, default=120.0, help="seconds a request waits for its job")
+    args = ap.parse_args(argv)
+    serve(args.host, args.port, args.workers, args.queue, args.timeout)
+
+if __name__ == "__main__":
+    main()
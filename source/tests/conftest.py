@@ -0,0 +1,38 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# The app package lives next to this directory (run from source/: python -m pytest).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(1234)
+
+@pytest.fixture
+def cover(rng):
+    """
+    Small RGB cover with a smooth and a noisy half.
+    """
+    x = np.linspace(0, 255, 96)[None, :, None].repeat(64, 0).repeat(3, 2)
+    x[:, 48:] += rng.normal(0, 30, (64, 48, 3))
+    return np.clip(x, 0, 255).astype(np.uint8)
+
+@pytest.fixture
+def cover_png(tmp_path, cover):
+    path = tmp_path / "cover.png"
+    Image.fromarray(cover).save(path)
+    return str(path)
+
+@pytest.fixture
+def payload(rng):
+    return rng.integers(0, 256, 1500, dtype=np.uint8).tobytes()
+
+@pytest.fixture
+def payload_file(tmp_path, payload):
+    path = tmp_path / "payload.bin"
+    path.write_bytes(payload)
+    return str(path)
@@ -0,0 +1,86 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core import async_api, lsb_random_v2 as R, lsb_sequential as S
+from app.core.async_api import AsyncStego
+
+# (method, encode keyword arguments)
+CASES = [
+    ("random", {"mode": "shuffle"}),
+    ("random", {"mode": "lazy"}),
+    ("random", {"mode": "checked"}),
+    ("random", {"mode": "sharded", "shards": 3}),
+    ("random", {"mode": "checked", "compress": "zlib"}),
+    ("random", {"mode": "checked", "bits": 3}),
+    ("random", {"mode": "checked", "bits": 2, "adaptive": True}),
+    ("sequential", {}),
+    ("sequential", {"compress": "bz2"}),
+    ("sequential", {"bits": 2}),
+]
+
+@pytest.fixture
+def fixed_salt(monkeypatch):
+    monkeypatch.setattr(R.os, "urandom", lambda n: bytes(range(1, n + 1)))
+
+@pytest.mark.parametrize("method,kwargs", CASES)
+def test_encode_matches_sync(tmp_path, fixed_salt, cover_png, payload_file, payload, method, kwargs):
+    sync_out, async_out = str(tmp_path / "sync.png"), str(tmp_path / "async.png")
+    if method == "sequential":
+        expected = S.encode_sequential(cover_png, payload_file, sync_out, **kwargs)
+    else:
+        expected = R.encode_v2(cover_png, payload_file, "secret", sync_out, **kwargs)
+    api = AsyncStego(max_concurrency=2)
+    res = asyncio.run(api.encode(cover_png, payload_file, "secret", async_out, method=method, **kwargs))
+    assert open(async_out, "rb").read() == open(sync_out, "rb").read()
+    assert (res.used_bytes, res.compression) == (expected.used_bytes, expected.compression)
+    dec = asyncio.run(api.decode(async_out, "secret", str(tmp_path / "out"), method=method))
+    assert dec.crc_ok and open(dec.output_path, "rb").read() == payload
+
+@pytest.mark.parametrize("kwargs", [{"mode": "checked"}, {"mode": "sharded", "shards": 2}, {"bits": 3},
+                                    {"bits": 4, "adaptive": True}])
+def test_capacity_matches_sync(cover_png, kwargs):
+    expected = R.capacity_bytes_for_image(cover_png, **kwargs)
+    assert asyncio.run(async_api.async_capacity(cover_png, **kwargs)) == expected
+    assert asyncio.run(AsyncStego().capacity(cover_png, bits=2, method="sequential")) == \
+        S.capacity_bytes_for_image(cover_png, 2)
+
+def test_unknown_method(cover_png):
+    with pytest.raises(ValueError, match="method"):
+        asyncio.run(AsyncStego().capacity(cover_png, method="other"))
+
+def test_progress_on_the_loop(tmp_path, cover_png, payload_file):
+    async def main():
+        loop, seen = asyncio.get_running_loop(), []
+
+        def progress(stage, frac):
+            assert asyncio.get_running_loop() is loop
+            seen.append(stage)
+        await AsyncStego().encode(cover_png, payload_file, "secret", str(tmp_path / "s.png"), mode="checked",
+                                  progress=progress)
+        return seen
+    seen = asyncio.run(main())
+    assert seen[0] == "load" and seen[-1] == "done"
+
+def test_cancel_stops_the_job(tmp_path, rng):
+    cover = tmp_path / "big.png"
+    Image.fromarray(rng.integers(0, 256, (1200, 1200, 3), dtype=np.uint8)).save(cover, compress_level=1)
+    payload = tmp_path / "big.bin"
+    payload.write_bytes(os.urandom(400_000))
+    out = tmp_path / "stego.png"
+
+    async def main():
+        api, started = AsyncStego(max_concurrency=1), asyncio.Event()
+        task = asyncio.create_task(api.encode(str(cover), str(payload), "secret", str(out), mode="checked",
+                                              progress=lambda stage, frac: started.set()))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # the slot is free again once the worker has stopped
+        return await asyncio.wait_for(api.capacity(str(cover), "checked"), 30)
+    assert asyncio.run(main()) > 0
+    assert not out.exists()
@@ -0,0 +1,87 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from tools import batch as B
+
+N_COVERS = 3
+
+@pytest.fixture
+def covers(tmp_path, rng):
+    in_dir = tmp_path / "covers"
+    in_dir.mkdir()
+    for i in range(N_COVERS):
+        Image.fromarray(rng.integers(0, 256, (64, 80 + 8 * i, 3), dtype=np.uint8)).save(in_dir / f"c{i}.png")
+    (in_dir / "notes.txt").write_text("not an image")
+    return in_dir
+
+def _rows(path):
+    return sorted((json.loads(line) for line in path.read_text().splitlines()), key=lambda r: r["job"])
+
+@pytest.mark.parametrize("method", ["random", "sequential"])
+def test_encode_then_decode(tmp_path, covers, payload_file, payload, method):
+    enc_dir, dec_dir = tmp_path / "enc", tmp_path / "dec"
+    assert B.main(["encode", "--input-dir", str(covers), "--payload", payload_file, "--out-dir", str(enc_dir),
+                   "--method", method, "--passphrase", "secret", "--workers", "2", "--verify"]) == 0
+    rows = _rows(enc_dir / "results.jsonl")
+    assert len(rows) == N_COVERS and all(r["ok"] and r["crc_ok"] for r in rows)
+    assert not list(enc_dir.glob("*_verify"))
+    assert B.main(["decode", "--input-dir", str(enc_dir), "--out-dir", str(dec_dir), "--method", method,
+                   "--passphrase", "secret", "--workers", "2"]) == 0
+    rows = _rows(dec_dir / "results.jsonl")
+    assert len(rows) == N_COVERS
+    for row in rows:
+        assert row["ok"] and row["payload_len"] == len(payload)
+        assert open(row["output"], "rb").read() == payload
+
+def test_failures_are_reported_per_item(tmp_path, covers, payload_file):
+    manifest = tmp_path / "jobs.jsonl"
+    jobs = [{"cover": str(covers / "c0.png"), "payload": payload_file, "output": str(tmp_path / "out" / "a.png")},
+            {"cover": str(covers / "notes.txt"), "payload": payload_file, "output": str(tmp_path / "out" / "b.png")},
+            {"cover": str(covers / "c1.png"), "payload": str(tmp_path / "missing.bin"),
+             "output": str(tmp_path / "out" / "c.png")}]
+    manifest.write_text("".join(json.dumps(j) + "\n" for j in jobs))
+    results = tmp_path / "results.jsonl"
+    assert B.main(["encode", "--manifest", str(manifest), "--results", str(results), "--passphrase", "secret",
+                   "--workers", "2"]) == 1
+    rows = {r["job"]: r for r in _rows(results)}
+    assert rows[jobs[0]["cover"]]["ok"]
+    for job in jobs[1:]:
+        row = rows[job["cover"]]
+        assert not row["ok"] and row["error"] and "Traceback" in row["traceback"]
+
+def test_wrong_passphrase_fails_the_item(tmp_path, covers, payload_file):
+    enc = tmp_path / "enc"
+    B.run_batch(B.jobs_from_dir(covers, enc, "encode", payload_file), "encode", "random", "checked", "secret", 1,
+                enc / "results.jsonl")
+    summary = B.run_batch(B.jobs_from_dir(enc, tmp_path / "dec", "decode"), "decode", "random", "checked", "other",
+                          1, tmp_path / "dec.jsonl")
+    assert summary["jobs"] == N_COVERS and summary["failed"] == N_COVERS
+    assert all("KeyCheckError" in r["error"] for r in _rows(tmp_path / "dec.jsonl"))
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_worker_count(monkeypatch, tmp_path, covers, payload_file, workers):
+    seen = []
+
+    class Pool(ProcessPoolExecutor):
+        def __init__(self, max_workers=None, **kwargs):
+            seen.append(max_workers)
+            super().__init__(max_workers=max_workers, **kwargs)
+    monkeypatch.setattr(B, "ProcessPoolExecutor", Pool)
+    assert B.main(["encode", "--input-dir", str(covers), "--payload", payload_file, "--out-dir", str(tmp_path / "o"),
+                   "--passphrase", "secret", "--workers", str(workers)]) == 0
+    assert seen == [workers]
+
+def test_manifest_formats(tmp_path):
+    (tmp_path / "jobs.csv").write_text("stego,output,passphrase\na.png,out/a,pw\nb.png,out/b,\n")
+    (tmp_path / "jobs.jsonl").write_text('{"stego": "a.png", "output": "out/a", "passphrase": "pw"}\n\n'
+                                         '{"stego": "b.png", "output": "out/b", "passphrase": ""}\n')
+    assert B.load_manifest(tmp_path / "jobs.csv") == B.load_manifest(tmp_path / "jobs.jsonl")
+
+def test_random_needs_a_passphrase(tmp_path, covers, payload_file, monkeypatch):
+    monkeypatch.delenv("STEGO_PASSPHRASE", raising=False)
+    with pytest.raises(SystemExit):
+        B.main(["encode", "--input-dir", str(covers), "--payload", payload_file, "--out-dir", str(tmp_path)])
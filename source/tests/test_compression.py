@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+from app.core import lsb_random_v2 as R, lsb_sequential as S
+from app.core.compression import CODEC_NAMES, CODECS, CompressedSource, DecompressingSink, choose_codec
+from app.core.image_io import load_pixels, slot_view
+from app.core.kernels import extract_seq
+from app.core.payload_stream import PayloadSink, PayloadSource
+
+CODEC_CASES = ["zlib", "bz2", "lzma", "auto"]
+
+@pytest.fixture
+def text():
+    """
+    Compressible payload, larger than the test cover's uncompressed capacity.
+    """
+    return b"".join(b"line %05d: the quick brown fox jumps over the lazy dog\n" % i for i in range(60))
+
+@pytest.fixture
+def text_file(tmp_path, text):
+    path = tmp_path / "text.txt"
+    path.write_bytes(text)
+    return str(path)
+
+@pytest.mark.parametrize("compress", CODEC_CASES)
+@pytest.mark.parametrize("mode", ["checked", "sharded"])
+def test_random_round_trip_file(tmp_path, cover_png, cover, text_file, text, compress, mode):
+    assert len(text) > R.capacity_bytes_for_image(cover_png, "checked")
+    out = str(tmp_path / "stego.png")
+    res = R.encode_v2(cover_png, text_file, "secret", out, mode=mode, compress=compress)
+    header = R._read_header(slot_view(load_pixels(out)))
+    assert header.ver == R.ALG_VER_COMPRESSED and header.raw_len == len(text)
+    assert res.compression == CODEC_NAMES[header.codec] != "none"
+    if compress != "auto":
+        assert header.codec == CODECS[compress]
+    dec = R.decode_v2(out, "secret", str(tmp_path / "out"))
+    assert dec.crc_ok and dec.payload_len == len(text)
+    assert open(dec.output_path, "rb").read() == text
+
+@pytest.mark.parametrize("compress", CODEC_CASES)
+def test_random_round_trip_bytes(cover, text, compress):
+    stego = R.encode_bytes(cover, text, "secret", mode="checked", compress=compress, compress_level=9)
+    assert R.decode_bytes(stego, "secret") == text
+    with pytest.raises(R.KeyCheckError):
+        R.decode_bytes(stego, "other")
+
+@pytest.mark.parametrize("compress", CODEC_CASES)
+def test_sequential_round_trip(tmp_path, cover_png, cover, text_file, text, compress):
+    out = str(tmp_path / "stego.png")
+    res = S.encode_sequential(cover_png, text_file, out, compress=compress)
+    assert extract_seq(slot_view(load_pixels(out)), 0, 3)[2] == S.ALG_VER_COMPRESSED
+    assert res.compression != "none"
+    assert open(S.decode_sequential(out, str(tmp_path / "out")).output_path, "rb").read() == text
+    assert S.decode_bytes(S.encode_bytes(cover, text, compress=compress)) == text
+
+def test_auto_stores_incompressible_payloads(cover, payload):
+    assert choose_codec(PayloadSource(payload)) == "none"
+    stego = R.encode_bytes(cover, payload, "secret", mode="checked", compress="auto")
+    assert R._read_header(slot_view(load_pixels(stego))).ver == R.ALG_VER_CHECKED
+    assert R.decode_bytes(stego, "secret") == payload
+
+def test_unknown_codec(cover, text):
+    with pytest.raises(ValueError, match="Unknown compression"):
+        R.encode_bytes(cover, text, "secret", mode="checked", compress="zstd")
+
+@pytest.mark.parametrize("codec", ["zlib", "bz2", "lzma"])
+def test_decompressing_sink_out_of_order(tmp_path, text, codec):
+    src = CompressedSource(PayloadSource(text, chunk=17), codec)
+    try:
+        chunks = list(src.chunks())
+        sink = PayloadSink()
+        dsink = DecompressingSink(sink, CODECS[codec], len(text))
+        dsink.open(src.size)
+        for off, data in reversed(chunks):  # shards may deliver later ranges first
+            dsink.write(off, bytes(data))
+        dsink.finish()
+        assert sink.getvalue() == text
+    finally:
+        src.close()
+
+def test_compressed_file_source_is_removed(tmp_path, text_file):
+    src = CompressedSource(PayloadSource(text_file), "zlib")
+    assert src.path != text_file and src.size < PayloadSource(text_file).size
+    src.close()
+    assert not os.path.exists(src.path)
+
+def test_decompressing_sink_spools_early_chunks(text):
+    """
+    Chunks from later shards wait in a temporary file, not in memory, and it is removed when done.
+    """
+    src = CompressedSource(PayloadSource(text, chunk=64), "lzma")
+    (first_off, first), *rest = list(src.chunks())
+    sink = PayloadSink()
+    dsink = DecompressingSink(sink, CODECS["lzma"], len(text))
+    dsink.open(src.size)
+    for off, data in rest:
+        dsink.write(off, data)
+    spool = dsink._spool
+    assert spool.seek(0, os.SEEK_END) == src.size - len(first)
+    assert all(isinstance(v, tuple) for v in dsink._held.values())
+    dsink.write(first_off, first)
+    dsink.finish()
+    assert spool.closed and sink.getvalue() == text
@@ -0,0 +1,58 @@
+import threading
+import zlib
+
+import numpy as np
+import pytest
+
+from app.core import lsb_random_v2 as R
+from app.core.crypto_utils import KDF_CACHE, KeyScheduleCache, crc32_combine, kdf_seed
+
+def test_cache_hits_and_eviction():
+    cache = KeyScheduleCache(maxsize=2)
+    salt = b"s" * 16
+    a = kdf_seed("pw", salt, 20, cache)
+    assert kdf_seed("pw", salt, 20, cache) == a == kdf_seed("pw", salt, 20, None)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    kdf_seed("other", salt, cache=cache)
+    kdf_seed("third", salt, cache=cache)  # evicts "pw"
+    assert len(cache) == 2
+    kdf_seed("pw", salt, cache=cache)
+    assert cache.stats()["misses"] == 4
+
+def test_thread_counts_are_per_thread():
+    cache = KeyScheduleCache()
+    salt = b"t" * 16
+    kdf_seed("pw", salt, cache=cache)
+    before = cache.thread_counts()
+    worker = threading.Thread(target=lambda: [kdf_seed("pw", salt, cache=cache) for _ in range(3)])
+    worker.start()
+    worker.join()
+    assert cache.thread_counts() == before == (0, 1)
+    assert cache.stats()["hits"] == 3
+
+def test_out_bytes_limit():
+    with pytest.raises(ValueError):
+        kdf_seed("pw", b"s" * 16, 33)
+
+def test_decode_reports_its_own_lookups(tmp_path, cover_png, payload_file):
+    out = str(tmp_path / "stego.png")
+    for _ in range(3):
+        R.encode_v2(cover_png, payload_file, "pw", out, mode="checked")
+    KDF_CACHE.clear()
+    cold = R.decode_v2(out, "pw", str(tmp_path))
+    warm = R.decode_v2(out, "pw", str(tmp_path))
+    assert (cold.kdf_cache_hits, cold.kdf_cache_misses) == (0, 1)
+    assert (warm.kdf_cache_hits, warm.kdf_cache_misses) == (1, 0)
+
+@pytest.mark.parametrize("len_a,len_b", [(0, 0), (0, 5), (5, 0), (1, 1), (1000, 3), (7, 100000)])
+def test_crc32_combine(len_a, len_b):
+    data = np.random.default_rng(len_a + len_b).integers(0, 256, len_a + len_b, dtype=np.uint8).tobytes()
+    a, b = data[:len_a], data[len_a:]
+    assert crc32_combine(zlib.crc32(a), zlib.crc32(b), len(b)) == zlib.crc32(data)
+
+def test_crc32_combine_many_parts():
+    parts = [bytes([i]) * (i * 37 + 1) for i in range(20)]
+    crc = 0
+    for part in parts:
+        crc = crc32_combine(crc, zlib.crc32(part), len(part))
+    assert crc == zlib.crc32(b"".join(parts))
@@ -0,0 +1,81 @@
+import threading
+
+from app.gui.jobs import JobQueue
+
+def _events(jobs: JobQueue, n: int):
+    return [jobs.events.get(timeout=10) for _ in range(n)]
+
+def test_job_runs_with_progress():
+    jobs = JobQueue()
+
+    def fn(progress, cancel):
+        progress("embed", 0.5)
+        return 42
+    job = jobs.submit("encode", fn)
+    kinds = [(kind, data) for kind, j, data in _events(jobs, 3) if j is job]
+    assert kinds == [("started", None), ("progress", ("embed", 0.5)), ("done", 42)]
+    assert jobs.pending == 0 and jobs.current is None
+
+def test_error_is_reported():
+    jobs = JobQueue()
+    job = jobs.submit("bad", lambda progress, cancel: 1 / 0)
+    (_, _, _), (kind, j, err) = _events(jobs, 2)
+    assert kind == "error" and j is job and isinstance(err, ZeroDivisionError)
+
+def _blocking(started: threading.Event, release: threading.Event):
+    def fn(progress, cancel):
+        started.set()
+        release.wait(10)
+        cancel.raise_if_cancelled()
+        return "finished"
+    return fn
+
+def test_cancel_current_keeps_the_queue():
+    jobs = JobQueue()
+    started, release = threading.Event(), threading.Event()
+    first = jobs.submit("first", _blocking(started, release))
+    second = jobs.submit("second", lambda progress, cancel: "second done")
+    assert started.wait(10)
+    jobs.cancel_current()
+    release.set()
+    events = [(kind, j) for kind, j, _ in _events(jobs, 4)]
+    assert events == [("started", first), ("cancelled", first), ("started", second), ("done", second)]
+
+def test_cancel_all():
+    jobs = JobQueue()
+    started, release = threading.Event(), threading.Event()
+    first = jobs.submit("first", _blocking(started, release))
+    rest = [jobs.submit(f"job{i}", lambda progress, cancel: "ran") for i in range(3)]
+    assert started.wait(10)
+    jobs.cancel_all()
+    release.set()
+    events = [(kind, j) for kind, j, _ in _events(jobs, 5)]
+    assert events == [("started", first), ("cancelled", first)] + [("cancelled", j) for j in rest]
+    assert jobs.events.empty()
+
+def test_cancel_all_reaches_a_job_being_dequeued():
+    """
+    A job taken off the queue is current before the queue lock is released, so a
+    cancel_all waiting on that lock cancels it.
+    """
+    jobs = JobQueue()
+    in_remove, go = threading.Event(), threading.Event()
+
+    class Pending(list):
+        def remove(self, job):  # runs on the worker thread with the queue lock held
+            super().remove(job)
+            in_remove.set()
+            go.wait(10)
+    jobs._pending = Pending()
+    canceller = threading.Thread(target=jobs.cancel_all)
+
+    def fn(progress, cancel):
+        canceller.join(10)
+        cancel.raise_if_cancelled()
+        return "ran"
+    job = jobs.submit("late", fn)
+    assert in_remove.wait(10)
+    canceller.start()  # blocks on the lock until the worker has made the job current
+    go.set()
+    kinds = [kind for kind, j, _ in _events(jobs, 2) if j is job]
+    assert kinds[-1] == "cancelled"
@@ -0,0 +1,88 @@
+import json
+import logging
+import time
+import tracemalloc
+
+import pytest
+
+from app.core import instrument, lsb_random_v2 as R, lsb_sequential as S
+from app.core.progress import ENCODE_STAGES, Reporter
+
+@pytest.fixture(autouse=True)
+def _off():
+    tracing = tracemalloc.is_tracing()
+    instrument.disable()
+    yield
+    instrument.disable()
+    if not tracing:  # enable(memory=True) leaves tracemalloc running
+        tracemalloc.stop()
+
+def test_stage_timing():
+    sink = instrument.MemorySink()
+    with instrument.instrumented(sink, memory=False):
+        reporter = Reporter(ENCODE_STAGES, op="job")
+        reporter.stage("load")
+        time.sleep(0.02)
+        reporter.stage("embed")
+        time.sleep(0.04)
+        reporter.done()
+    (rec,) = sink.records
+    assert rec["op"] == "job" and [s["stage"] for s in rec["stages"]] == ["load", "embed"]
+    load, embed = (s["ms"] for s in rec["stages"])
+    assert load >= 20 and embed >= 40 and rec["total_ms"] >= load + embed
+    assert "peak_bytes" not in rec["stages"][0]
+
+def test_codec_stages_and_memory(cover, payload):
+    sink = instrument.MemorySink()
+    with instrument.instrumented(sink):
+        stego = R.encode_bytes(cover, payload, "secret", mode="checked", workers=1)
+        S.decode_bytes(S.encode_bytes(cover, payload))
+    assert [r["op"] for r in sink.records] == ["encode_bytes", "encode_bytes", "decode_bytes"]
+    stages = [s["stage"] for s in sink.records[0]["stages"]]
+    assert stages == [s for s in ENCODE_STAGES if s in stages] and "embed" in stages
+    assert all(s["peak_bytes"] >= 0 for s in sink.records[0]["stages"])
+    assert max(s["peak_bytes"] for s in sink.records[0]["stages"]) >= cover.nbytes  # the stego copy
+    assert R.decode_bytes(stego, "secret") == payload
+    assert len(sink.records) == 3  # nothing after the block
+
+def test_disabled_adds_no_records(cover, payload):
+    sink = instrument.MemorySink()
+    with instrument.instrumented(sink, memory=False):
+        pass
+    assert not instrument.enabled() and instrument.recorder("encode_bytes") is None
+    R.encode_bytes(cover, payload, "secret")
+    assert sink.records == []
+
+def test_nested_blocks_restore_the_outer_sink():
+    outer, inner = instrument.MemorySink(), instrument.MemorySink()
+    with instrument.instrumented(outer, memory=False):
+        with instrument.instrumented(inner, memory=False):
+            Reporter((), op="a").done()
+        Reporter((), op="b").done()
+    assert [r["op"] for r in inner.records] == ["a"] and [r["op"] for r in outer.records] == ["b"]
+    assert not instrument.enabled()
+
+def test_unnamed_ops_are_not_recorded():
+    sink = instrument.MemorySink()
+    with instrument.instrumented(sink, memory=False):
+        Reporter(ENCODE_STAGES).done()
+    assert sink.records == []
+
+def test_jsonl_sink(tmp_path):
+    path = tmp_path / "ops.jsonl"
+    with instrument.instrumented(instrument.JsonlSink(str(path)), memory=False):
+        for op in ("a", "b"):
+            reporter = Reporter(ENCODE_STAGES, op=op)
+            reporter.stage("load")
+            reporter.done()
+    recs = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["op"] for r in recs] == ["a", "b"] and recs[0]["stages"][0]["stage"] == "load"
+
+def test_logging_sink(caplog):
+    with caplog.at_level(logging.INFO, logger="app.core.instrument"):
+        with instrument.instrumented(instrument.LoggingSink(), memory=False):
+            reporter = Reporter(ENCODE_STAGES, op="job")
+            reporter.stage("embed")
+            reporter.done()
+    (msg,) = [r.getMessage() for r in caplog.records]
+    assert msg.startswith("job total=") and "embed=" in msg
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from app.core import kernels, lsb_random_v2 as R, lsb_sequential as S
+from app.core.image_io import load_pixels, slot_view
+from app.core.kernels import extract_k, embed_k, extract_seq
+from app.core.probe import probe_header
+
+# (encode keyword arguments, header bits byte)
+CASES = [
+    ({"bits": 2}, 2),
+    ({"bits": 3}, 3),
+    ({"bits": 4}, 4),
+    ({"bits": 2, "adaptive": True}, R.BITS_ADAPTIVE | 2),
+    ({"bits": 4, "adaptive": True}, R.BITS_ADAPTIVE | 4),
+    ({"bits": 3, "mode": "sharded", "shards": 3}, 3),
+    ({"bits": 2, "compress": "zlib"}, 2),
+]
+
+def _reference_embed(flat, slots, bit_off, data, k):
+    """
+    Payload bit b goes to slot b // k, most significant of the k low bits first.
+    """
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+    b = np.arange(bit_off, bit_off + len(bits))
+    pos, shift = slots[b // k], (k - 1 - b % k).astype(np.uint8)
+    np.bitwise_and.at(flat, pos, ~(np.uint8(1) << shift))
+    np.bitwise_or.at(flat, pos, bits.astype(np.uint8) << shift)
+
+@pytest.fixture
+def flat(rng):
+    return rng.integers(0, 256, 40000, dtype=np.uint8)
+
+@pytest.mark.parametrize("k", range(1, kernels.MAX_BITS + 1))
+@pytest.mark.parametrize("bit_off", [0, 3, 8, 13])
+@pytest.mark.parametrize("source", ["run", "array"])
+def test_embed_k_matches_reference(monkeypatch, rng, flat, k, bit_off, source):
+    monkeypatch.setattr(kernels, "CHUNK_BYTES", 96)  # several steps per call
+    data = rng.integers(0, 256, 3000, dtype=np.uint8).tobytes()
+    idx = np.arange(7, 7 + len(flat) - 7) if source == "run" else rng.permutation(len(flat))
+    slots = 7 if source == "run" else idx
+    expected = flat.copy()
+    _reference_embed(expected, idx, bit_off, data, k)
+    embed_k(flat, slots, bit_off, data, k)
+    assert np.array_equal(flat, expected)
+    assert extract_k(flat, slots, bit_off, len(data), k) == data
+    assert np.array_equal(flat >> k, expected >> k)  # bits above the low k never change
+
+@pytest.mark.parametrize("k", range(1, kernels.MAX_BITS + 1))
+def test_embed_k_in_pieces(rng, flat, k):
+    """
+    Writing a payload in uneven pieces at their bit offsets equals one call, even
+    where pieces share a slot.
+    """
+    data = rng.integers(0, 256, 2001, dtype=np.uint8).tobytes()
+    idx = rng.permutation(len(flat))
+    whole = flat.copy()
+    embed_k(whole, idx, 5, data, k)
+    for a, b in [(0, 1), (1, 334), (334, 335), (335, 2001)]:
+        embed_k(flat, idx, 5 + a * 8, data[a:b], k)
+    assert np.array_equal(flat, whole)
+    assert extract_k(flat, idx, 5 + 334 * 8, 1667, k) == data[334:]
+
+def test_bits_code():
+    assert R._bits_code(1) == 1 and R._bits_code(3) == 3
+    assert R._bits_code(2, adaptive=True) == R.BITS_ADAPTIVE | 2
+    for bits, adaptive in [(0, False), (kernels.MAX_BITS + 1, False), (1, True)]:
+        with pytest.raises(ValueError, match="bits"):
+            R._bits_code(bits, adaptive)
+
+def _fill(cover_png, rng, kwargs):
+    cap = R.capacity_bytes_for_image(cover_png, kwargs.get("mode", "checked"), kwargs.get("shards"),
+                                     kwargs["bits"], kwargs.get("adaptive", False))
+    return rng.integers(0, 256, int(cap * 0.9), dtype=np.uint8).tobytes(), cap
+
+@pytest.mark.parametrize("kwargs,code", CASES)
+def test_random_round_trip(tmp_path, cover_png, rng, kwargs, code):
+    data, cap = _fill(cover_png, rng, kwargs)
+    assert cap > R.capacity_bytes_for_image(cover_png, "checked") * (kwargs["bits"] - 1)
+    payload = tmp_path / "payload.bin"
+    payload.write_bytes(data)
+    out = str(tmp_path / "stego.png")
+    R.encode_v2(cover_png, str(payload), "secret", out, **{"mode": "checked", **kwargs})
+    header = R._read_header(slot_view(load_pixels(out)))
+    assert header.ver == R.ALG_VER_KBIT and header.bits == code
+    assert header.shards == kwargs.get("shards", 1)
+    for workers in (1, 3):
+        dec = R.decode_v2(out, "secret", str(tmp_path / f"out{workers}"), workers=workers)
+        assert dec.crc_ok and open(dec.output_path, "rb").read() == data
+    with pytest.raises(R.KeyCheckError):
+        R.decode_v2(out, "other", str(tmp_path))
+
+@pytest.mark.parametrize("kwargs,code", CASES[:3])
+def test_random_capacity(cover, cover_png, kwargs, code):
+    cap = R.capacity_bytes_for_image(cover_png, "checked", bits=kwargs["bits"])
+    R.encode_bytes(cover, bytes(cap), "secret", mode="checked", bits=kwargs["bits"])
+    with pytest.raises(ValueError, match="too large"):
+        R.encode_bytes(cover, bytes(cap + 1), "secret", mode="checked", bits=kwargs["bits"])
+
+def test_adaptive_prefers_texture(rng):
+    """
+    Smooth runs keep one bit per slot, noisy ones take up to the maximum.
+    """
+    smooth = np.full((64, 96, 3), 128, dtype=np.uint8)
+    noisy = rng.integers(0, 256, smooth.shape, dtype=np.uint8)
+    assert set(R._texture_bits(slot_view(smooth), 0, 4)) == {1}
+    assert np.mean(R._texture_bits(slot_view(noisy), 0, 4)) > 3
+    payload = rng.integers(0, 256, 4000, dtype=np.uint8).tobytes()
+    with pytest.raises(ValueError, match="too large"):
+        R.encode_bytes(smooth, payload, "secret", mode="checked", bits=4, adaptive=True)
+    stego = R.encode_bytes(noisy, payload, "secret", mode="checked", bits=4, adaptive=True)
+    assert R.decode_bytes(stego, "secret") == payload
+
+@pytest.mark.parametrize("bits", [2, 3, 4])
+@pytest.mark.parametrize("compress", [None, "zlib"])
+def test_sequential_round_trip(tmp_path, cover, cover_png, rng, bits, compress):
+    cap = S.capacity_bytes_for_image(cover_png, bits)
+    assert cap > S.capacity_bytes_for_image(cover_png)
+    data = rng.integers(0, 256, cap if compress is None else cap // 2, dtype=np.uint8).tobytes()
+    stego = S.encode_bytes(cover, data, bits=bits, compress=compress)
+    assert extract_seq(slot_view(load_pixels(stego)), 0, 3)[2] == S.ALG_VER_KBIT
+    assert S.decode_bytes(stego) == data
+    if compress is None:
+        with pytest.raises(ValueError, match="too large"):
+            S.encode_bytes(cover, data + b"x", bits=bits)
+    path = tmp_path / "stego.png"
+    path.write_bytes(stego)
+    probe = probe_header(str(path))
+    assert probe.method == "sequential" and probe.ver == S.ALG_VER_KBIT and probe.capacity_bytes == cap
+
+def test_probe_random_kbit(tmp_path, cover, cover_png, payload):
+    path = tmp_path / "stego.png"
+    path.write_bytes(R.encode_bytes(cover, payload, "secret", mode="checked", bits=3))
+    probe = probe_header(str(path))
+    assert probe.method == "random" and probe.ver == R.ALG_VER_KBIT and probe.fast_path
+    assert probe.capacity_bytes >= R.capacity_bytes_for_image(cover_png, "checked", bits=3)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from app.core import kernels
+
+def _reference_embed(flat, idx, data):
+    flat[idx] = (flat[idx] & 0xFE) | np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+@pytest.fixture
+def flat(rng):
+    return rng.integers(0, 256, 300000, dtype=np.uint8)
+
+@pytest.fixture
+def data(rng):
+    return rng.integers(0, 256, 20000, dtype=np.uint8).tobytes()
+
+@pytest.mark.parametrize("start", [0, 3, 801])
+def test_seq_matches_reference(flat, data, start):
+    expected = flat.copy()
+    _reference_embed(expected, np.arange(start, start + len(data) * 8), data)
+    kernels.embed_seq(flat, start, data)
+    assert np.array_equal(flat, expected)
+    assert kernels.extract_seq(flat, start, len(data)) == data
+
+def test_at_matches_reference(flat, data, rng):
+    idx = rng.permutation(len(flat))[:len(data) * 8]
+    expected = flat.copy()
+    _reference_embed(expected, idx, data)
+    kernels.embed_at(flat, idx, data)
+    assert np.array_equal(flat, expected)
+    assert kernels.extract_at(flat, idx, len(data)) == data
+
+def test_callable_slots(flat, data, rng):
+    idx = rng.permutation(len(flat))
+    calls = []
+
+    def slots(off, n):
+        calls.append(n)
+        return idx[off:off + n]
+
+    kernels.embed_at(flat, slots, data)
+    assert kernels.extract_at(flat, idx, len(data)) == data
+    assert kernels.extract_at(flat, kernels.shift_slots(slots, 8 * 100), 50) == data[100:150]
+    assert max(calls) <= kernels.CHUNK_BYTES * 8
+
+def test_only_lsbs_change(flat, data):
+    before = flat.copy()
+    kernels.embed_seq(flat, 0, data)
+    assert np.array_equal(flat >> 1, before >> 1)
+    assert np.array_equal(flat[len(data) * 8:], before[len(data) * 8:])
+
+def test_step_reports_bytes(flat, data):
+    seen = []
+    kernels.embed_seq(flat, 0, data, step=seen.append)
+    assert sum(seen) == len(data)
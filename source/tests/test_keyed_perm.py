@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from app.core.keyed_perm import KeyedPermutation
+
+@pytest.mark.parametrize("domain", [1, 2, 7, 1000, 4097, 65536 + 3])
+def test_bijection(domain):
+    perm = KeyedPermutation(b"k" * 16, domain)
+    values = perm.take(0, domain)
+    assert values.dtype == np.int64
+    assert np.array_equal(np.sort(values), np.arange(domain))
+
+def test_slices_match_whole():
+    perm = KeyedPermutation(b"seed-for-slices!", 10007)
+    whole = perm.take(0, 10007)
+    assert np.array_equal(perm.take(123, 4000), whole[123:4123])
+    assert np.array_equal(perm[[5, 0, 10006]], whole[[5, 0, 10006]])
+
+def test_keyed():
+    a = KeyedPermutation(b"a" * 16, 5000).take(0, 5000)
+    b = KeyedPermutation(b"b" * 16, 5000).take(0, 5000)
+    assert not np.array_equal(a, b)
+    assert np.array_equal(a, KeyedPermutation(b"a" * 16, 5000).take(0, 5000))
+
+def test_range_checks():
+    perm = KeyedPermutation(b"k" * 16, 100)
+    with pytest.raises(ValueError):
+        perm.take(90, 11)
+    with pytest.raises(ValueError):
+        KeyedPermutation(b"k" * 16, 0)
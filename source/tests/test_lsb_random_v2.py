@@ -0,0 +1,108 @@
+import pytest
+
+from app.core import lsb_random_v2 as R
+from app.core.image_io import load_pixels, slot_view
+
+# (encode keyword arguments, header version written)
+CASES = [
+    ({"mode": "shuffle"}, R.ALG_VER),
+    ({"mode": "lazy"}, R.ALG_VER_LAZY),
+    ({"mode": "checked"}, R.ALG_VER_CHECKED),
+    ({"mode": "sharded", "shards": 1}, R.ALG_VER_SHARDED),
+    ({"mode": "sharded", "shards": 3}, R.ALG_VER_SHARDED),
+]
+
+def _header(stego) -> R.Header:
+    return R._read_header(slot_view(load_pixels(stego)))
+
+@pytest.mark.parametrize("kwargs,ver", CASES)
+def test_round_trip_file(tmp_path, cover_png, payload_file, payload, kwargs, ver):
+    out = str(tmp_path / "stego.png")
+    res = R.encode_v2(cover_png, payload_file, "secret", out, **kwargs)
+    assert res.used_bytes == R.HEADER_LEN[ver] + len(payload)
+    assert _header(out).ver == ver
+    dec = R.decode_v2(out, "secret", str(tmp_path))
+    assert dec.crc_ok and dec.payload_len == len(payload)
+    assert open(dec.output_path, "rb").read() == payload
+
+@pytest.mark.parametrize("kwargs,ver", CASES)
+@pytest.mark.parametrize("fmt", ["PNG", "BMP"])
+def test_round_trip_bytes(cover, payload, kwargs, ver, fmt):
+    stego = R.encode_bytes(cover, bytearray(payload), "secret", format=fmt, **kwargs)
+    assert _header(stego).ver == ver
+    assert R.decode_bytes(stego, "secret") == payload
+
+@pytest.mark.parametrize("kwargs,ver", CASES)
+def test_wrong_passphrase_fails_crc(cover, payload, kwargs, ver):
+    stego = R.encode_bytes(cover, payload, "secret", **kwargs)
+    if ver in R.TAGGED_VERSIONS:
+        with pytest.raises(R.KeyCheckError):
+            R.decode_bytes(stego, "not the secret")
+    else:
+        with pytest.raises(ValueError, match="CRC"):
+            R.decode_bytes(stego, "not the secret")
+
+def test_payload_too_large(cover):
+    cap = cover.size // 8 - R.HEADER_LEN[R.ALG_VER_LAZY]
+    with pytest.raises(ValueError, match="too large"):
+        R.encode_bytes(cover, bytes(cap + 1), "secret", mode="lazy")
+    R.encode_bytes(cover, bytes(cap), "secret", mode="lazy")
+
+def test_not_a_stego_image(cover):
+    with pytest.raises(ValueError, match="MAGIC"):
+        R._read_header(slot_view(cover))
+
+@pytest.mark.parametrize("fmt", ["PNG", "BMP", "TIFF"])
+def test_check_key(tmp_path, cover, payload, fmt):
+    stego = R.encode_bytes(cover, payload, "secret", mode="checked", format=fmt)
+    path = tmp_path / f"stego.{fmt.lower()}"
+    path.write_bytes(stego)
+    for src in (stego, str(path), load_pixels(stego)):
+        assert R.check_key(src, "secret")
+        assert not R.check_key(src, "wrong")
+
+def test_check_key_reads_only_the_header(monkeypatch, tmp_path, cover, payload):
+    path = tmp_path / "stego.png"
+    path.write_bytes(R.encode_bytes(cover, payload, "secret", mode="checked"))
+    monkeypatch.setattr(R, "load_pixels", lambda *a, **k: pytest.fail("full image load"))
+    assert R.check_key(str(path), "secret")
+
+def test_check_key_needs_a_tag(cover, payload):
+    with pytest.raises(ValueError, match="no key-check tag"):
+        R.check_key(R.encode_bytes(cover, payload, "secret", mode="lazy"), "secret")
+
+def test_key_check_error_before_extraction(tmp_path, cover_png, payload_file):
+    out = str(tmp_path / "stego.png")
+    R.encode_v2(cover_png, payload_file, "secret", out, mode="checked")
+    with pytest.raises(R.KeyCheckError):
+        R.decode_v2(out, "wrong", str(tmp_path))
+    assert issubclass(R.KeyCheckError, ValueError)
+    assert not (tmp_path / "extracted_payload.bin").exists()
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_shards_recorded_in_header(cover, payload, workers):
+    stego = R.encode_bytes(cover, payload, "secret", mode="sharded", shards=5, workers=workers)
+    assert _header(stego).shards == 5
+    assert R.decode_bytes(stego, "secret", workers=workers) == payload
+
+def test_shard_capacity(cover):
+    cap = R._shard_capacity(cover.size - R.HEADER_LEN[R.ALG_VER_SHARDED] * 8, 4)
+    R.encode_bytes(cover, bytes(cap), "secret", mode="sharded", shards=4)
+    with pytest.raises(ValueError, match="too large"):
+        R.encode_bytes(cover, bytes(cap + 1), "secret", mode="sharded", shards=4)
+    with pytest.raises(ValueError, match="shards"):
+        R.encode_bytes(cover, b"x", "secret", mode="sharded", shards=256)
+
+def test_default_shards_do_not_follow_the_host(monkeypatch, cover_png, cover, payload):
+    for cpus in (1, 16):
+        monkeypatch.setattr(R.os, "cpu_count", lambda: cpus)
+        assert _header(R.encode_bytes(cover, payload, "secret", mode="sharded")).shards == R.DEFAULT_SHARDS
+        assert R.capacity_bytes_for_image(cover_png, "sharded") == R.capacity_bytes_for_image(
+            cover_png, "sharded", R.DEFAULT_SHARDS)
+
+@pytest.mark.parametrize("shards", [0, -1])
+def test_shards_below_one(cover_png, cover, shards):
+    with pytest.raises(ValueError, match="shards"):
+        R.encode_bytes(cover, b"x", "secret", mode="sharded", shards=shards)
+    with pytest.raises(ValueError, match="shards"):
+        R.capacity_bytes_for_image(cover_png, "sharded", shards)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core import lsb_sequential as S
+from app.core.kernels import extract_seq
+from app.core.image_io import load_pixels, slot_view
+
+# (encode keyword arguments, header version written)
+CASES = [
+    ({}, S.ALG_VER),
+]
+
+def _ver(stego) -> int:
+    return extract_seq(slot_view(load_pixels(stego)), 0, 3)[2]
+
+@pytest.mark.parametrize("kwargs,ver", CASES)
+@pytest.mark.parametrize("ext", ["png", "bmp"])
+def test_round_trip_file(tmp_path, cover_png, payload_file, payload, kwargs, ver, ext):
+    out = str(tmp_path / f"stego.{ext}")
+    S.encode_sequential(cover_png, payload_file, out, **kwargs)
+    assert _ver(out) == ver
+    dec = S.decode_sequential(out, str(tmp_path))
+    assert dec.crc_ok and dec.payload_len == len(payload)
+    assert open(dec.output_path, "rb").read() == payload
+
+@pytest.mark.parametrize("kwargs,ver", CASES)
+def test_round_trip_bytes(cover, payload, kwargs, ver):
+    stego = S.encode_bytes(cover, payload, **kwargs)
+    assert _ver(stego) == ver
+    assert S.decode_bytes(stego) == payload
+
+def test_capacity(cover_png, cover):
+    cap = S.capacity_bytes_for_image(cover_png)
+    assert cap == cover.size // 8 - S.HEADER_FIXED_LEN
+    S.encode_bytes(cover, bytes(cap))
+    with pytest.raises(ValueError, match="too large"):
+        S.encode_bytes(cover, bytes(cap + 1))
+
+def test_image_too_small_for_header(tmp_path, rng):
+    tiny = rng.integers(0, 256, (4, 4, 3), dtype=np.uint8)
+    with pytest.raises(ValueError, match="too small for header"):
+        S.decode_bytes(tiny)
+    with pytest.raises(ValueError, match="too small for header"):
+        S.encode_bytes(tiny, b"")
+    between = rng.integers(0, 256, (10, 10, 3), dtype=np.uint8)  # holds the v1 header, not the v3 one
+    with pytest.raises(ValueError, match="too small for header"):
+        S.encode_bytes(between, b"", bits=2)
+    with pytest.raises(ValueError, match=r"Capacity ~0 bytes"):
+        S.encode_bytes(rng.integers(0, 256, (1, 75, 3), dtype=np.uint8), b"x")  # header plus one slot
+    path = tmp_path / "tiny.png"
+    Image.fromarray(tiny).save(path)
+    assert S.capacity_bytes_for_image(str(path)) == S.capacity_bytes_for_image(str(path), bits=2) == 0
+
+def test_corruption_detected(cover, payload):
+    stego = load_pixels(S.encode_bytes(cover, payload)).copy()
+    flat = slot_view(stego)
+    flat[S.HEADER_FIXED_LEN * 8 + 5] ^= 1
+    with pytest.raises(ValueError, match="CRC"):
+        S.decode_bytes(stego)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from app.core import lsb_random_v2 as R
+from app.core.image_io import load_pixels, slot_view
+from app.core.kernels import embed_at, embed_k, embed_seq, extract_seq
+from app.core.metrics import SlotDelta, psnr, sample_peak, ssim
+
+def _embed(cover, rng, how, data):
+    """
+    (stego, delta metrics) after writing data into a copy of cover the given way.
+    """
+    stego = cover.copy()
+    flat = slot_view(stego)
+    delta = SlotDelta(len(flat), cover.shape[2], sample_peak(cover))
+    if how == "seq":
+        embed_seq(flat, 5, data, delta=delta)
+    elif how == "random":
+        embed_at(flat, rng.permutation(len(flat))[:len(data) * 8], data, delta=delta)
+    else:
+        embed_k(flat, rng.permutation(len(flat)), 0, data, int(how[0]), delta=delta)
+    return stego, delta.metrics()
+
+@pytest.mark.parametrize("how", ["seq", "random", "2bit", "3bit", "4bit"])
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+def test_delta_psnr_matches_full_image(rng, how, dtype):
+    cover = rng.integers(0, np.iinfo(dtype).max + 1, (48, 40, 3), dtype=dtype)
+    data = rng.integers(0, 256, 600, dtype=np.uint8).tobytes()
+    stego, q = _embed(cover, rng, how, data)
+    assert q.psnr_db == pytest.approx(psnr(cover, stego))
+    assert q.changed_slots == np.count_nonzero(cover != stego)
+    assert q.embedded_bits == len(data) * 8
+    diff = (cover.astype(np.int64) - stego).reshape(-1, 3)
+    assert q.channel_mse == pytest.approx(tuple((diff ** 2).mean(axis=0)))
+
+def test_delta_psnr_identical(cover):
+    data = extract_seq(slot_view(cover), 5, 500)  # the bits already there
+    stego, q = _embed(cover, None, "seq", data)
+    assert np.array_equal(stego, cover)
+    assert q.psnr_db == psnr(cover, stego) == float("inf")
+    assert q.changed_slots == 0 and q.mse == 0
+
+def test_codec_reports_full_image_psnr(tmp_path, cover_png, payload_file):
+    out = str(tmp_path / "stego.png")
+    res = R.encode_v2(cover_png, payload_file, "secret", out, mode="checked")
+    assert res.psnr_db == pytest.approx(psnr(load_pixels(cover_png), load_pixels(out)))
+
+def test_ssim_identical(cover):
+    assert ssim(cover, cover) == pytest.approx(1.0)
+
+def test_ssim_falls_with_noise(rng, cover):
+    scores = []
+    for sigma in (1, 4, 16, 64):
+        noisy = np.clip(cover + rng.normal(0, sigma, cover.shape), 0, 255).astype(np.uint8)
+        scores.append(ssim(cover, noisy))
+    assert all(1.0 > a > b for a, b in zip(scores, scores[1:]))
+
+def test_ssim_bands_and_window(rng, cover):
+    noisy = np.clip(cover + rng.normal(0, 8, cover.shape), 0, 255).astype(np.uint8)
+    assert ssim(cover, noisy, band_rows=5) == pytest.approx(ssim(cover, noisy))
+    with pytest.raises(ValueError, match="window"):
+        ssim(cover[:6], noisy[:6])
@@ -0,0 +1,83 @@
+import random
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core import lsb_random_v2 as R
+from app.core.multi_cover import FRAG_HEADER_LEN, decode_multi, encode_multi, plan_fragments
+
+@pytest.fixture
+def covers(tmp_path, rng):
+    paths = []
+    for i, (h, w) in enumerate([(40, 60), (64, 96), (30, 50), (50, 80)]):
+        path = tmp_path / "covers" / f"c{i}.png"
+        path.parent.mkdir(exist_ok=True)
+        Image.fromarray(rng.integers(0, 256, (h, w, 3), dtype=np.uint8)).save(path)
+        paths.append(str(path))
+    return paths
+
+@pytest.fixture
+def big_payload(tmp_path, rng):
+    data = rng.integers(0, 256, 4000, dtype=np.uint8).tobytes()
+    path = tmp_path / "big.bin"
+    path.write_bytes(data)
+    return str(path), data
+
+@pytest.mark.parametrize("caps,n,max_load", [([1000, 3000, 2000], 4500, 1.0), ([1000, 3000, 2000], 100, 1.0),
+                                             ([500] * 7, 2000, 0.8), ([10, 5000], 4000, 0.9)])
+def test_plan_fragments(caps, n, max_load):
+    plan = plan_fragments(caps, n, max_load)
+    assert sum(f.length for f in plan) == n
+    assert [f.cover_index for f in plan] == sorted(f.cover_index for f in plan)
+    off = 0
+    for f in plan:
+        assert f.offset == off and f.length + FRAG_HEADER_LEN <= int(caps[f.cover_index] * max_load)
+        off += f.length
+
+def test_plan_fragments_too_large():
+    with pytest.raises(ValueError, match="too large"):
+        plan_fragments([100, 200], 1000)
+    with pytest.raises(ValueError, match="max_load"):
+        plan_fragments([100], 10, 0)
+
+@pytest.mark.parametrize("mode,shards", [("checked", None), ("sharded", 2)])
+@pytest.mark.parametrize("order", ["as written", "reversed", "shuffled"])
+def test_round_trip_any_order(tmp_path, covers, big_payload, mode, shards, order):
+    path, data = big_payload
+    enc = encode_multi(covers, path, "secret", str(tmp_path / "stego"), mode=mode, shards=shards)
+    assert len(enc.plan) > 1
+    stegos = [str(tmp_path / "stego" / f"c{f.cover_index}.png") for f in enc.plan]
+    if order == "reversed":
+        stegos.reverse()
+    elif order == "shuffled":
+        random.Random(7).shuffle(stegos)
+    for workers in (1, 3):
+        dec = decode_multi(stegos, "secret", str(tmp_path / "out"), workers=workers)
+        assert dec.crc_ok and dec.fragments == len(enc.plan) and dec.set_id == enc.set_id
+        assert open(dec.output_path, "rb").read() == data
+
+def test_missing_or_duplicate_fragment(tmp_path, covers, big_payload):
+    enc = encode_multi(covers, big_payload[0], "secret", str(tmp_path / "stego"))
+    stegos = [str(tmp_path / "stego" / f"c{f.cover_index}.png") for f in enc.plan]
+    out = tmp_path / "out"
+    with pytest.raises(ValueError, match="Missing fragments"):
+        decode_multi(stegos[1:], "secret", str(out))
+    assert not (out / "extracted_payload.bin").exists()
+    with pytest.raises(ValueError, match="twice"):
+        decode_multi(stegos + stegos[:1], "secret", str(out))
+
+def test_wrong_key_or_mixed_sets(tmp_path, covers, big_payload):
+    a = encode_multi(covers, big_payload[0], "secret", str(tmp_path / "a"))
+    b = encode_multi(covers, big_payload[0], "secret", str(tmp_path / "b"))
+    stegos_a = [str(tmp_path / "a" / f"c{f.cover_index}.png") for f in a.plan]
+    stegos_b = [str(tmp_path / "b" / f"c{f.cover_index}.png") for f in b.plan]
+    with pytest.raises(R.KeyCheckError):
+        decode_multi(stegos_a, "other", str(tmp_path / "out"))
+    with pytest.raises(ValueError, match="different multi-cover sets"):
+        decode_multi(stegos_a[:1] + stegos_b[1:], "secret", str(tmp_path / "out"), workers=1)
+
+def test_single_image_is_not_a_fragment(tmp_path, cover_png, payload_file):
+    R.encode_v2(cover_png, payload_file, "secret", str(tmp_path / "plain.png"), mode="checked")
+    with pytest.raises(ValueError, match="fragment"):
+        decode_multi([str(tmp_path / "plain.png")], "secret", str(tmp_path / "out"))
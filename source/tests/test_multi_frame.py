@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core.lsb_random_v2 import KeyCheckError
+from app.core.multi_frame import capacity_bytes_for_frames, decode_frames, encode_frames, open_frames
+
+N_FRAMES = 4
+
+def _frames(rng, mode):
+    frames = []
+    for i in range(N_FRAMES):
+        arr = rng.integers(0, 256, (96 + 8 * i, 64, 3), dtype=np.uint8)  # unequal frame sizes only in TIFF
+        if mode != "TIFF":
+            arr = arr[:96]
+        img = Image.fromarray(arr)
+        frames.append(img.quantize(64) if mode == "GIF" else img)
+    return frames
+
+@pytest.fixture(params=[("GIF", "gif"), ("APNG", "png"), ("TIFF", "tif")], ids=["gif", "apng", "tiff"])
+def container(request, tmp_path, rng):
+    fmt, ext = request.param
+    frames = _frames(rng, fmt)
+    path = tmp_path / f"cover.{ext}"
+    extra = {"duration": [40, 80, 120, 160], "loop": 0} if fmt != "TIFF" else {}
+    frames[0].save(path, save_all=True, append_images=frames[1:], **extra)
+    return fmt, str(path)
+
+@pytest.fixture
+def fill(container, tmp_path, rng):
+    """
+    Payload file filling most of the container's capacity, so every frame carries some.
+    """
+    data = rng.integers(0, 256, int(capacity_bytes_for_frames(container[1]) * 0.9), dtype=np.uint8).tobytes()
+    path = tmp_path / "fill.bin"
+    path.write_bytes(data)
+    return str(path), data
+
+def test_round_trip(tmp_path, container, fill):
+    fmt, cover = container
+    out = str(tmp_path / ("stego" + cover[cover.rindex("."):]))
+    res = encode_frames(cover, fill[0], "secret", out, workers=2)
+    assert res.format == fmt and res.frames == N_FRAMES
+    assert sum(res.frame_bytes) == len(fill[1]) and all(res.frame_bytes)
+    assert len(open_frames(out).frames) == N_FRAMES
+    for workers in (1, 3):  # frames finish in any order; output is written at each frame's offset
+        dec = decode_frames(out, "secret", str(tmp_path / f"out{workers}"), workers=workers)
+        assert dec.crc_ok and dec.frames == N_FRAMES and dec.payload_len == len(fill[1])
+        assert open(dec.output_path, "rb").read() == fill[1]
+
+def test_timing_is_kept(tmp_path, container, payload_file):
+    fmt, cover = container
+    if fmt == "TIFF":
+        pytest.skip("TIFF pages carry no timing")
+    out = str(tmp_path / ("stego" + cover[cover.rindex("."):]))
+    encode_frames(cover, payload_file, "secret", out)
+    with Image.open(out) as img:
+        durations = []
+        for i in range(img.n_frames):
+            img.seek(i)
+            durations.append(img.info.get("duration"))
+    assert durations == [40, 80, 120, 160]
+
+def test_wrong_key(tmp_path, container, payload_file):
+    cover = container[1]
+    out = str(tmp_path / ("stego" + cover[cover.rindex("."):]))
+    encode_frames(cover, payload_file, "secret", out)
+    with pytest.raises(KeyCheckError):
+        decode_frames(out, "other", str(tmp_path / "out"))
+    assert not (tmp_path / "out" / "extracted_payload.bin").exists()
+
+def test_capacity_limits(tmp_path, container):
+    cover = container[1]
+    big = tmp_path / "big.bin"
+    big.write_bytes(bytes(capacity_bytes_for_frames(cover) + 1))
+    with pytest.raises(ValueError, match="too large"):
+        encode_frames(cover, str(big), "secret", str(tmp_path / ("stego" + cover[cover.rindex("."):])))
+
+def test_output_extension_must_match(tmp_path, container, payload_file):
+    with pytest.raises(ValueError, match="output path"):
+        encode_frames(container[1], payload_file, "secret", str(tmp_path / "stego.bmp"))
+
+def test_not_a_container_stego(container):
+    with pytest.raises(ValueError, match="MAGIC"):
+        decode_frames(container[1], "secret", ".")
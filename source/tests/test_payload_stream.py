@@ -0,0 +1,46 @@
+import zlib
+
+import pytest
+
+from app.core import lsb_random_v2 as R
+from app.core.payload_stream import PayloadSink, PayloadSource, embed_chunks, extract_chunks
+
+@pytest.mark.parametrize("use_file", [False, True])
+def test_chunks_cover_the_range(payload, payload_file, use_file):
+    source = PayloadSource(payload_file if use_file else payload, chunk=97)
+    parts = list(source.chunks(10, 1000))
+    assert parts[0][0] == 10 and all(len(d) <= 97 for _, d in parts)
+    assert b"".join(bytes(d) for _, d in parts) == payload[10:1000]
+
+def test_chunk_crcs(payload):
+    written = bytearray(len(payload))
+    crc = embed_chunks(PayloadSource(payload, chunk=64), 0, len(payload),
+                       lambda off, data: written.__setitem__(slice(off, off + len(data)), data))
+    assert crc == zlib.crc32(payload) and written == payload
+    sink = PayloadSink()
+    sink.open(len(payload))
+    assert extract_chunks(0, len(payload), lambda off, n: payload[off:off + n], sink, chunk=33) == crc
+    assert sink.getvalue() == payload
+
+def test_sink_accepts_writes_out_of_order(tmp_path, payload):
+    for path in (None, str(tmp_path / "out" / "p.bin")):
+        sink = PayloadSink(path)
+        sink.open(len(payload))
+        for off in reversed(range(0, len(payload), 100)):
+            sink.write(off, payload[off:off + 100])
+        sink.close()
+        assert (sink.getvalue() if path is None else open(path, "rb").read()) == payload
+
+def test_discard_removes_partial_output(tmp_path):
+    path = tmp_path / "partial.bin"
+    sink = PayloadSink(str(path))
+    sink.open(10)
+    sink.write(0, b"abc")
+    sink.discard()
+    assert not path.exists()
+
+def test_small_chunks_round_trip(tmp_path, cover_png, payload_file, payload):
+    out = str(tmp_path / "stego.png")
+    R.encode_v2(cover_png, PayloadSource(payload_file, chunk=13), "secret", out, mode="checked")
+    assert R.decode_v2(out, "secret", str(tmp_path)).crc_ok
+    assert (tmp_path / "extracted_payload.bin").read_bytes() == payload
@@ -0,0 +1,113 @@
+import struct
+import zlib
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core import lsb_random_v2 as R, lsb_sequential as S
+from app.core.image_io import image_slots, load_pixels, pixel_mode, read_leading_slots, slot_view
+
+# (channels, dtype, mode name)
+LAYOUTS = [
+    (1, np.uint8, "L"),
+    (2, np.uint8, "LA"),
+    (3, np.uint8, "RGB"),
+    (4, np.uint8, "RGBA"),
+    (1, np.uint16, "I;16"),
+    (3, np.uint16, "RGB;16"),
+    (4, np.uint16, "RGBA;16"),
+]
+
+@pytest.fixture(params=LAYOUTS, ids=[m for _, _, m in LAYOUTS])
+def layout(request, rng):
+    channels, dtype, mode = request.param
+    arr = rng.integers(0, np.iinfo(dtype).max + 1, (64, 80, channels), dtype=dtype)
+    return arr, mode
+
+def test_pixel_mode_and_slots(layout):
+    arr, mode = layout
+    assert pixel_mode(arr) == mode
+    flat = slot_view(arr)
+    assert len(flat) == arr.size
+    assert np.array_equal(flat, (arr.reshape(-1) & 0xFF).astype(np.uint8))
+
+@pytest.mark.parametrize("mode", ["checked", "sharded"])
+def test_random_round_trip_keeps_mode(layout, payload, mode):
+    arr, name = layout
+    stego = R.encode_bytes(arr, payload[:arr.size // 8 - 100], "secret", mode=mode)
+    back = load_pixels(stego)
+    assert pixel_mode(back) == name and back.shape == arr.shape
+    assert R.decode_bytes(stego, "secret") == payload[:arr.size // 8 - 100]
+    diff = back.astype(np.int32) - arr.astype(np.int32)
+    assert np.abs(diff).max() <= 1  # only the LSB of each sample changes
+
+def test_sequential_round_trip_keeps_mode(layout, payload):
+    arr, name = layout
+    data = payload[:arr.size // 8 - S.HEADER_FIXED_LEN]
+    stego = S.encode_bytes(arr, data)
+    assert pixel_mode(load_pixels(stego)) == name
+    assert S.decode_bytes(stego) == data
+
+@pytest.mark.parametrize("mode,ext", [("L", "png"), ("LA", "png"), ("RGBA", "png"), ("I;16", "png"),
+                                      ("RGBA", "tif"), ("L", "bmp")])
+def test_file_round_trip_and_capacity(tmp_path, rng, payload_file, payload, mode, ext):
+    cover = tmp_path / f"cover.{ext}"
+    dtype = np.uint16 if mode == "I;16" else np.uint8
+    channels = {"L": 1, "LA": 2, "RGBA": 4, "I;16": 1}[mode]
+    arr = rng.integers(0, np.iinfo(dtype).max + 1, (120, 120, channels), dtype=dtype)
+    Image.fromarray(arr[..., 0] if channels == 1 else arr).save(cover)
+    assert image_slots(str(cover)) == arr.size
+    assert R.capacity_bytes_for_image(str(cover), "checked") >= len(payload)
+    out = str(tmp_path / f"stego.{ext}")
+    R.encode_v2(str(cover), payload_file, "secret", out, mode="checked")
+    with Image.open(out) as img:
+        assert img.mode == mode or (mode == "I;16" and img.mode.startswith("I;16"))
+    assert open(R.decode_v2(out, "secret", str(tmp_path)).output_path, "rb").read() == payload
+
+def test_format_that_cannot_hold_the_mode(tmp_path, rng, payload_file):
+    cover = tmp_path / "cover.png"
+    Image.fromarray(rng.integers(0, 256, (64, 64, 4), dtype=np.uint8)).save(cover)
+    with pytest.raises(ValueError, match="losslessly"):
+        R.encode_v2(str(cover), payload_file, "secret", str(tmp_path / "stego.bmp"), mode="checked")
+
+def _filtered_png16(arr, ftypes) -> bytes:
+    """
+    16-bit PNG of arr with the given filter type per row, filtered the plain way.
+    """
+    H, W, C = arr.shape
+    rows = arr.astype(">u2").view(np.uint8).reshape(H, -1).astype(np.int16)
+    bpp, prev, raw = 2 * C, np.zeros(rows.shape[1], dtype=np.int16), bytearray()
+    for cur, ftype in zip(rows, ftypes):
+        a = np.concatenate([np.zeros(bpp, np.int16), cur[:-bpp]])
+        c = np.concatenate([np.zeros(bpp, np.int16), prev[:-bpp]])
+        p = a + prev - c
+        pa, pb, pc = np.abs(p - a), np.abs(p - prev), np.abs(p - c)
+        paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, prev, c))
+        pred = [0 * cur, a, prev, (a + prev) >> 1, paeth][ftype]
+        raw += bytes([ftype]) + ((cur - pred) & 0xFF).astype(np.uint8).tobytes()
+        prev = cur
+
+    def chunk(ctype, data):
+        return struct.pack(">I", len(data)) + ctype + data + struct.pack(">I", zlib.crc32(ctype + data))
+    ihdr = struct.pack(">IIBBBBB", W, H, 16, {2: 4, 3: 2, 4: 6}[C], 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", zlib.compress(bytes(raw)))
+            + chunk(b"IEND", b""))
+
+@pytest.mark.parametrize("channels", [2, 3, 4])
+@pytest.mark.parametrize("filters", ["paeth", "average", "mixed"])
+def test_png16_filters(rng, channels, filters):
+    arr = rng.integers(0, 1 << 16, (40, 33, channels), dtype=np.uint16)
+    ftypes = {"paeth": [4] * 40, "average": [3] * 40, "mixed": list(rng.integers(0, 5, 40))}[filters]
+    data = _filtered_png16(arr, ftypes)
+    assert np.array_equal(load_pixels(data), arr)
+    assert np.array_equal(read_leading_slots(data, 1000), slot_view(arr)[:1000])
+
+def test_png16_bad_filter(rng):
+    data = _filtered_png16(rng.integers(0, 1 << 16, (4, 4, 3), dtype=np.uint16), [0] * 4)
+    raw = bytearray(zlib.decompress(data[41:data.index(b"IEND") - 8]))
+    raw[0] = 7
+    idat = zlib.compress(bytes(raw))
+    bad = data[:33] + struct.pack(">I", len(idat)) + b"IDAT" + idat + struct.pack(">I", zlib.crc32(b"IDAT" + idat))
+    with pytest.raises(ValueError, match="filter"):
+        load_pixels(bad + data[-12:])
@@ -0,0 +1,70 @@
+import os
+import signal
+import time
+
+import pytest
+
+from app.service.pool import JobError, QueueFull, WorkerPool
+
+pytestmark = pytest.mark.skipif(not hasattr(signal, "SIGSTOP"), reason="needs POSIX signals")
+
+@pytest.fixture
+def pool():
+    p = WorkerPool(workers=1, queue_size=1)
+    yield p
+    if p._workers[0][0].is_alive():
+        os.kill(p._workers[0][0].pid, signal.SIGCONT)
+    p.close()
+
+@pytest.fixture
+def job(cover_png):
+    return "capacity", {"path": cover_png, "mode": "checked"}
+
+def _pid(pool):
+    return pool._workers[0][0].pid
+
+def test_capacity_job(pool, job):
+    value, worker_ms = pool.submit(*job).result(timeout=30)
+    assert value["capacity_bytes"] > 0 and worker_ms >= 0
+    with pytest.raises(JobError) as e:
+        pool.submit("nope", {}).result(timeout=30)
+    assert e.value.kind == "ValueError"
+
+def test_queue_full_and_abandon(pool, job):
+    pool.submit(*job).result(timeout=30)  # worker is up
+    os.kill(_pid(pool), signal.SIGSTOP)
+    first, second = pool.submit(*job), pool.submit(*job)
+    with pytest.raises(QueueFull):
+        pool.submit(*job)
+    assert pool.abandon(second) and second.cancelled()
+    assert not pool.abandon(second)
+    assert pool.in_flight == 1 and pool.abandoned == 1
+    third = pool.submit(*job)
+    os.kill(_pid(pool), signal.SIGCONT)
+    assert first.result(timeout=30)[0] == third.result(timeout=30)[0]
+    deadline = time.monotonic() + 10
+    while pool.abandoned and time.monotonic() < deadline:  # the abandoned job still reports back
+        time.sleep(0.05)
+    assert pool.abandoned == 0 and pool.queued == 0
+
+def test_expired_job_is_skipped(pool, job):
+    pool.submit(*job).result(timeout=30)
+    os.kill(_pid(pool), signal.SIGSTOP)
+    fut = pool.submit(*job, timeout=0.01)
+    time.sleep(0.1)
+    os.kill(_pid(pool), signal.SIGCONT)
+    with pytest.raises(JobError) as e:
+        fut.result(timeout=30)
+    assert e.value.kind == "JobExpired"
+
+def test_dead_worker_is_replaced(pool, job):
+    pool.submit(*job).result(timeout=30)
+    old = _pid(pool)
+    os.kill(old, signal.SIGSTOP)
+    fut = pool.submit(*job)
+    os.kill(old, signal.SIGKILL)
+    with pytest.raises(JobError) as e:
+        fut.result(timeout=30)
+    assert e.value.kind == "WorkerDied"
+    assert pool.submit(*job).result(timeout=60)[0]["capacity_bytes"] > 0
+    assert _pid(pool) != old and pool.in_flight == 0
@@ -0,0 +1,30 @@
+from app.core import lsb_random_v2 as R, lsb_sequential as S
+from app.core.probe import capacity_from_metadata, probe_header
+
+def test_probe_random(tmp_path, cover_png, payload_file, payload):
+    out = str(tmp_path / "stego.png")
+    R.encode_v2(cover_png, payload_file, "secret", out, mode="checked")
+    res = probe_header(out)
+    assert res.method == "random" and res.ver == R.ALG_VER_CHECKED and res.fast_path
+    assert res.payload_len == len(payload)
+    assert res.capacity_bytes == capacity_from_metadata(out, R.HEADER_LEN[R.ALG_VER_CHECKED])
+
+def test_probe_sequential(tmp_path, cover_png, payload_file):
+    out = str(tmp_path / "stego.bmp")
+    S.encode_sequential(cover_png, payload_file, out)
+    res = probe_header(out)
+    assert res.method == "sequential" and res.ver == S.ALG_VER and res.fast_path
+
+def test_probe_clean_image(cover_png):
+    assert probe_header(cover_png) is None
+
+def test_probe_without_fast_path(tmp_path, cover, payload):
+    path = tmp_path / "stego.tiff"
+    path.write_bytes(R.encode_bytes(cover, payload, "secret", mode="checked", format="TIFF"))
+    assert probe_header(str(path), allow_full_decode=False) is None
+    res = probe_header(str(path))
+    assert res is not None and not res.fast_path
+
+def test_capacity_from_metadata(cover_png, cover):
+    assert capacity_from_metadata(cover_png) == cover.size // 8 - 28
+    assert capacity_from_metadata(cover_png) == R.capacity_bytes_for_image(cover_png, "shuffle")
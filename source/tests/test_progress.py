@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from app.core import lsb_random_v2 as R
+from app.core.progress import ENCODE_STAGES, CancelToken, Cancelled, Reporter
+
+def test_cancel_token():
+    token = CancelToken()
+    assert not token.cancelled
+    token.raise_if_cancelled()
+    token.cancel()
+    assert token.cancelled
+    with pytest.raises(Cancelled):
+        token.raise_if_cancelled()
+
+def test_reporter_fractions():
+    seen = []
+    rep = Reporter(("load", "embed", "save"), lambda stage, frac: seen.append((stage, round(frac, 4))))
+    rep.stage("load")
+    rep.stage("embed", total=4)
+    rep.step(1)
+    rep.step(3)
+    rep.step(5)  # overshoot is clamped to the end of the stage
+    rep.stage("save")
+    rep.done()
+    assert seen == [("load", 0.0), ("embed", 0.3333), ("embed", 0.4167), ("embed", 0.6667), ("embed", 0.6667),
+                    ("save", 0.6667), ("done", 1.0)]
+
+def test_reporter_steps_from_threads():
+    seen = []
+    rep = Reporter(("embed",), lambda stage, frac: seen.append(frac))
+    rep.stage("embed", total=8 * 1000)
+    threads = [threading.Thread(target=lambda: [rep.step(1) for _ in range(1000)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(seen) == 1.0 and len(seen) == 8001
+
+def test_reporter_checks_the_token():
+    token = CancelToken()
+    rep = Reporter(("load", "embed"), cancel=token)
+    rep.stage("load", total=10)
+    rep.step(1)
+    token.cancel()
+    with pytest.raises(Cancelled):
+        rep.step(1)
+    with pytest.raises(Cancelled):
+        rep.stage("embed")
+
+def test_codec_reports_every_stage_in_order(cover, payload):
+    seen = []
+    R.encode_bytes(cover, payload, "secret", mode="checked", progress=lambda stage, frac: seen.append((stage, frac)))
+    stages = [s for s, _ in seen if s != "done"]
+    assert stages[0] == "load" and seen[-1] == ("done", 1.0)
+    assert [ENCODE_STAGES.index(s) for s in stages] == sorted(ENCODE_STAGES.index(s) for s in stages)
+    assert [f for _, f in seen] == sorted(f for _, f in seen)
+
+def test_codec_stops_when_cancelled(cover, payload):
+    token = CancelToken()
+
+    def progress(stage, frac):
+        if stage == "embed":
+            token.cancel()
+    with pytest.raises(Cancelled):
+        R.encode_bytes(cover, payload, "secret", mode="checked", progress=progress, cancel=token)
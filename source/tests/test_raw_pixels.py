@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core import lsb_random_v2 as R, lsb_sequential as S
+from app.core.image_io import load_pixels, slot_view
+from app.core.raw_pixels import open_raw, raw_output
+
+@pytest.fixture(params=["bmp", "ppm"])
+def raw_cover(request, tmp_path, cover):
+    path = tmp_path / f"cover.{request.param}"
+    Image.fromarray(cover).save(path)
+    return str(path)
+
+def test_slots_match_decoded_pixels(raw_cover):
+    raw = open_raw(raw_cover)
+    try:
+        expected = slot_view(load_pixels(raw_cover))
+        assert len(raw.slots) == len(expected)
+        assert np.array_equal(raw.slots[0:len(expected)], expected)
+        idx = np.array([5, 0, len(expected) - 1, 77])
+        assert np.array_equal(raw.slots[idx], expected[idx])
+    finally:
+        raw.close()
+
+def test_raw_encode_matches_decoded_encode(tmp_path, raw_cover, payload_file):
+    ext = raw_cover.rsplit(".", 1)[1]
+    assert raw_output(raw_cover, f"x.{ext}") and not raw_output(raw_cover, "x.png")
+    out_raw, out_png = str(tmp_path / f"stego.{ext}"), str(tmp_path / "stego.png")
+    S.encode_sequential(raw_cover, payload_file, out_raw)
+    S.encode_sequential(raw_cover, payload_file, out_png)
+    assert np.array_equal(load_pixels(out_raw), load_pixels(out_png))
+    assert os.path.getsize(out_raw) == os.path.getsize(raw_cover)
+
+def test_raw_round_trip(tmp_path, raw_cover, payload_file, payload):
+    out = str(tmp_path / ("stego." + raw_cover.rsplit(".", 1)[1]))
+    R.encode_v2(raw_cover, payload_file, "secret", out, mode="checked")
+    assert R.decode_v2(out, "secret", str(tmp_path)).crc_ok
+    assert (tmp_path / "extracted_payload.bin").read_bytes() == payload
+
+def test_failed_raw_encode_leaves_no_output(tmp_path, raw_cover):
+    out = tmp_path / ("stego." + raw_cover.rsplit(".", 1)[1])
+    big = tmp_path / "big.bin"
+    big.write_bytes(bytes(100000))
+    with pytest.raises(ValueError):
+        R.encode_v2(raw_cover, str(big), "secret", str(out), mode="checked")
+    assert not out.exists()
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+
+import pytest
+
+from tools import startup_bench as B
+
+SLACK = 3  # budgets are tuned for a quiet machine; CI runners are slower and noisier
+
+def _run(code: str) -> str:
+    proc = subprocess.run([sys.executable, "-c", code], cwd=B.SOURCE_DIR, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout
+
+def test_help_imports_no_heavy_modules():
+    out = _run("import sys\n"
+               "from app import cli\n"
+               "try:\n"
+               "    cli.main(['--help'])\n"
+               "except SystemExit:\n"
+               "    pass\n"
+               "print('LOADED', *sorted(m for m in sys.modules if m.split('.')[0] in ('numpy', 'PIL', 'tkinter')))")
+    assert "usage: stego" in out
+    assert out.split("LOADED")[1].split() == []
+
+def test_usage_error_exits_2():
+    proc = subprocess.run([sys.executable, "-m", "app.cli", "encode"], cwd=B.SOURCE_DIR, capture_output=True,
+                          text=True)
+    assert proc.returncode == 2 and "usage" in proc.stderr
+
+def test_parse_importtime():
+    stderr = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       100 |        100 |   _io\n"
+              "import time:       200 |        500 | app\n"
+              "import time:       300 |        300 |   app.cli\n"
+              "some other line\n")
+    total, modules = B.parse_importtime(stderr)
+    assert total == pytest.approx(0.5)  # only the top-level entry counts; it includes app.cli
+    assert modules == {"_io": 0.1, "app": 0.5, "app.cli": 0.3}
+    assert B._forbidden(modules, ("app",)) == ["app", "app.cli"]
+    assert B._forbidden(modules, ("ap",)) == []
+
+@pytest.mark.parametrize("name", ["cli_help", "cli_capacity"])
+def test_startup_budget(tmp_path, name):
+    B.make_inputs(tmp_path)
+    argv, budget, banned = B.scenarios(tmp_path)[name]
+    _, imports, seen = B.run_scenario(argv, repeat=3)
+    assert B._forbidden(seen, banned) == []
+    assert imports <= budget * SLACK
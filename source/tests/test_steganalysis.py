@@ -0,0 +1,71 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.core import steganalysis as SA
+
+H = W = 256
+
+@pytest.fixture
+def smooth(rng):
+    """
+    Float image with the local correlation of a photo: gradients, a slow wave, mild noise.
+    """
+    y, x = np.mgrid[:H, :W]
+    base = (50 + 0.3 * x + 0.25 * y + 20 * np.sin(x / 17) * np.cos(y / 23))[..., None] + np.array([0, 10, -10])
+    return base + rng.normal(0, 2.5, (H, W, 3))
+
+def _cover(smooth, dtype):
+    return np.clip(np.round(1.3 * smooth), 0, np.iinfo(dtype).max).astype(dtype)
+
+def _comb(smooth, rng):
+    """
+    8-bit cover whose value pairs are far from equal (mostly even values), as after
+    a levels adjustment; the chi-square attack needs that imbalance to tell.
+    """
+    return (np.clip(np.round(smooth / 2), 0, 127) * 2 + (rng.random(smooth.shape) < 0.25)).astype(np.uint8)
+
+def _embed(cover, rng, rate):
+    """
+    LSB replacement with random bits in a random rate fraction of the samples.
+    """
+    stego = cover.copy()
+    hit = rng.random(cover.shape) < rate
+    stego[hit] = (stego[hit] & ~cover.dtype.type(1)) | rng.integers(0, 2, hit.sum()).astype(cover.dtype)
+    return stego
+
+def test_normal_sf_matches_erfc():
+    z = np.linspace(-8, 8, 4001)
+    expected = np.array([0.5 * math.erfc(v / math.sqrt(2)) for v in z])
+    assert np.abs(SA._normal_sf(z) - expected).max() < 1e-7
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+def test_rs_spa_clean(smooth, dtype):
+    scores = SA.analyze(_cover(smooth, dtype))
+    assert scores.rs_rate < 0.05 and scores.spa_rate < 0.05
+
+@pytest.mark.parametrize("rate", [0.25, 0.5])
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+def test_rs_spa_estimate_the_rate(smooth, rng, dtype, rate):
+    scores = SA.analyze(_embed(_cover(smooth, dtype), rng, rate))
+    assert scores.rs_rate == pytest.approx(rate, abs=0.06)
+    assert scores.spa_rate == pytest.approx(rate, abs=0.06)
+
+def test_chi_square(smooth, rng):
+    cover = _comb(smooth, rng)
+    assert SA.analyze(cover).chi_p < 0.01
+    assert SA.analyze(_embed(cover, rng, 1.0)).chi_p > 0.99
+    sequential = cover.copy()
+    sequential[:H // 4] = _embed(cover[:H // 4], rng, 1.0)
+    scores = SA.analyze(sequential)
+    assert scores.chi_p < 0.01 and scores.chi_prefix == pytest.approx(0.25, abs=SA.BAND_ROWS / H)
+
+def test_tiles_find_localized_embedding(smooth, rng):
+    stego = _cover(smooth, np.uint8)
+    stego[:H // 2, :W // 2] = _embed(stego[:H // 2, :W // 2], rng, 1.0)
+    scores = SA.analyze(stego, tile=32)
+    assert scores.tile_hot == pytest.approx(0.25, abs=0.05)
+    assert scores.tile_rs_p90 > 0.8 and scores.tile_spa_p90 > 0.8
+    with pytest.raises(ValueError, match="tile"):
+        SA.analyze(stego, tile=6)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core import lsb_random_v2 as R
+from app.core.try_keys import try_keys
+
+WRONG = [f"guess-{i}" for i in range(8)]
+
+@pytest.mark.parametrize("mode", ["lazy", "checked"])  # CRC trials over the slot stream / tag checks only
+@pytest.mark.parametrize("workers", [1, 3])
+def test_finds_the_key(tmp_path, cover, payload, mode, workers):
+    stego = R.encode_bytes(cover, payload, "secret", mode=mode)
+    candidates = WRONG[:5] + ["secret"] + WRONG[5:]
+    res = try_keys(stego, candidates, workers=workers)
+    assert res.passphrase == "secret" and res.index == 5 and res.candidates == len(candidates)
+    assert res.payload == payload and res.payload_len == len(payload) and res.output_path is None
+    assert 1 <= res.tried <= len(candidates)
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_no_match(cover, payload, workers):
+    stego = R.encode_bytes(cover, payload, "secret", mode="lazy")
+    res = try_keys(stego, WRONG + WRONG[:3], workers=workers)  # duplicates are tried once
+    assert res.passphrase is None and res.index == -1 and res.payload is None
+    assert res.tried == res.candidates == len(WRONG)
+
+@pytest.mark.parametrize("mode", ["lazy", "sharded"])
+def test_raw_path_to_out_dir(tmp_path, cover, payload_file, payload, mode):
+    cover_bmp = tmp_path / "cover.bmp"
+    Image.fromarray(cover).save(cover_bmp)
+    out = str(tmp_path / "stego.bmp")
+    R.encode_v2(str(cover_bmp), payload_file, "secret", out, mode=mode)
+    res = try_keys(out, WRONG + ["secret"], out_dir=str(tmp_path / "out"), workers=2)
+    assert res.passphrase == "secret" and res.payload is None
+    assert open(res.output_path, "rb").read() == payload
+
+def test_16_bit_cover(rng, payload):
+    cover = rng.integers(0, 1 << 16, (64, 64, 3), dtype=np.uint16)
+    stego = R.encode_bytes(cover, payload, "secret", mode="lazy")
+    assert try_keys(stego, WRONG + ["secret"], workers=2).payload == payload
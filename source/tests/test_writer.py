@@ -0,0 +1,82 @@
+import io
+import zlib
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core import writer as W
+from app.core.image_io import load_pixels
+
+@pytest.mark.parametrize("len1,len2", [(0, 0), (1, 0), (0, 7), (1000, 1), (70000, 65521), (5, 200000)])
+def test_adler32_combine(rng, len1, len2):
+    a = rng.integers(0, 256, len1, dtype=np.uint8).tobytes()
+    b = rng.integers(0, 256, len2, dtype=np.uint8).tobytes()
+    assert W._adler32_combine(zlib.adler32(a), zlib.adler32(b), len(b)) == zlib.adler32(a + b)
+
+@pytest.mark.parametrize("workers", [1, 4])
+@pytest.mark.parametrize("filter", ["none", "up"])
+@pytest.mark.parametrize("channels,dtype", [(1, np.uint8), (2, np.uint8), (3, np.uint8), (4, np.uint8),
+                                            (3, np.uint16)])
+def test_png_bands_decode_to_the_same_pixels(monkeypatch, rng, workers, filter, channels, dtype):
+    monkeypatch.setattr(W, "BAND_BYTES", 1000)  # many bands, so the stream joins and checksum combining are used
+    arr = rng.integers(0, np.iinfo(dtype).max + 1, (37, 29, channels), dtype=dtype)
+    data = W.encode_png_bands(arr, level=1, filter=filter, workers=workers)
+    zlib.decompress(data[data.index(b"IDAT") + 4:])  # fails on a bad Adler-32 or a broken deflate stream
+    back = load_pixels(data)
+    assert np.array_equal(back.reshape(arr.shape), arr)
+
+def test_png_bands_are_deterministic(monkeypatch, cover):
+    monkeypatch.setattr(W, "BAND_BYTES", 2000)
+    assert W.encode_png_bands(cover, 4, "up", workers=1) == W.encode_png_bands(cover, 4, "up", workers=3)
+
+@pytest.mark.parametrize("fmt", ["PNG", "BMP", "TIFF"])
+@pytest.mark.parametrize("profile", W.PROFILES)
+def test_encode_image_is_lossless(cover, fmt, profile):
+    data = W.encode_image(cover, fmt, profile)
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.format == fmt
+    assert np.array_equal(load_pixels(data), cover)
+
+def test_encode_image_rejects_lossy_modes(cover):
+    rgba = np.dstack([cover, cover[..., :1]])
+    with pytest.raises(ValueError, match="losslessly"):
+        W.encode_image(rgba, "BMP")
+    with pytest.raises(ValueError, match="profile"):
+        W.encode_image(cover, "PNG", "tiny")
+    with pytest.raises(ValueError, match="format"):
+        W.encode_image(cover, "JPEG")
+
+def test_write_image_format_from_extension(tmp_path, cover):
+    res = W.write_image(cover, tmp_path / "out.tif")
+    assert res.format == "TIFF" and res.bytes_written == (tmp_path / "out.tif").stat().st_size
+    assert W.format_for_path("x.unknown") == "PNG"
+
+def test_pooled_callers_encode_on_one_thread(monkeypatch, tmp_path, cover, cover_png, payload, payload_file):
+    """
+    Batch, service and async jobs already run side by side; the PNG encoder must not add a thread pool each.
+    """
+    import asyncio
+    import base64
+
+    from app.core.async_api import AsyncStego
+    from app.service import handlers
+    from tools.batch import run_job
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("PNG encoder started a thread pool")
+    monkeypatch.setattr(W, "BAND_BYTES", 1000)
+    monkeypatch.setattr(W, "ThreadPoolExecutor", no_pool)
+    monkeypatch.setattr(W.os, "cpu_count", lambda: 8)
+    b64 = base64.b64encode(payload).decode("ascii")
+    for method in ("random", "sequential"):
+        handlers.encode({"method": method, "cover_path": cover_png, "payload_b64": b64, "passphrase": "pw"})
+        handlers.encode({"method": method, "cover_path": cover_png, "payload_path": payload_file,
+                         "passphrase": "pw", "out_path": str(tmp_path / f"{method}.png")})
+        row = run_job({"cover": cover_png, "payload": payload_file, "output": str(tmp_path / f"b-{method}.png")},
+                      "encode", method, "checked", "pw", verify=True)
+        assert row["ok"], row.get("error")
+        asyncio.run(AsyncStego().encode(cover_png, payload_file, "pw", str(tmp_path / f"a-{method}.png"),
+                                        method=method))
+    with pytest.raises(AssertionError, match="thread pool"):
+        W.encode_png_bands(cover)  # a single job still uses the machine
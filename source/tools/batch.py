@@ -0,0 +1,141 @@
+import argparse, csv, json, os, sys, time, traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from app.core.lsb_random_v2 import MODES, encode_v2, decode_v2
+from app.core.lsb_sequential import encode_sequential, decode_sequential
+from app.core.compression import CODECS
+from app.core.writer import PROFILES
+
+IMAGE_EXTS = {".png", ".bmp", ".tif", ".tiff", ".webp"}
+
+def load_manifest(path: Path):
+    """
+    Jobs from a JSONL or CSV manifest with keys: cover, payload, output
+    (encode) or stego, output (decode). Optional per-job "passphrase".
+    """
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            return [dict(r) for r in csv.DictReader(f)]
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                jobs.append(json.loads(line))
+    return jobs
+
+def jobs_from_dir(in_dir: Path, out_dir: Path, op: str, payload: str = None):
+    jobs = []
+    for p in sorted(in_dir.iterdir()):
+        if p.suffix.lower() not in IMAGE_EXTS:
+            continue
+        if op == "encode":
+            jobs.append({"cover": str(p), "payload": payload, "output": str(out_dir / f"{p.stem}.png")})
+        else:
+            jobs.append({"stego": str(p), "output": str(out_dir / p.stem)})
+    return jobs
+
+def run_job(job: dict, op: str, method: str, mode: str, passphrase: str, verify: bool,
+            profile: str = "balanced", compress: str = None) -> dict:
+    """
+    Runs one job in a worker process. Never raises: failures are reported in the result row.
+    The pool already runs a job per process, so the codecs get workers=1.
+    """
+    pw = job.get("passphrase") or passphrase
+    res = {"job": job.get("cover") or job.get("stego"), "op": op, "method": method, "ok": False}
+    t_start = time.perf_counter()
+    try:
+        if op == "encode":
+            out = job["output"]
+            Path(out).parent.mkdir(parents=True, exist_ok=True)
+            t0 = time.perf_counter()
+            if method == "sequential":
+                enc = encode_sequential(job["cover"], job["payload"], out, profile=profile, compress=compress,
+                                        workers=1)
+            else:
+                enc = encode_v2(job["cover"], job["payload"], pw, out, mode=mode, profile=profile, compress=compress,
+                                workers=1)
+            res["encode_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            res.update(output=out, psnr_db=enc.psnr_db, used_bytes=enc.used_bytes, capacity_bytes=enc.capacity_bytes)
+            res["compression"] = enc.compression
+            if verify:
+                vdir = str(Path(out).with_suffix("")) + "_verify"
+                t0 = time.perf_counter()
+                dec = decode_sequential(out, vdir) if method == "sequential" else decode_v2(out, pw, vdir, workers=1)
+                res["decode_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+                res["crc_ok"] = dec.crc_ok
+                os.remove(dec.output_path)
+                try: os.rmdir(vdir)
+                except OSError: pass
+        else:
+            t0 = time.perf_counter()
+            if method == "sequential":
+                dec = decode_sequential(job["stego"], job["output"])
+            else:
+                dec = decode_v2(job["stego"], pw, job["output"], workers=1)
+            res["decode_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            res.update(output=dec.output_path, payload_len=dec.payload_len, crc_ok=dec.crc_ok)
+        res["ok"] = res.get("crc_ok", True)
+    except Exception as e:
+        res["error"] = f"{type(e).__name__}: {e}"
+        res["traceback"] = traceback.format_exc(limit=3)
+    res["total_ms"] = round((time.perf_counter() - t_start) * 1000, 2)
+    return res
+
+def run_batch(jobs, op: str, method: str, mode: str, passphrase: str, workers: int,
+              results_path: Path, verify: bool = False, profile: str = "balanced", compress: str = None) -> dict:
+    t0 = time.perf_counter()
+    n_ok = n_fail = 0
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(results_path, "w", encoding="utf-8") as out, \
+         ProcessPoolExecutor(max_workers=workers) as ex:
+        futs = [ex.submit(run_job, job, op, method, mode, passphrase, verify, profile, compress) for job in jobs]
+        for fut in as_completed(futs):
+            row = fut.result()
+            if row["ok"]:
+                n_ok += 1
+            else:
+                n_fail += 1
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+    elapsed = time.perf_counter() - t0
+    return {"jobs": len(jobs), "ok": n_ok, "failed": n_fail, "elapsed_s": round(elapsed, 3),
+            "jobs_per_s": round(len(jobs) / elapsed, 2) if elapsed > 0 else None}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Batch LSB encode/decode over a process pool.")
+    ap.add_argument("op", choices=["encode", "decode"])
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--manifest", type=Path, help="JSONL or CSV job list")
+    src.add_argument("--input-dir", type=Path, help="directory of covers (encode) or stego images (decode)")
+    ap.add_argument("--payload", help="payload file for every cover (with --input-dir encode)")
+    ap.add_argument("--out-dir", type=Path, default=Path("batch_out"))
+    ap.add_argument("--method", choices=["random", "sequential"], default="random")
+    ap.add_argument("--mode", choices=list(MODES), default="shuffle", help="random-method slot mode")
+    ap.add_argument("--passphrase", default=os.environ.get("STEGO_PASSPHRASE"))
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--results", type=Path, default=None, help="JSONL results path (default: <out-dir>/results.jsonl)")
+    ap.add_argument("--verify", action="store_true", help="decode each stego after encode and report CRC status")
+    ap.add_argument("--profile", choices=PROFILES, default="balanced", help="output writer profile")
+    ap.add_argument("--compress", choices=("auto",) + tuple(CODECS), default=None,
+                    help="compress payloads before embedding")
+    args = ap.parse_args(argv)
+
+    if args.manifest:
+        jobs = load_manifest(args.manifest)
+    else:
+        if args.op == "encode" and not args.payload:
+            ap.error("--payload is required with --input-dir for encode")
+        jobs = jobs_from_dir(args.input_dir, args.out_dir, args.op, args.payload)
+    if args.method == "random" and not args.passphrase and not all(j.get("passphrase") for j in jobs):
+        ap.error("--passphrase (or STEGO_PASSPHRASE) is required for the random method")
+
+    results = args.results or (args.out_dir / "results.jsonl")
+    summary = run_batch(jobs, args.op, args.method, args.mode, args.passphrase, args.workers, results, args.verify,
+                        args.profile, args.compress)
+    print(json.dumps(summary))
+    return 0 if summary["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import argparse, csv, sys, time, tracemalloc
+import numpy as np
+
+from app.core.image_io import load_pixels, slot_view
+from app.core.kernels import MAX_BITS
+from app.core.lsb_random_v2 import MODES, _bits_code, _embed_slots, _extract
+from app.core.metrics import sample_peak
+from app.core.payload_stream import PayloadSink
+
+PASSPHRASE = "bench-kbits"
+
+def synthetic_cover(height: int, width: int) -> np.ndarray:
+    """
+    Left half a smooth gradient, right half noisy texture, so the adaptive mode has both to choose from.
+    """
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width)[None, :, None].repeat(height, 0).repeat(3, 2)
+    x[:, width // 2:] += rng.normal(0, 30, (height, width - width // 2, 3))
+    return np.clip(x, 0, 255).astype(np.uint8)
+
+def run_case(cover: np.ndarray, payload: bytes, bits: int, adaptive: bool) -> dict:
+    """
+    Embed/extract one payload with bits per slot into a copy of cover (mode "checked"; v6 for bits > 1).
+    """
+    stego = cover.copy()
+    flat = slot_view(stego)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    cap, _, q = _embed_slots(flat, payload, PASSPHRASE, MODES["checked"], 1, None, channels=stego.shape[2],
+                             peak=sample_peak(stego), bits=_bits_code(bits, adaptive))
+    embed_s = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    sink = PayloadSink()
+    t0 = time.perf_counter()
+    _, crc_ok = _extract(flat, PASSPHRASE, sink)
+    extract_s = time.perf_counter() - t0
+    if not crc_ok or sink.getvalue() != payload:
+        raise RuntimeError(f"round trip failed for bits={bits} adaptive={adaptive}")
+    return {"bits": bits, "adaptive": adaptive, "capacity_bytes": cap, "payload_bytes": len(payload),
+            "psnr_db": round(q.psnr_db, 2), "mse": round(q.mse, 4), "embed_s": round(embed_s, 4),
+            "extract_s": round(extract_s, 4),
+            # slot indices generated for the payload (int64 each); fixed k needs 8 * len / k of them
+            "index_mb": round(-(-len(payload) * 8 // bits) * 8 / 1e6, 2) if not adaptive else None,
+            "peak_mb": round(peak / 1e6, 2)}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Capacity, PSNR, embed/extract time and index memory per k "
+                                             "(payload bits per sample) of the random method.")
+    ap.add_argument("--cover", help="cover image (default: synthetic half-smooth, half-textured RGB)")
+    ap.add_argument("--size", type=int, nargs=2, default=(1080, 1920), metavar=("H", "W"),
+                    help="synthetic cover size")
+    ap.add_argument("--fill", type=float, default=0.9,
+                    help="payload as a fraction of the k=1 capacity, so every k carries the same payload")
+    ap.add_argument("--out", help="also write the results as CSV")
+    args = ap.parse_args(argv)
+
+    cover = load_pixels(args.cover) if args.cover else synthetic_cover(*args.size)
+    rng = np.random.default_rng(1)
+    n = int(cover.size // 8 * args.fill)
+    payload = rng.integers(0, 256, n, dtype=np.uint8).tobytes()
+    cases = [(k, False) for k in range(1, MAX_BITS + 1)] + [(k, True) for k in range(2, MAX_BITS + 1)]
+    rows = [run_case(cover, payload, k, adaptive) for k, adaptive in cases]
+
+    print(f"cover {cover.shape[1]}x{cover.shape[0]}x{cover.shape[2]}, payload {n} bytes")
+    print(f"{'k':<10}{'capacity':>12}{'PSNR dB':>9}{'embed s':>9}{'extract s':>10}{'index MB':>10}{'peak MB':>9}")
+    for r in rows:
+        name = f"{r['bits']}{' adapt' if r['adaptive'] else ''}"
+        index_mb = "-" if r["index_mb"] is None else f"{r['index_mb']:.1f}"
+        print(f"{name:<10}{r['capacity_bytes']:>12}{r['psnr_db']:>9.2f}{r['embed_s']:>9.3f}{r['extract_s']:>10.3f}"
+              f"{index_mb:>10}{r['peak_mb']:>9.1f}")
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
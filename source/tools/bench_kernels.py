@@ -0,0 +1,72 @@
+import argparse, time, tracemalloc
+import numpy as np
+
+from app.core import kernels
+
+# Run from source/ as a module (python -m tools.bench_kernels) so the app package is importable.
+
+# Reference: the per-bit helpers the codecs used before the packed kernels.
+def _to_bits(data: bytes) -> np.ndarray:
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+def _bits_to_bytes(bits: np.ndarray) -> bytes:
+    if len(bits) % 8 != 0:
+        bits = np.concatenate([bits, np.zeros(8 - len(bits) % 8, dtype=np.uint8)])
+    return np.packbits(bits).tobytes()
+
+def _lsb_embed_at_indices(flat, bit_indices, bits):
+    flat[bit_indices] = (flat[bit_indices] & 0xFE) | bits
+
+def _lsb_read_at_indices(flat, bit_indices):
+    return flat[bit_indices] & 1
+
+def _measure(fn, repeat: int):
+    """
+    (best seconds, peak traced bytes) over repeat runs.
+    """
+    best = float("inf")
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return best, peak
+
+def run(payload_mb: float, repeat: int):
+    rng = np.random.default_rng(0)
+    n = int(payload_mb * 1024 * 1024)
+    payload = rng.integers(0, 256, n, dtype=np.uint8).tobytes()
+    flat = rng.integers(0, 256, n * 8 * 2, dtype=np.uint8)
+    idx = rng.permutation(len(flat))[:n * 8].astype(np.int64)
+
+    cases = {
+        "seq embed / old": lambda: flat.__setitem__(slice(0, n * 8), (flat[:n * 8] & 0xFE) | _to_bits(payload)),
+        "seq embed / packed": lambda: kernels.embed_seq(flat, 0, payload),
+        "seq extract / old": lambda: _bits_to_bytes((flat[:n * 8] & 1).astype(np.uint8)),
+        "seq extract / packed": lambda: kernels.extract_seq(flat, 0, n),
+        "rand embed / old": lambda: _lsb_embed_at_indices(flat, idx, _to_bits(payload)),
+        "rand embed / packed": lambda: kernels.embed_at(flat, idx, payload),
+        "rand extract / old": lambda: _bits_to_bytes(_lsb_read_at_indices(flat, idx).astype(np.uint8)),
+        "rand extract / packed": lambda: kernels.extract_at(flat, idx, n),
+    }
+    print(f"payload {n} bytes, best of {repeat} (index array excluded from peak)")
+    print(f"{'case':<24}{'MB/s':>10}{'peak MB':>10}")
+    for name, fn in cases.items():
+        sec, peak = _measure(fn, repeat)
+        print(f"{name:<24}{n / sec / 1e6:>10.1f}{peak / 1e6:>10.1f}")
+
+    kernels.embed_seq(flat, 0, payload)
+    assert kernels.extract_seq(flat, 0, n) == payload
+    kernels.embed_at(flat, idx, payload)
+    assert kernels.extract_at(flat, idx, n) == payload
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Micro-benchmark: packed LSB kernels vs per-bit helpers.",
+                                 epilog="Run from source/: python -m tools.bench_kernels")
+    ap.add_argument("--payload-mb", type=float, default=8.0)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    run(args.payload_mb, args.repeat)
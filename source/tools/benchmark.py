@@ -1,45 +1,74 @@
-import os, time, math
+import argparse, math, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 from PIL import Image
 
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is reported as NaN
+    resource = None
+
+from app.core import instrument
+from app.core.writer import PROFILES, format_for_path, write_image
 from app.core.lsb_random_v2 import capacity_bytes_for_image as cap_random, encode_v2 as encode_random, decode_v2 as decode_random
 from app.core.lsb_sequential import capacity_bytes_for_image as cap_seq, encode_sequential, decode_sequential
 
-def gen_cover_images(base_dir: Path):
+SIZES_MP = (0.25, 1, 4, 12, 25, 50)
+FRACTIONS = (0.1, 0.5, 0.9)
+PATTERNS = ("gradient", "checker", "noise")
+METHODS = ("sequential", "random")
+
+WRITER_FORMATS = ("PNG", "BMP", "TIFF", "WEBP")
+
+CASE_KEY = ["method", "pattern", "megapixels", "fraction"]
+BASELINE_METRICS = ("encode_ms_median", "decode_ms_median", "peak_rss_mb")
+BAND_ROWS = 1024  # cover rows generated per step; bounds temporaries for 50+ MP covers
+
+def cover_dims(megapixels: float):
+    """
+    (width, height) of a 4:3 cover with about `megapixels` million pixels.
+    """
+    w = int(round(math.sqrt(megapixels * 1e6 * 4 / 3)))
+    return w, max(1, int(round(w * 3 / 4)))
+
+def make_cover(pattern: str, w: int, h: int) -> np.ndarray:
+    """
+    Synthetic (h, w, 3) uint8 cover, built with broadcasting in row bands.
+    """
+    arr = np.empty((h, w, 3), dtype=np.uint8)
+    rng = np.random.default_rng(0)
+    x = np.arange(w, dtype=np.uint32)[None, :]
+    for y0 in range(0, h, BAND_ROWS):
+        y = np.arange(y0, min(h, y0 + BAND_ROWS), dtype=np.uint32)[:, None]
+        band = arr[y0:y0 + len(y)]
+        if pattern == "gradient":
+            band[..., 0] = x * 255 // max(1, w - 1)
+            band[..., 1] = y % 256
+            band[..., 2] = (y // 2) % 256
+        elif pattern == "checker":
+            val = np.where((x // 32 + y // 32) % 2 == 0, 255, 0).astype(np.uint8)
+            band[..., 0] = val
+            band[..., 1] = 255 - val
+            band[..., 2] = (x * 3 + y * 2) % 256
+        elif pattern == "noise":
+            band[...] = rng.integers(0, 256, size=band.shape, dtype=np.uint8)
+        else:
+            raise ValueError(f"Unknown cover pattern: {pattern}")
+    return arr
+
+def cached_cover(base_dir: Path, pattern: str, megapixels: float) -> Path:
+    """
+    Path of the generated cover, creating it only if it is not on disk yet.
+    """
     base_dir.mkdir(parents=True, exist_ok=True)
-    covers = []
-
-    # Gradient 512x512
-    w, h = 512, 512
-    x = np.linspace(0, 255, w, dtype=np.uint8)
-    grad = np.zeros((h, w, 3), dtype=np.uint8)
-    for y in range(h):
-        grad[y, :, 0] = x
-        grad[y, :, 1] = y % 256
-        grad[y, :, 2] = (y//2) % 256
-    p1 = base_dir / "cover_gradient_512.png"
-    Image.fromarray(grad).save(p1); covers.append(p1)
-
-    # Checkerboard 512x512
-    tile = 32
-    cb = np.zeros((h, w, 3), dtype=np.uint8)
-    for yy in range(h):
-        for xx in range(w):
-            val = 255 if ((xx//tile + yy//tile) % 2 == 0) else 0
-            cb[yy, xx] = [val, 255-val, (xx*3 + yy*2) % 256]
-    p2 = base_dir / "cover_checker_512.png"
-    Image.fromarray(cb).save(p2); covers.append(p2)
-
-    # Noise 1024x768
-    w2, h2 = 1024, 768
-    noise = np.random.default_rng(0).integers(0, 256, size=(h2, w2, 3), dtype=np.uint8)
-    p3 = base_dir / "cover_noise_1024x768.png"
-    Image.fromarray(noise).save(p3); covers.append(p3)
-
-    return covers
+    w, h = cover_dims(megapixels)
+    path = base_dir / f"cover_{pattern}_{w}x{h}.png"
+    if not path.exists():
+        tmp = path.with_suffix(".tmp.png")
+        Image.fromarray(make_cover(pattern, w, h)).save(tmp, compress_level=1)
+        os.replace(tmp, path)
+    return path
 
 def lsb_plane_image(img_path: Path, out_path: Path):
     arr = np.array(Image.open(img_path).convert("RGB"), dtype=np.uint8)
@@ -47,123 +76,265 @@ def lsb_plane_image(img_path: Path, out_path: Path):
     plane = (bits.sum(axis=2) * 85).clip(0,255).astype(np.uint8)
     Image.fromarray(plane).save(out_path)
 
-def run_benchmark(out_dir: Path, passphrase: str = "ie406-demo"):
-    out_dir.mkdir(parents=True, exist_ok=True)
-    covers_dir = out_dir / "covers_gen"
-    stego_dir = out_dir / "stego"
-    stego_dir.mkdir(exist_ok=True, parents=True)
-    covers = gen_cover_images(covers_dir)
+def stage_columns(records, prefix: str) -> dict:
+    """
+    Median ms per stage over instrumentation records -> {prefix}_{stage}_ms columns.
+    """
+    per_stage = {}
+    for rec in records:
+        for s in rec["stages"]:
+            per_stage.setdefault(s["stage"], []).append(s["ms"])
+    return {f"{prefix}_{name}_ms": round(float(np.median(v)), 3) for name, v in per_stage.items()}
 
-    rows = []
-    rng = np.random.default_rng(42)
+def peak_rss_mb() -> float:
+    if resource is None:
+        return float("nan")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KiB elsewhere
 
-    for cover in covers:
-        cap = cap_random(str(cover))
-        sizes = [max(1024, int(cap * r)) for r in [0.1, 0.3, 0.5, 0.8] if int(cap * r) > 0]
+def _summary(ms) -> dict:
+    ms = np.asarray(ms)
+    return {"median": round(float(np.median(ms)), 2), "p95": round(float(np.percentile(ms, 95)), 2)}
 
-        for size in sizes:
-            payload = rng.integers(0, 256, size=size, dtype=np.uint8).tobytes()
-            tmp_payload = out_dir / f"payload_{cover.stem}_{size}.bin"
-            with open(tmp_payload, "wb") as f:
-                f.write(payload)
+def run_case(case: dict) -> dict:
+    """
+    Warm-up plus `repeat` timed encode/decode round trips of one case. Meant to run in
+    a fresh worker process so that ru_maxrss is the peak of this case alone.
+    """
+    cover, out_dir = Path(case["cover"]), Path(case["out_dir"])
+    method, size = case["method"], case["payload_bytes"]
+    stem = f"{cover.stem}_{method}_{int(case['fraction'] * 100)}"
+    payload_path = out_dir / f"payload_{stem}.bin"
+    payload_path.write_bytes(np.random.default_rng(size).integers(0, 256, size=size, dtype=np.uint8).tobytes())
+    stego = out_dir / "stego" / f"{stem}.png"
 
-            # Sequential
-            out_seq = stego_dir / f"{cover.stem}_seq_{size}.png"
-            t0 = time.perf_counter()
-            enc_seq = encode_sequential(str(cover), str(tmp_payload), str(out_seq))
-            t1 = time.perf_counter()
+    if method == "sequential":
+        enc = lambda: encode_sequential(str(cover), str(payload_path), str(stego))
+        dec = lambda: decode_sequential(str(stego), str(out_dir))
+    else:
+        enc = lambda: encode_random(str(cover), str(payload_path), case["passphrase"], str(stego))
+        dec = lambda: decode_random(str(stego), case["passphrase"], str(out_dir))
 
-            t2 = time.perf_counter()
-            dec_seq = decode_sequential(str(out_seq), str(out_dir))
-            t3 = time.perf_counter()
-
-            rows.append({
-                "cover": cover.name, "size": str(Image.open(cover).size),
-                "method": "sequential",
-                "payload_bytes": size,
-                "percent_capacity": round(100*size/max(1, enc_seq.capacity_bytes),2),
-                "psnr_db": enc_seq.psnr_db,
-                "encode_ms": round((t1-t0)*1000,2),
-                "decode_ms": round((t3-t2)*1000,2),
-                "crc_ok": dec_seq.crc_ok
-            })
-
-            # Random
-            out_rand = stego_dir / f"{cover.stem}_rand_{size}.png"
+    sink = instrument.MemorySink()
+    enc_ms, dec_ms = [], []
+    with instrument.instrumented(sink, memory=False):
+        for i in range(case["warmup"] + case["repeat"]):
+            if i == case["warmup"]:
+                sink.clear()
             t0 = time.perf_counter()
-            enc_rand = encode_random(str(cover), str(tmp_payload), passphrase, str(out_rand))
+            enc_res = enc()
             t1 = time.perf_counter()
-
+            dec_res = dec()
             t2 = time.perf_counter()
-            dec_rand = decode_random(str(out_rand), passphrase, str(out_dir))
-            t3 = time.perf_counter()
-
-            rows.append({
-                "cover": cover.name, "size": str(Image.open(cover).size),
-                "method": "random",
-                "payload_bytes": size,
-                "percent_capacity": round(100*size/max(1, enc_rand.capacity_bytes),2),
-                "psnr_db": enc_rand.psnr_db,
-                "encode_ms": round((t1-t0)*1000,2),
-                "decode_ms": round((t3-t2)*1000,2),
-                "crc_ok": dec_rand.crc_ok
-            })
-
-            # LSB-plane for mid size
-            mid = sizes[len(sizes)//2]
-            if size == mid:
-                lsb_plane_image(out_seq, out_dir / f"{cover.stem}_lsbplane_seq.png")
-                lsb_plane_image(out_rand, out_dir / f"{cover.stem}_lsbplane_rand.png")
-
-            try: os.remove(tmp_payload)
-            except: pass
-
-    # DataFrame & CSV
-    df = pd.DataFrame(rows)
-    csv_path = out_dir / "benchmark_results.csv"
-    df.to_csv(csv_path, index=False)
+            if i >= case["warmup"]:
+                enc_ms.append((t1 - t0) * 1000)
+                dec_ms.append((t2 - t1) * 1000)
+    try: os.remove(payload_path)
+    except OSError: pass
+
+    enc_s, dec_s = _summary(enc_ms), _summary(dec_ms)
+    return {
+        **{k: case[k] for k in CASE_KEY},
+        "cover": cover.name, "width": case["width"], "height": case["height"],
+        "payload_bytes": size,
+        "percent_capacity": round(100*size/max(1, enc_res.capacity_bytes),2),
+        "psnr_db": enc_res.psnr_db,
+        "changed_bit_ratio": round(enc_res.quality.changed_bit_ratio, 4),
+        "repeat": case["repeat"],
+        "encode_ms_median": enc_s["median"], "encode_ms_p95": enc_s["p95"],
+        "decode_ms_median": dec_s["median"], "decode_ms_p95": dec_s["p95"],
+        "encode_mb_s": round(size / 1e6 / (enc_s["median"] / 1000), 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "crc_ok": dec_res.crc_ok,
+        "stego": str(stego),
+        **stage_columns([r for r in sink.records if r["op"].startswith("encode")], "enc"),
+        **stage_columns([r for r in sink.records if r["op"].startswith("decode")], "dec"),
+    }
 
-    # Charts for first cover
-    first = covers[0].name
-    sub = df[df["cover"] == first]
+def build_cases(covers_dir: Path, out_dir: Path, sizes, fractions, patterns, methods,
+                repeat: int, warmup: int, passphrase: str):
+    cases = []
+    for mp in sizes:
+        for pattern in patterns:
+            cover = cached_cover(covers_dir, pattern, mp)
+            w, h = cover_dims(mp)
+            caps = {"sequential": cap_seq(str(cover)), "random": cap_random(str(cover))}
+            for method in methods:
+                for fraction in fractions:
+                    cases.append({
+                        "method": method, "pattern": pattern, "megapixels": mp, "fraction": fraction,
+                        "cover": str(cover), "width": w, "height": h, "out_dir": str(out_dir),
+                        "payload_bytes": max(1024, int(caps[method] * fraction)),
+                        "repeat": repeat, "warmup": warmup, "passphrase": passphrase,
+                    })
+    return cases
 
-    # PSNR vs capacity
+def compare_baseline(df: "pd.DataFrame", baseline_csv: Path, threshold: float,
+                     min_delta_ms: float = 5.0) -> "pd.DataFrame":
+    """
+    Cases whose metric exceeds the baseline by more than `threshold` (relative).
+    Timing differences below `min_delta_ms` are treated as noise.
+    """
+    import pandas as pd
+    base = pd.read_csv(baseline_csv)
+    cols = [m for m in BASELINE_METRICS if m in base.columns]
+    merged = df.merge(base[CASE_KEY + cols], on=CASE_KEY, suffixes=("", "_base"))
+    bad = pd.Series(False, index=merged.index)
+    for m in cols:
+        delta = merged[m] - merged[f"{m}_base"]
+        merged[f"{m}_ratio"] = (merged[m] / merged[f"{m}_base"]).round(3)
+        worse = merged[f"{m}_ratio"] > 1 + threshold
+        if m.endswith("_ms_median"):
+            worse &= delta > min_delta_ms
+        bad |= worse
+    return merged[bad]
+
+def run_writer_benchmark(df: "pd.DataFrame", out_dir: Path, formats=WRITER_FORMATS, profiles=PROFILES,
+                         repeat: int = 1, workers: int = None) -> "pd.DataFrame":
+    """
+    Output bytes and write time per (format, profile), on the fullest stego of each cover.
+    """
+    import pandas as pd
+    wdir = out_dir / "writer"
+    wdir.mkdir(parents=True, exist_ok=True)
+    rows = []
+    picks = df.sort_values("fraction").groupby(["pattern", "megapixels"]).tail(1)
+    for _, case in picks.iterrows():
+        arr = np.asarray(Image.open(case["stego"]).convert("RGB"))
+        for fmt in formats:
+            try:
+                format_for_path("", fmt)
+            except ValueError:  # e.g. no WebP in this Pillow build
+                continue
+            for profile in profiles:
+                path = wdir / f"{Path(case['stego']).stem}_{profile}.{fmt.lower()}"
+                ms = [write_image(arr, path, profile, fmt, workers).seconds * 1000 for _ in range(repeat)]
+                s = _summary(ms)
+                rows.append({
+                    "pattern": case["pattern"], "megapixels": case["megapixels"], "format": fmt, "profile": profile,
+                    "output_bytes": path.stat().st_size,
+                    "bytes_per_pixel": round(path.stat().st_size / arr[..., 0].size, 3),
+                    "write_ms_median": s["median"], "write_ms_p95": s["p95"],
+                    "write_mb_s": round(arr.nbytes / 1e6 / (s["median"] / 1000), 1),
+                })
+                os.remove(path)
+    wdf = pd.DataFrame(rows)
+    wdf.to_csv(out_dir / "writer_results.csv", index=False)
+    return wdf
+
+def plot_results(df: "pd.DataFrame", out_dir: Path):
+    import matplotlib.pyplot as plt  # only loaded when plots are drawn
+    # PSNR vs capacity on the smallest cover of the first pattern
+    sub = df[(df["megapixels"] == df["megapixels"].min()) & (df["pattern"] == df["pattern"].iloc[0])]
     fig1 = plt.figure()
-    for m in ["sequential", "random"]:
+    for m in sub["method"].unique():
         d = sub[sub["method"] == m].sort_values("percent_capacity")
         plt.plot(d["percent_capacity"], d["psnr_db"], marker="o", label=m)
     plt.xlabel("% capacity used")
     plt.ylabel("PSNR (dB)")
-    plt.title(f"PSNR vs capacity — {first}")
+    plt.title(f"PSNR vs capacity — {sub['cover'].iloc[0]}")
     plt.legend()
     fig1_path = out_dir / "psnr_vs_capacity.png"
     plt.savefig(fig1_path, bbox_inches="tight")
     plt.close(fig1)
 
-    # Encode time vs payload
+    # Median encode/decode time vs cover size at the largest payload fraction
+    sub = df[df["fraction"] == df["fraction"].max()]
     fig2 = plt.figure()
-    for m in ["sequential", "random"]:
-        d = sub[sub["method"] == m].sort_values("payload_bytes")
-        plt.plot(d["payload_bytes"], d["encode_ms"], marker="o", label=m)
-    plt.xlabel("Payload size (bytes)")
-    plt.ylabel("Encode time (ms)")
-    plt.title(f"Encode time vs payload — {first}")
+    for m in sub["method"].unique():
+        d = sub[sub["method"] == m].groupby("megapixels")[["encode_ms_median", "decode_ms_median"]].median()
+        plt.plot(d.index, d["encode_ms_median"], marker="o", label=f"{m} encode")
+        plt.plot(d.index, d["decode_ms_median"], marker="x", linestyle="--", label=f"{m} decode")
+    plt.xscale("log")
+    plt.yscale("log")
+    plt.xlabel("Cover size (MP)")
+    plt.ylabel("Median time (ms)")
+    plt.title(f"Time vs cover size — {int(df['fraction'].max() * 100)}% capacity")
     plt.legend()
-    fig2_path = out_dir / "encode_time_vs_payload.png"
+    fig2_path = out_dir / "time_vs_cover_size.png"
     plt.savefig(fig2_path, bbox_inches="tight")
     plt.close(fig2)
 
-    return {
-        "csv": str(csv_path),
-        "psnr_plot": str(fig1_path),
-        "time_plot": str(fig2_path),
-        "covers": [str(p) for p in covers]
-    }
+    # LSB planes for the smallest cover at the middle fraction
+    mid = sorted(df["fraction"].unique())[len(df["fraction"].unique()) // 2]
+    for _, row in df[(df["megapixels"] == df["megapixels"].min()) & (df["fraction"] == mid)].iterrows():
+        lsb_plane_image(Path(row["stego"]), out_dir / f"{Path(row['cover']).stem}_lsbplane_{row['method']}.png")
+    return fig1_path, fig2_path
 
-if __name__ == "__main__":
-    out_dir = Path(__file__).resolve().parents[2] / "results" / "benchmarks"
+def run_benchmark(out_dir: Path, passphrase: str = "ie406-demo", sizes=SIZES_MP, fractions=FRACTIONS,
+                  patterns=PATTERNS, methods=METHODS, repeat: int = 5, warmup: int = 1,
+                  plots: bool = True, progress=print, writer_formats=WRITER_FORMATS, writer_repeat: int = 1):
     out_dir.mkdir(parents=True, exist_ok=True)
-    info = run_benchmark(out_dir, passphrase="ie406-demo")
+    covers_dir = out_dir / "covers_gen"
+    (out_dir / "stego").mkdir(exist_ok=True, parents=True)
+    cases = build_cases(covers_dir, out_dir, sizes, fractions, patterns, methods, repeat, warmup, passphrase)
+    import pandas as pd  # the per-case worker processes re-import this module and don't need it
+
+    # One case per fresh process: timings don't overlap and peak RSS is per case
+    rows = []
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as pool:
+        for i, row in enumerate(pool.map(run_case, cases), 1):
+            rows.append(row)
+            if progress is not None:
+                progress(f"[{i}/{len(cases)}] {row['method']:<10} {row['cover']:<32} {int(row['fraction']*100):>3}%  "
+                         f"enc {row['encode_ms_median']:.1f} ms  dec {row['decode_ms_median']:.1f} ms  "
+                         f"rss {row['peak_rss_mb']:.0f} MB")
+
+    # DataFrame & CSV (per-stage medians in the enc_*/dec_* columns)
+    df = pd.DataFrame(rows)
+    csv_path = out_dir / "benchmark_results.csv"
+    df.to_csv(csv_path, index=False)
+
+    info = {"csv": str(csv_path), "covers": sorted({c["cover"] for c in cases}), "results": df}
+    if writer_formats:
+        wdf = run_writer_benchmark(df, out_dir, writer_formats, repeat=writer_repeat)
+        info["writer_csv"] = str(out_dir / "writer_results.csv")
+        if progress is not None:
+            progress(wdf.groupby(["format", "profile"])[["output_bytes", "write_ms_median"]].median().to_string())
+    if plots:
+        info["psnr_plot"], info["time_plot"] = (str(p) for p in plot_results(df, out_dir))
+    return info
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Encode/decode benchmark sweep over cover sizes and payload fractions.")
+    ap.add_argument("--out-dir", type=Path, default=Path(__file__).resolve().parents[2] / "results" / "benchmarks")
+    ap.add_argument("--sizes", type=float, nargs="+", default=list(SIZES_MP), help="cover sizes in megapixels")
+    ap.add_argument("--fractions", type=float, nargs="+", default=list(FRACTIONS), help="payload / capacity")
+    ap.add_argument("--patterns", nargs="+", choices=PATTERNS, default=list(PATTERNS))
+    ap.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--warmup", type=int, default=1)
+    ap.add_argument("--passphrase", default="ie406-demo")
+    ap.add_argument("--no-plots", action="store_true")
+    ap.add_argument("--writer-formats", nargs="*", default=list(WRITER_FORMATS),
+                    help="output formats timed per writer profile (none to skip)")
+    ap.add_argument("--writer-repeat", type=int, default=1)
+    ap.add_argument("--baseline", type=Path, help="CSV of a previous run to compare against")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown vs baseline")
+    ap.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore timing regressions smaller than this")
+    ap.add_argument("--save-baseline", type=Path, help="also write this run's results here")
+    args = ap.parse_args(argv)
+
+    info = run_benchmark(args.out_dir, args.passphrase, args.sizes, args.fractions, args.patterns, args.methods,
+                         args.repeat, args.warmup, plots=not args.no_plots,
+                         writer_formats=[f.upper() for f in args.writer_formats], writer_repeat=args.writer_repeat)
     print("Done. CSV:", info["csv"])
-    print("PSNR plot:", info["psnr_plot"])
-    print("Time plot:", info["time_plot"])
+    if "writer_csv" in info:
+        print("Writer CSV:", info["writer_csv"])
+    if "psnr_plot" in info:
+        print("PSNR plot:", info["psnr_plot"])
+        print("Time plot:", info["time_plot"])
+    if args.save_baseline:
+        info["results"].to_csv(args.save_baseline, index=False)
+        print("Baseline written:", args.save_baseline)
+    if args.baseline:
+        bad = compare_baseline(info["results"], args.baseline, args.threshold, args.min_delta_ms)
+        if len(bad):
+            print(f"REGRESSION: {len(bad)} case(s) beyond {args.threshold:.0%} of baseline")
+            print(bad[CASE_KEY + [c for c in bad.columns if c.endswith("_ratio")]].to_string(index=False))
+            return 1
+        print(f"No regressions vs {args.baseline} (threshold {args.threshold:.0%}).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
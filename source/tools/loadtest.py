@@ -0,0 +1,131 @@
+import argparse, base64, io, json, os, subprocess, sys, time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from app.core.lsb_random_v2 import MODES
+
+OPS = ("encode", "decode", "capacity", "check_key")
+METRIC_PREFIXES = ("stego_throughput_rps", "stego_requests_total", "stego_pool_", "stego_kdf_cache_",
+                   "stego_queue_wait_ms_count", "stego_queue_wait_ms_sum")
+
+def make_cover_png(mp: float, seed: int = 0) -> bytes:
+    side = max(8, int((mp * 1e6) ** 0.5))
+    arr = np.random.default_rng(seed).integers(0, 256, (side, side, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(arr, "RGB").save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
+
+def post(url: str, op: str, body: dict, timeout: float):
+    data = json.dumps(body).encode("utf-8")
+    req = urllib.request.Request(f"{url}/{op}", data=data, headers={"Content-Type": "application/json"})
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            status, out = r.status, r.read()
+    except urllib.error.HTTPError as e:
+        status, out = e.code, e.read()
+    except (urllib.error.URLError, OSError):
+        status, out = 0, b""
+    return status, (time.perf_counter() - t0) * 1000, out
+
+def get_text(url: str, timeout: float = 5.0) -> str:
+    with urllib.request.urlopen(url, timeout=timeout) as r:
+        return r.read().decode("utf-8")
+
+def wait_healthy(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            get_text(f"{url}/health", 1.0)
+            return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    raise RuntimeError(f"Service at {url} did not become healthy within {timeout}s.")
+
+def build_bodies(cover: bytes, payload: bytes, passphrase: str, mode: str, cover_path: str):
+    """
+    One request body per op; the decode/check_key bodies reuse a stego made up front.
+    """
+    cover_b64 = base64.b64encode(cover).decode("ascii")
+    encode = {"cover_b64": cover_b64, "payload_b64": base64.b64encode(payload).decode("ascii"),
+              "passphrase": passphrase, "mode": mode, "profile": "fastest"}
+    return {"encode": encode,
+            "decode": {"passphrase": passphrase},
+            "capacity": {"path": cover_path, "mode": mode},
+            "check_key": {"passphrase": passphrase}}
+
+def percentile(values, q: float) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Drive the local stego service with concurrent clients.")
+    ap.add_argument("--url", default="http://127.0.0.1:8765")
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=200, help="total requests across all clients")
+    ap.add_argument("--op", choices=OPS + ("mix",), default="mix")
+    ap.add_argument("--size-mp", type=float, default=0.25, help="cover size in megapixels")
+    ap.add_argument("--payload-kb", type=float, default=16)
+    ap.add_argument("--mode", choices=sorted(MODES), default="checked")
+    ap.add_argument("--passphrase", default="loadtest")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--start-server", action="store_true", help="spawn app.service.server on --url's port")
+    ap.add_argument("--workers", type=int, default=None, help="server workers with --start-server")
+    ap.add_argument("--queue", type=int, default=64, help="server queue size with --start-server")
+    args = ap.parse_args(argv)
+    url = args.url.rstrip("/")
+
+    server = None
+    if args.start_server:
+        port = url.rsplit(":", 1)[-1]
+        cmd = [sys.executable, "-m", "app.service.server", "--port", port, "--queue", str(args.queue)]
+        if args.workers:
+            cmd += ["--workers", str(args.workers)]
+        server = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        wait_healthy(url)
+        cover = make_cover_png(args.size_mp)
+        payload = np.random.default_rng(1).integers(0, 256, int(args.payload_kb * 1024), dtype=np.uint8).tobytes()
+        cover_path = os.path.abspath(os.path.join("covers_gen", f"loadtest_{args.size_mp}mp.png"))
+        os.makedirs(os.path.dirname(cover_path), exist_ok=True)
+        with open(cover_path, "wb") as f:
+            f.write(cover)
+        bodies = build_bodies(cover, payload, args.passphrase, args.mode, cover_path)
+        status, _, out = post(url, "encode", bodies["encode"], args.timeout)
+        if status != 200:
+            raise RuntimeError(f"Priming encode failed with status {status}: {out[:200]!r}")
+        stego_b64 = json.loads(out)["stego_b64"]
+        bodies["decode"]["stego_b64"] = stego_b64
+        bodies["check_key"]["stego_b64"] = stego_b64
+        if args.mode not in ("checked", "sharded") and args.op in ("mix", "check_key"):
+            bodies.pop("check_key")  # only tagged headers support key checks
+
+        ops = [args.op] * args.requests if args.op != "mix" else \
+            [list(bodies)[i % len(bodies)] for i in range(args.requests)]
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as ex:
+            results = list(ex.map(lambda op: (op, *post(url, op, bodies[op], args.timeout)[:2]), ops))
+        wall = time.perf_counter() - t0
+
+        statuses = Counter(s for _, s, _ in results)
+        print(f"{len(results)} requests, {args.clients} clients, {wall:.2f}s -> {len(results) / wall:.2f} req/s")
+        print("status:", dict(sorted(statuses.items())))
+        for op in sorted(set(ops)):
+            lat = [ms for o, s, ms in results if o == op and s == 200]
+            print(f"  {op:10s} ok={len(lat):5d}  p50={percentile(lat, 50):8.1f} ms  "
+                  f"p95={percentile(lat, 95):8.1f} ms  p99={percentile(lat, 99):8.1f} ms")
+        for line in get_text(f"{url}/metrics").splitlines():
+            if line.startswith(METRIC_PREFIXES):
+                print(" ", line)
+        return 0 if all(s == 200 for _, s, _ in results) else 1
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+
+if __name__ == "__main__":
+    sys.exit(main())
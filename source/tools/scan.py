@@ -0,0 +1,50 @@
+import argparse, json, os, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+
+from app.core.probe import probe_header
+
+IMAGE_EXTS = {".png", ".bmp", ".tif", ".tiff", ".webp"}
+
+def iter_images(roots):
+    for root in roots:
+        root = Path(root)
+        if root.is_file():
+            yield root
+            continue
+        for dirpath, _, files in os.walk(root):
+            for name in files:
+                if Path(name).suffix.lower() in IMAGE_EXTS:
+                    yield Path(dirpath) / name
+
+def _probe(path: Path, full: bool):
+    try:
+        return path, probe_header(str(path), allow_full_decode=full), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Find images carrying an ST header using header-only reads.")
+    ap.add_argument("paths", nargs="+")
+    ap.add_argument("--workers", type=int, default=16, help="I/O threads")
+    ap.add_argument("--full", action="store_true", help="fully decode formats without a fast header path")
+    ap.add_argument("--all", action="store_true", help="also print files without a header")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    n = hits = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as ex:
+        for path, res, err in ex.map(lambda p: _probe(p, args.full), iter_images(args.paths)):
+            n += 1
+            if res is not None:
+                hits += 1
+                print(json.dumps(asdict(res)))
+            elif args.all or err:
+                print(json.dumps({"path": str(path), "stego": False, "error": err}))
+    dt = time.perf_counter() - t0
+    print(f"scanned {n} files, {hits} with header, {dt:.2f}s", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
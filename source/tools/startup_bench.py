@@ -0,0 +1,107 @@
+import argparse, csv, os, statistics, subprocess, sys, tempfile, time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+PASSPHRASE = "startup-bench"
+HEAVY = ("tkinter", "pandas", "matplotlib")  # never needed by headless commands
+
+# name -> (command line, import-time budget in ms, modules it must not import).
+# A module matches a prefix when it equals it or is a submodule of it.
+def scenarios(tmp: Path) -> dict:
+    cover, payload, stego = tmp / "cover.png", tmp / "payload.bin", tmp / "stego.png"
+    cli = ["-m", "app.cli"]
+    return {
+        "cli_help": (cli + ["--help"], 60, HEAVY + ("numpy", "PIL", "app.core")),
+        "cli_capacity": (cli + ["capacity", str(cover)], 250, HEAVY + ("PIL.PngImagePlugin",)),
+        "cli_probe": (cli + ["probe", str(stego)], 250, HEAVY + ("PIL.PngImagePlugin",)),
+        "cli_encode": (cli + ["encode", str(cover), str(payload), str(tmp / "out.png"), "--passphrase", PASSPHRASE],
+                       300, HEAVY),
+        "cli_decode": (cli + ["decode", str(stego), str(tmp / "dec"), "--passphrase", PASSPHRASE], 300, HEAVY),
+        "benchmark_help": (["-m", "tools.benchmark", "--help"], 300, ("tkinter", "pandas", "matplotlib")),
+    }
+
+def make_inputs(tmp: Path):
+    rng = np.random.default_rng(0)
+    Image.fromarray(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)).save(tmp / "cover.png")
+    (tmp / "payload.bin").write_bytes(rng.integers(0, 256, 256, dtype=np.uint8).tobytes())
+    subprocess.run([sys.executable, "-m", "app.cli", "encode", str(tmp / "cover.png"), str(tmp / "payload.bin"),
+                    str(tmp / "stego.png"), "--passphrase", PASSPHRASE], cwd=SOURCE_DIR, check=True,
+                   stdout=subprocess.DEVNULL)
+
+def parse_importtime(stderr: str):
+    """
+    (total import ms, {module: cumulative ms}) from `-X importtime` output; the total
+    sums the top-level entries, which include everything imported beneath them.
+    """
+    total, modules = 0, {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():  # column header
+            continue
+        us = int(cumulative)
+        modules[name.strip()] = us / 1000
+        if not name[1:].startswith(" "):
+            total += us
+    return total / 1000, modules
+
+def _forbidden(modules, prefixes) -> list:
+    return sorted(m for m in modules if any(m == p or m.startswith(p + ".") for p in prefixes))
+
+def run_scenario(argv, repeat: int):
+    """
+    Median wall and import ms over repeat fresh interpreters, plus every module imported.
+    """
+    walls, imports, seen = [], [], set()
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", *argv], cwd=SOURCE_DIR, env=env,
+                              capture_output=True, text=True)
+        walls.append((time.perf_counter() - t0) * 1000)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(argv)} exited {proc.returncode}: {proc.stderr.strip()[-500:]}")
+        total, modules = parse_importtime(proc.stderr)
+        imports.append(total)
+        seen.update(modules)
+    return statistics.median(walls), statistics.median(imports), seen
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Interpreter startup + import time of the headless entry points "
+                                             "(python -X importtime); exit 1 when a budget is exceeded.")
+    ap.add_argument("--repeat", type=int, default=5, help="fresh interpreters per scenario")
+    ap.add_argument("--budget-scale", type=float, default=1.0, help="multiply every import budget (slow machines)")
+    ap.add_argument("--only", nargs="+", help="scenario names to run")
+    ap.add_argument("--out", help="also write the results as CSV")
+    args = ap.parse_args(argv)
+
+    rows, failed = [], 0
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        make_inputs(tmp)
+        for name, (cmd, budget, banned) in scenarios(tmp).items():
+            if args.only and name not in args.only:
+                continue
+            wall, imports, seen = run_scenario(cmd, args.repeat)
+            budget *= args.budget_scale
+            bad = _forbidden(seen, banned)
+            ok = imports <= budget and not bad
+            failed += not ok
+            rows.append({"scenario": name, "wall_ms": round(wall, 1), "import_ms": round(imports, 1),
+                         "budget_ms": round(budget, 1), "modules": len(seen), "forbidden": " ".join(bad),
+                         "ok": ok})
+            print(f"{name:<16} wall {wall:7.1f} ms  imports {imports:7.1f} ms / {budget:5.0f} ms  "
+                  f"{len(seen):4d} modules  {'ok' if ok else 'FAIL'}" + (f"  imported: {' '.join(bad)}" if bad else ""))
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
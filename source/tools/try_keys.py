@@ -0,0 +1,37 @@
+import argparse, json, os, sys, time
+
+from app.core.try_keys import try_keys
+
+def read_candidates(path: str):
+    """
+    One passphrase per line ("-" reads stdin); the line break is stripped, other whitespace is kept.
+    """
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        return [line.rstrip("\r\n") for line in f if line.rstrip("\r\n")]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Find which candidate passphrase opens a random-method stego image.")
+    ap.add_argument("stego", help="stego image")
+    ap.add_argument("-p", "--passphrase", action="append", default=[], help="candidate (repeatable)")
+    ap.add_argument("-f", "--file", help="file with one candidate per line, - for stdin")
+    ap.add_argument("--out-dir", default=".", help="where extracted_payload.bin is written for the matching key")
+    ap.add_argument("--workers", type=int, default=os.cpu_count(), help="trial processes")
+    args = ap.parse_args(argv)
+    candidates = args.passphrase + (read_candidates(args.file) if args.file else [])
+    if not candidates:
+        ap.error("give candidates with -p and/or -f")
+
+    t0 = time.perf_counter()
+    res = try_keys(args.stego, candidates, args.out_dir, args.workers)
+    dt = time.perf_counter() - t0
+    print(json.dumps({"found": res.passphrase is not None, "index": res.index, "passphrase": res.passphrase,
+                      "output_path": res.output_path, "payload_len": res.payload_len, "tried": res.tried,
+                      "candidates": res.candidates, "seconds": round(dt, 3)}))
+    return 0 if res.passphrase is not None else 1
+
+if __name__ == "__main__":
+    sys.exit(main())